@@ -0,0 +1,101 @@
+"""In-process LRU cache of decoded rows and whole tables.
+
+Entries are stored pickled: a hit unpickles a private copy, so handlers
+can mutate what they get without corrupting the cache, and the pickle
+size doubles as the memory accounting for the LRU cap.
+
+Every entry carries the table version it was read or written at. A put
+with an older version than the entry already cached, or than the
+table's invalidation floor, is ignored, so a slow reader can never
+overwrite a newer write. Writers that cannot provide the new value leave
+a stale marker carrying their version for the same reason.
+"""
+import pickle
+import threading
+from collections import OrderedDict
+
+MISSING = object()
+TABLE = "__table__"
+# Payload of a stale marker; real pickles are never empty.
+_STALE = b""
+
+
+class TableCache:
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._floors: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, table: str, key=TABLE):
+        with self._lock:
+            entry = self._entries.get((table, key))
+            if entry is None or entry[0] == _STALE:
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end((table, key))
+            self.hits += 1
+            payload = entry[0]
+        return pickle.loads(payload)
+
+    def put(self, table: str, key, value, version: int) -> None:
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.max_bytes:
+            self.mark_stale(table, key, version)
+            return
+        self._store(table, key, payload, version)
+
+    def mark_stale(self, table: str, key, version: int) -> None:
+        """Forget ``key`` and refuse puts read before ``version``."""
+        self._store(table, key, _STALE, version)
+
+    def _store(self, table: str, key, payload: bytes, version: int) -> None:
+        with self._lock:
+            if version < self._floors.get(table, 0):
+                return
+            old = self._entries.get((table, key))
+            if old is not None:
+                if version < old[1]:
+                    return
+                self.bytes -= len(old[0])
+            self._entries[(table, key)] = (payload, version)
+            self._entries.move_to_end((table, key))
+            self.bytes += len(payload)
+            while self.bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+
+    def discard(self, table: str, key=TABLE) -> None:
+        with self._lock:
+            entry = self._entries.pop((table, key), None)
+            if entry is not None:
+                self.bytes -= len(entry[0])
+
+    def invalidate_table(self, table: str, version: int) -> None:
+        """Drop every entry of ``table`` and refuse puts older than ``version``."""
+        with self._lock:
+            self._floors[table] = max(self._floors.get(table, 0), version)
+            for cache_key in [k for k in self._entries if k[0] == table]:
+                self.bytes -= len(self._entries.pop(cache_key)[0])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._floors.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+            }
@@ -2,10 +2,81 @@ import os
 import logging
 
 
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
 class Settings:
     def __init__(self) -> None:
         self.database_url = os.getenv("DATABASE_URL", "sqlite:///osarebito.db")
         self.log_level = os.getenv("LOG_LEVEL", "INFO")
+        # SQLite pragmas applied to every new connection.
+        self.sqlite_journal_mode = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+        self.sqlite_synchronous = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+        self.sqlite_busy_timeout_ms = _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000)
+        # How long a starting worker waits for another one's schema migration.
+        self.migration_lock_timeout_ms = _env_int("MIGRATION_LOCK_TIMEOUT_MS", 600000)
+        # Negative values are KiB, as in PRAGMA cache_size (64 MiB here).
+        self.sqlite_cache_size = _env_int("SQLITE_CACHE_SIZE", -64000)
+        self.sqlite_mmap_size = _env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+        self.sqlite_temp_store = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+        # Connection pool.
+        self.db_pool_size = _env_int("DB_POOL_SIZE", 5)
+        self.db_max_overflow = _env_int("DB_MAX_OVERFLOW", 10)
+        self.db_pool_recycle = _env_int("DB_POOL_RECYCLE", 1800)
+        # Group commit: queue writes through one thread and commit the ones
+        # arriving within the window together.
+        self.write_queue_enabled = _env_bool("WRITE_QUEUE_ENABLED")
+        self.write_queue_window_ms = float(os.getenv("WRITE_QUEUE_WINDOW_MS", "2"))
+        self.write_queue_max_batch = _env_int("WRITE_QUEUE_MAX_BATCH", 128)
+        # Write-through row cache. Other processes' writes are noticed by
+        # polling the cache_versions table at most every interval, so they
+        # can be read stale for up to that long; 0 polls on every read.
+        self.cache_enabled = _env_bool("CACHE_ENABLED", True)
+        self.cache_max_bytes = _env_int("CACHE_MAX_BYTES", 64 * 1024 * 1024)
+        self.cache_poll_interval_ms = _env_int("CACHE_POLL_INTERVAL_MS", 200)
+        # Home timelines: authors with more followers than this are merged
+        # in at read time instead of being fanned out to every follower.
+        self.timeline_fanout_max_followers = _env_int("TIMELINE_FANOUT_MAX_FOLLOWERS", 5000)
+        # Posts copied into a timeline when its owner follows someone.
+        self.timeline_backfill = _env_int("TIMELINE_BACKFILL", 200)
+        # Entries kept per home timeline; older ones are trimmed on write.
+        self.timeline_max_entries = _env_int("TIMELINE_MAX_ENTRIES", 800)
+        # Trending posts: engagement loses half its weight every half-life
+        # and posts without any within the window drop off the lists.
+        self.trending_half_life_hours = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "6"))
+        self.trending_window_hours = float(os.getenv("TRENDING_WINDOW_HOURS", "72"))
+        self.trending_by_category = _env_bool("TRENDING_BY_CATEGORY", True)
+        self.trending_by_tag = _env_bool("TRENDING_BY_TAG", True)
+        # Post search: days of recency worth one BM25 unit of relevance.
+        self.search_recency_days = float(os.getenv("SEARCH_RECENCY_DAYS", "7"))
+        # People you may know: suggestions kept per user, and how often the
+        # batch job recomputes them (0 disables the job).
+        self.suggestions_per_user = _env_int("SUGGESTIONS_PER_USER", 20)
+        self.suggestions_interval_seconds = _env_int("SUGGESTIONS_INTERVAL_SECONDS", 3600)
+        # Notifications: repeated events within the collapse window fold
+        # into one unread notification; all are deleted after the retention
+        # period by a job running at the interval (0 disables it).
+        self.notification_collapse_hours = float(os.getenv("NOTIFICATION_COLLAPSE_HOURS", "24"))
+        self.notification_retention_days = _env_int("NOTIFICATION_RETENTION_DAYS", 90)
+        self.notification_compact_interval_seconds = _env_int(
+            "NOTIFICATION_COMPACT_INTERVAL_SECONDS", 3600
+        )
+        # Hold the follow and block graph in memory, loaded at startup.
+        self.social_graph_enabled = _env_bool("SOCIAL_GRAPH_ENABLED", True)
+        # Follow and block changes kept for other processes' graphs to
+        # replay; a graph further behind than this reloads.
+        self.social_graph_log_size = _env_int("SOCIAL_GRAPH_LOG_SIZE", 100000)
+        # Feed-style list endpoints.
+        self.page_size_default = _env_int("PAGE_SIZE_DEFAULT", 20)
+        self.page_size_max = _env_int("PAGE_SIZE_MAX", 100)
 
 
 settings = Settings()
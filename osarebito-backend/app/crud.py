@@ -1,8 +1,52 @@
+import functools
+import threading
+import time
+from datetime import datetime, timedelta
+import anyio
+from sqlalchemy import (
+    and_,
+    bindparam,
+    or_,
+    delete,
+    func,
+    insert,
+    literal,
+    select,
+    union,
+    union_all,
+    exists,
+    update,
+    tuple_,
+)
+from .config import settings
 from .db import (
     load_table,
     save_table,
     get_item,
-    update_item,
+    get_items,
+    insert_one,
+    update_one,
+    update_fields,
+    delete_one,
+    upsert_many,
+    select_rows,
+    select_page,
+    row_exists,
+    allocate_id,
+    row_cache_stats,
+    run_write,
+    write_tables,
+    insert_edge,
+    delete_edge,
+    add_edge,
+    remove_edge,
+    edge_exists,
+    count_edges,
+    list_edges,
+    group_edges,
+    set_counted_edge,
+    insert_counted,
+    engine,
     users_table,
     posts_table,
     comments_table,
@@ -11,13 +55,68 @@ from .db import (
     jobs_table,
     groups_table,
     group_messages_table,
+    group_members_table,
+    group_member_rows,
+    build_record,
+    TrackedRows,
+    cached_edge_exists,
     fan_posts_table,
     appeals_table,
     materials_table,
     polls_table,
     schedules_table,
     approval_calendars_table,
+    follows_table,
+    graph_changes_table,
+    follower_counts_table,
+    suggestions_table,
+    blocks_table,
+    interests_table,
+    likes_table,
+    retweets_table,
+    bookmarks_table,
+    timelines_table,
+    user_search_table,
+    creator_terms_table,
+    creator_term_rows,
+    CREATOR_FACETS,
+    normalize_term,
+    post_tags_table,
+    tag_counts_table,
+    TAG_WINDOWS,
+    ALL_TIME,
+    tag_buckets,
+    conversation_id,
+    conversation_rows,
+    conversations_table,
+    notifications_table,
+    notification_actors_table,
+    next_id,
+    pull_authors_table,
 )
+# Imported after .db: the migrations run by .db import these themselves.
+from . import search, trending
+from .graph import SocialGraph
+
+
+def _awaitable(func):
+    """Wrap a blocking storage call so ``async def`` routes can await it.
+
+    The call runs in the AnyIO worker threadpool (the one FastAPI uses for
+    plain ``def`` routes), so the event loop and open WebSockets keep being
+    served while the database works.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await anyio.to_thread.run_sync(functools.partial(func, *args, **kwargs))
+
+    wrapper.__name__ = f"{func.__name__}_async"
+    return wrapper
+
+
+def cache_stats() -> dict:
+    return row_cache_stats()
 
 
 def load_users():
@@ -28,6 +127,516 @@ def save_users(users):
     save_table(users_table, users, "user_id")
 
 
+def get_user(user_id: str):
+    return get_item(users_table, "user_id", user_id)
+
+
+def get_users(user_ids):
+    return get_items(users_table, user_ids)
+
+
+def list_users(exclude=(), limit: int | None = None):
+    conditions = [users_table.c.user_id.notin_(list(exclude))] if exclude else []
+    return select_rows(users_table, *conditions, order_by=(users_table.c.user_id,), limit=limit)
+
+
+def insert_user(user: dict):
+    insert_one(users_table, user)
+    index_user(user)
+
+
+def update_user(user: dict):
+    update_one(users_table, user)
+
+
+def upsert_users(users):
+    upsert_many(users_table, users)
+
+
+def index_user(user: dict) -> None:
+    """Refresh ``user`` in the typeahead search index."""
+    entry = search.user_entry(user)
+
+    def write(conn):
+        u = user_search_table
+        conn.execute(delete(u).where(u.c.user_id == entry["user_id"]))
+        conn.execute(insert(u).values(entry))
+
+    run_write(write)
+
+
+def query_search_users(query: str, limit: int = 20) -> list[dict]:
+    """Compact entries of users matching ``query``, best first."""
+    return search.search_users(query, limit)
+
+
+# Most common terms listed per creator profile facet.
+FACET_LIMIT = 20
+
+
+def index_creator_profile(user: dict) -> None:
+    """Replace ``user``'s entries in the creator profile term index."""
+    ct = creator_terms_table
+    rows = creator_term_rows(user)
+
+    def write(conn):
+        conn.execute(delete(ct).where(ct.c.user_id == user["user_id"]))
+        if rows:
+            conn.execute(insert(ct), rows)
+
+    run_write(write)
+
+
+def _creator_matches(terms: list[str], match_all: bool, facet: str | None):
+    """Public profiles with a term starting with any of ``terms`` (all of
+    them if ``match_all``) and how many of ``terms`` each matched."""
+    ct = creator_terms_table
+    parts = []
+    for i, term in enumerate(terms):
+        conditions = [ct.c.public.is_(True), ct.c.term >= term, ct.c.term < term + "\U0010ffff"]
+        if facet:
+            conditions.append(ct.c.facet == facet)
+        parts.append(select(ct.c.user_id, literal(i).label("q")).where(*conditions))
+    hits = (union_all(*parts) if len(parts) > 1 else parts[0]).subquery()
+    matched = func.count(hits.c.q.distinct()).label("matched")
+    stmt = select(hits.c.user_id, matched).group_by(hits.c.user_id)
+    if match_all:
+        stmt = stmt.having(matched == len(terms))
+    return stmt.subquery()
+
+
+def _creator_terms(terms) -> list[str]:
+    return list(dict.fromkeys(t for t in map(normalize_term, terms) if t))
+
+
+def query_creator_profiles(
+    terms,
+    match_all: bool = True,
+    facet: str | None = None,
+    after=None,
+    limit: int = 20,
+) -> list[tuple[str, int]]:
+    """``(user_id, matched)`` of profiles matching ``terms``, most matched
+    terms first. ``after`` is the last pair of the previous page."""
+    terms = _creator_terms(terms)
+    if not terms:
+        return []
+    m = _creator_matches(terms, match_all, facet)
+    stmt = select(m.c.user_id, m.c.matched)
+    if after is not None:
+        user_id, matched = after
+        stmt = stmt.where(
+            or_(m.c.matched < matched, and_(m.c.matched == matched, m.c.user_id > user_id))
+        )
+    stmt = stmt.order_by(m.c.matched.desc(), m.c.user_id).limit(limit)
+    with engine.connect() as conn:
+        return [tuple(row) for row in conn.execute(stmt)]
+
+
+def creator_facets(terms=(), match_all: bool = True, facet: str | None = None) -> dict:
+    """Profile counts per term and facet over every profile matching
+    ``terms``; empty without terms, which match no profiles."""
+    ct = creator_terms_table
+    facets = {name: [] for name in CREATOR_FACETS}
+    terms = _creator_terms(terms)
+    if not terms:
+        return facets
+    m = _creator_matches(terms, match_all, facet)
+    stmt = (
+        select(ct.c.facet, ct.c.term, func.count().label("count"))
+        .where(ct.c.public.is_(True), ct.c.user_id.in_(select(m.c.user_id)))
+        .group_by(ct.c.facet, ct.c.term)
+    )
+    with engine.connect() as conn:
+        for name, term, count in conn.execute(stmt):
+            facets[name].append({"term": term, "count": count})
+    for name, counts in facets.items():
+        counts.sort(key=lambda c: (-c["count"], c["term"]))
+        del counts[FACET_LIMIT:]
+    return facets
+
+
+def delete_user(user_id: str):
+    delete_one(users_table, user_id)
+    u, ct = user_search_table, creator_terms_table
+
+    def write(conn):
+        conn.execute(delete(u).where(u.c.user_id == user_id))
+        conn.execute(delete(ct).where(ct.c.user_id == user_id))
+
+    run_write(write)
+
+
+def _count_follower(conn, user_id: str, delta: int) -> None:
+    fc = follower_counts_table
+    bumped = conn.execute(
+        update(fc)
+        .where(fc.c.user_id == user_id)
+        .values(follower_count=fc.c.follower_count + delta)
+    ).rowcount
+    if not bumped:
+        conn.execute(insert(fc).values(user_id=user_id, follower_count=max(delta, 0)))
+
+
+# Tables mirrored by the in-memory social graph.
+GRAPH_TABLES = (follows_table, blocks_table)
+_social_graph = SocialGraph()
+_graph_reload_lock = threading.Lock()
+_graph_checked_at = 0.0
+
+
+def _log_graph_change(conn, kind: str, source_id: str, target_id: str) -> int:
+    """Append a follow or block change to the log and trim its old end."""
+    g = graph_changes_table
+    change_id = next_id(conn, g)
+    conn.execute(
+        insert(g).values(id=change_id, kind=kind, source_id=source_id, target_id=target_id)
+    )
+    conn.execute(delete(g).where(g.c.id <= change_id - settings.social_graph_log_size))
+    return change_id
+
+
+def _last_graph_change(conn) -> int:
+    return conn.execute(select(func.coalesce(func.max(graph_changes_table.c.id), 0))).scalar()
+
+
+def load_social_graph() -> None:
+    """Build the in-memory follow and block graph from the tables."""
+    with _graph_reload_lock:
+        with engine.connect() as conn:
+            position = _last_graph_change(conn)
+            _social_graph.load(conn, position)
+    _catch_up_graph()
+
+
+def _catch_up_graph() -> None:
+    """Replay other processes' logged changes; reload if they were trimmed."""
+    g = graph_changes_table
+    position = _social_graph.position
+    stmt = select(g.c.id, g.c.kind, g.c.source_id, g.c.target_id).where(g.c.id > position)
+    with engine.connect() as conn:
+        changes = conn.execute(stmt.order_by(g.c.id)).fetchall()
+    if changes and changes[0].id != position + 1:
+        load_social_graph()
+    else:
+        _social_graph.catch_up(changes)
+
+
+def _graph():
+    """The social graph, caught up first with other processes' writes; None
+    until it has been loaded.
+
+    The change log is polled at most every ``CACHE_POLL_INTERVAL_MS``, as
+    the row cache polls its versions.
+    """
+    global _graph_checked_at
+    if not _social_graph.loaded:
+        return None
+    now = time.monotonic()
+    if now - _graph_checked_at >= settings.cache_poll_interval_ms / 1000:
+        _graph_checked_at = now
+        with engine.connect() as conn:
+            latest = _last_graph_change(conn)
+        if latest > _social_graph.position:
+            _catch_up_graph()
+    return _social_graph
+
+
+def follow(follower_id: str, followee_id: str) -> bool:
+    """Record the follow; False if it already existed."""
+
+    def write(conn):
+        if not insert_edge(conn, follows_table, follower_id, followee_id):
+            return None
+        _count_follower(conn, followee_id, 1)
+        return _log_graph_change(conn, "follow", follower_id, followee_id)
+
+    change_id, _ = write_tables(GRAPH_TABLES, write)
+    if change_id is None:
+        return False
+    _social_graph.apply(change_id, "follow", follower_id, followee_id)
+    return True
+
+
+def unfollow(follower_id: str, followee_id: str) -> bool:
+    def write(conn):
+        if not delete_edge(conn, follows_table, follower_id, followee_id):
+            return None
+        _count_follower(conn, followee_id, -1)
+        return _log_graph_change(conn, "unfollow", follower_id, followee_id)
+
+    change_id, _ = write_tables(GRAPH_TABLES, write)
+    if change_id is None:
+        return False
+    _social_graph.apply(change_id, "unfollow", follower_id, followee_id)
+    return True
+
+
+def is_following(follower_id: str, followee_id: str) -> bool:
+    graph = _graph()
+    if graph is not None:
+        return graph.is_following(follower_id, followee_id)
+    return edge_exists(follows_table, follower_id, followee_id)
+
+
+def count_followers(user_id: str) -> int:
+    graph = _graph()
+    if graph is not None:
+        return graph.follower_count(user_id)
+    return count_edges(follows_table, "followee_id", user_id)
+
+
+def count_following(user_id: str) -> int:
+    graph = _graph()
+    if graph is not None:
+        return graph.following_count(user_id)
+    return count_edges(follows_table, "follower_id", user_id)
+
+
+def follower_ids(user_id: str, after: str | None = None, limit: int | None = None):
+    graph = _graph()
+    if graph is not None:
+        return graph.followers(user_id, after, limit)
+    return list_edges(follows_table, "followee_id", user_id, after=after, limit=limit)
+
+
+def following_ids(user_id: str, after: str | None = None, limit: int | None = None):
+    graph = _graph()
+    if graph is not None:
+        return graph.following(user_id, after, limit)
+    return list_edges(follows_table, "follower_id", user_id, after=after, limit=limit)
+
+
+def mutual_follower_ids(
+    user_id: str, my_id: str, after: str | None = None, limit: int | None = None
+):
+    """Followers of ``user_id`` that ``my_id`` follows."""
+    graph = _graph()
+    if graph is not None:
+        return graph.mutual_followers(user_id, my_id, after, limit)
+    mine = select(follows_table.c.followee_id).where(follows_table.c.follower_id == my_id)
+    return list_edges(
+        follows_table,
+        "followee_id",
+        user_id,
+        follows_table.c.follower_id.in_(mine),
+        after=after,
+        limit=limit,
+    )
+
+
+def most_followed_ids(limit: int) -> list[str]:
+    """The follower-count leaderboard, read off its index."""
+    fc = follower_counts_table
+    stmt = (
+        select(fc.c.user_id)
+        .where(fc.c.follower_count > 0)
+        .order_by(fc.c.follower_count.desc(), fc.c.user_id)
+        .limit(limit)
+    )
+    with engine.connect() as conn:
+        return list(conn.execute(stmt).scalars())
+
+
+def _not_followed_or_blocked(user, other):
+    """SQL conditions: ``user`` neither follows ``other`` nor has a block
+    with them in either direction."""
+    f, b = follows_table, blocks_table
+    return (
+        ~exists().where(f.c.follower_id == user, f.c.followee_id == other),
+        ~exists().where(b.c.blocker_id == user, b.c.blocked_id == other),
+        ~exists().where(b.c.blocker_id == other, b.c.blocked_id == user),
+    )
+
+
+def refresh_suggestions(batch_size: int = 500) -> None:
+    """Recompute "people you may know" for every user who follows anyone.
+
+    Candidates are followees of the user's followees, ranked by how many
+    of the user's followees follow them. Users are processed in batches,
+    one write transaction each, so the job never holds the writer long.
+    """
+    s = suggestions_table
+    f1, f2 = follows_table.alias("f1"), follows_table.alias("f2")
+    run_write(
+        lambda conn: conn.execute(
+            delete(s).where(s.c.user_id.notin_(select(follows_table.c.follower_id)))
+        )
+    )
+    after = None
+    while True:
+        stmt = select(follows_table.c.follower_id.distinct()).order_by(
+            follows_table.c.follower_id
+        )
+        if after is not None:
+            stmt = stmt.where(follows_table.c.follower_id > after)
+        with engine.connect() as conn:
+            batch = list(conn.execute(stmt.limit(batch_size)).scalars())
+        if not batch:
+            return
+        after = batch[-1]
+        mutual = func.count().label("mutual_count")
+        candidates = (
+            select(
+                f1.c.follower_id.label("user_id"),
+                f2.c.followee_id.label("suggested_id"),
+                mutual,
+            )
+            .join(f2, f2.c.follower_id == f1.c.followee_id)
+            .where(
+                f1.c.follower_id.in_(batch),
+                f2.c.followee_id != f1.c.follower_id,
+                *_not_followed_or_blocked(f1.c.follower_id, f2.c.followee_id),
+            )
+            .group_by(f1.c.follower_id, f2.c.followee_id)
+            .subquery()
+        )
+        rank = func.row_number().over(
+            partition_by=candidates.c.user_id,
+            order_by=(candidates.c.mutual_count.desc(), candidates.c.suggested_id),
+        )
+        ranked = select(candidates, rank.label("rank")).subquery()
+        top = select(ranked.c.user_id, ranked.c.suggested_id, ranked.c.mutual_count).where(
+            ranked.c.rank <= settings.suggestions_per_user
+        )
+
+        def write(conn, batch=batch, top=top):
+            conn.execute(delete(s).where(s.c.user_id.in_(batch)))
+            conn.execute(
+                insert(s).from_select(["user_id", "suggested_id", "mutual_count"], top)
+            )
+
+        run_write(write)
+
+
+def suggested_ids(user_id: str, limit: int) -> list[tuple[str, int]]:
+    """``(user_id, mutual_count)`` of the stored suggestions for ``user_id``,
+    skipping anyone followed or blocked since the last batch run."""
+    s = suggestions_table
+    stmt = (
+        select(s.c.suggested_id, s.c.mutual_count)
+        .where(s.c.user_id == user_id, *_not_followed_or_blocked(user_id, s.c.suggested_id))
+        .order_by(s.c.mutual_count.desc(), s.c.suggested_id)
+        .limit(limit)
+    )
+    with engine.connect() as conn:
+        return [tuple(row) for row in conn.execute(stmt)]
+
+
+def block(blocker_id: str, blocked_id: str) -> bool:
+    """Record the block, drop the blocker's follow of the target and take
+    each user's posts out of the other's timeline."""
+    t = timelines_table
+
+    def write(conn):
+        if delete_edge(conn, follows_table, blocker_id, blocked_id):
+            _count_follower(conn, blocked_id, -1)
+        for reader, author in ((blocker_id, blocked_id), (blocked_id, blocker_id)):
+            conn.execute(delete(t).where(t.c.user_id == reader, t.c.author_id == author))
+        added = insert_edge(conn, blocks_table, blocker_id, blocked_id)
+        return added, _log_graph_change(conn, "block", blocker_id, blocked_id)
+
+    (added, change_id), _ = write_tables(GRAPH_TABLES, write)
+    _social_graph.apply(change_id, "block", blocker_id, blocked_id)
+    return added
+
+
+def unblock(blocker_id: str, blocked_id: str) -> bool:
+    def write(conn):
+        if not delete_edge(conn, blocks_table, blocker_id, blocked_id):
+            return None
+        return _log_graph_change(conn, "unblock", blocker_id, blocked_id)
+
+    change_id, _ = write_tables(GRAPH_TABLES, write)
+    if change_id is None:
+        return False
+    _social_graph.apply(change_id, "unblock", blocker_id, blocked_id)
+    return True
+
+
+def is_blocked(user_id: str, other_id: str) -> bool:
+    """True if either user blocks the other; two primary-key probes."""
+    graph = _graph()
+    if graph is not None:
+        return graph.is_blocked(user_id, other_id)
+    b = blocks_table
+    stmt = select(b.c.blocker_id).where(
+        or_(
+            and_(b.c.blocker_id == user_id, b.c.blocked_id == other_id),
+            and_(b.c.blocker_id == other_id, b.c.blocked_id == user_id),
+        )
+    ).limit(1)
+    with engine.connect() as conn:
+        return conn.execute(stmt).first() is not None
+
+
+def has_blocked(blocker_id: str, blocked_id: str) -> bool:
+    graph = _graph()
+    if graph is not None:
+        return graph.has_blocked(blocker_id, blocked_id)
+    return edge_exists(blocks_table, blocker_id, blocked_id)
+
+
+def blocked_ids(user_id: str, after: str | None = None, limit: int | None = None):
+    """Users ``user_id`` blocked, from the primary key."""
+    graph = _graph()
+    if graph is not None:
+        return graph.blocks(user_id, after, limit)
+    return list_edges(blocks_table, "blocker_id", user_id, after=after, limit=limit)
+
+
+def blocker_ids(user_id: str, after: str | None = None, limit: int | None = None):
+    """Users who blocked ``user_id``, from the reverse index."""
+    graph = _graph()
+    if graph is not None:
+        return graph.blocked_by(user_id, after, limit)
+    return list_edges(blocks_table, "blocked_id", user_id, after=after, limit=limit)
+
+
+def block_related_ids(user_id: str) -> set[str]:
+    """Everyone ``user_id`` blocked or was blocked by, in one query.
+
+    Feeds and other listings drop these users' content.
+    """
+    graph = _graph()
+    if graph is not None:
+        return graph.block_related(user_id)
+    b = blocks_table
+    stmt = union(
+        select(b.c.blocked_id).where(b.c.blocker_id == user_id),
+        select(b.c.blocker_id).where(b.c.blocked_id == user_id),
+    )
+    with engine.connect() as conn:
+        return set(conn.execute(stmt).scalars())
+
+
+def add_interest(user_id: str, target_id: str) -> bool:
+    return add_edge(interests_table, user_id, target_id)
+
+
+def remove_interest(user_id: str, target_id: str) -> bool:
+    return remove_edge(interests_table, user_id, target_id)
+
+
+def is_interested(user_id: str, target_id: str) -> bool:
+    return edge_exists(interests_table, user_id, target_id)
+
+
+def user_relations(user_id: str, viewer_id: str | None = None) -> dict:
+    """Relation counts user responses carry alongside the stored profile,
+    and with ``viewer_id`` whether the viewer follows, is interested in
+    or blocks the user. The lists themselves are paged by their endpoints."""
+    relations = {
+        "follower_count": count_followers(user_id),
+        "following_count": count_following(user_id),
+    }
+    if viewer_id:
+        relations["followed"] = is_following(viewer_id, user_id)
+        relations["interested"] = is_interested(viewer_id, user_id)
+        relations["blocked"] = has_blocked(viewer_id, user_id)
+    return relations
+
+
 def load_posts():
     return load_table(posts_table)
 
@@ -40,8 +649,399 @@ def get_post(post_id: int):
     return get_item(posts_table, "id", post_id)
 
 
-def update_post(post: dict):
-    update_item(posts_table, "id", post["id"], post)
+def get_posts(post_ids):
+    return get_items(posts_table, post_ids)
+
+
+def next_post_id() -> int:
+    return allocate_id(posts_table)
+
+
+def insert_post(post: dict):
+    insert_one(posts_table, post)
+
+
+def publish_post(post: dict):
+    """Insert a new post, fan it out and index its tags in one transaction."""
+
+    def on_insert(conn):
+        _fan_out_post(conn, post)
+        _index_post_tags(conn, post)
+
+    insert_one(posts_table, post, on_insert=on_insert)
+
+
+def update_post(post_id: int, fields: dict):
+    """Change ``fields`` of a post; its counters are left to their writes."""
+    return update_fields(posts_table, post_id, fields)
+
+
+def upsert_posts(posts):
+    upsert_many(posts_table, posts)
+
+
+def delete_post(post_id: int):
+    delete_one(posts_table, post_id)
+
+
+def query_posts(
+    author_ids=None,
+    exclude_authors=None,
+    category: str | None = None,
+    anonymous: bool | None = None,
+    before=None,
+    after=None,
+    limit: int | None = None,
+):
+    """Return a page of posts newest first with filtering done in SQL."""
+    conditions = []
+    if author_ids is not None:
+        conditions.append(posts_table.c.author_id.in_(list(author_ids)))
+    if exclude_authors:
+        conditions.append(posts_table.c.author_id.notin_(list(exclude_authors)))
+    if category:
+        conditions.append(posts_table.c.category == category)
+    if anonymous is not None:
+        conditions.append(posts_table.c.anonymous == anonymous)
+    return select_page(
+        posts_table,
+        *conditions,
+        before=before,
+        after=after,
+        limit=limit,
+    )
+
+
+def _is_pull_author(conn, author_id: str) -> bool:
+    stmt = select(pull_authors_table.c.user_id).where(pull_authors_table.c.user_id == author_id)
+    return conn.execute(stmt).first() is not None
+
+
+def _trim_timelines(conn, readers) -> None:
+    """Keep only the ``TIMELINE_MAX_ENTRIES`` newest entries of each reader's
+    timeline; a probe of that many index entries per reader."""
+    t = timelines_table
+    reader = bindparam("_reader")
+    older = (
+        select(t.c.post_id)
+        .where(t.c.user_id == reader)
+        .order_by(t.c.created_at.desc(), t.c.post_id.desc())
+        .offset(settings.timeline_max_entries)
+    )
+    stmt = delete(t).where(t.c.user_id == reader, t.c.post_id.in_(older))
+    conn.execute(stmt, [{"_reader": r} for r in readers])
+
+
+def fan_out_post(post: dict) -> None:
+    """Push a new post into its author's and its followers' home timelines.
+
+    Authors with more than ``TIMELINE_FANOUT_MAX_FOLLOWERS`` followers are
+    recorded as pull authors instead; readers merge their posts in.
+    """
+    run_write(lambda conn: _fan_out_post(conn, post))
+
+
+def _fan_out_post(conn, post: dict) -> None:
+    t, fc = timelines_table, follower_counts_table
+    author_id = post["author_id"]
+    entry = {"post_id": post["id"], "author_id": author_id, "created_at": post["created_at"]}
+    readers = [author_id]
+    if not _is_pull_author(conn, author_id):
+        followers = conn.execute(
+            select(fc.c.follower_count).where(fc.c.user_id == author_id)
+        ).scalar()
+        if (followers or 0) > settings.timeline_fanout_max_followers:
+            conn.execute(insert(pull_authors_table).values(user_id=author_id))
+        else:
+            readers += conn.execute(
+                select(follows_table.c.follower_id).where(
+                    follows_table.c.followee_id == author_id,
+                    follows_table.c.follower_id != author_id,
+                )
+            ).scalars()
+    conn.execute(insert(t), [{"user_id": r, **entry} for r in readers])
+    _trim_timelines(conn, readers)
+
+
+def backfill_timeline(user_id: str, author_id: str) -> None:
+    """Copy the author's latest posts into ``user_id``'s timeline after a follow."""
+    t = timelines_table
+    present = select(t.c.post_id).where(t.c.user_id == user_id, t.c.author_id == author_id)
+    recent = (
+        select(literal(user_id), posts_table.c.id, posts_table.c.author_id, posts_table.c.created_at)
+        .where(posts_table.c.author_id == author_id, posts_table.c.id.notin_(present))
+        .order_by(posts_table.c.created_at.desc(), posts_table.c.id.desc())
+        .limit(settings.timeline_backfill)
+    )
+
+    def write(conn):
+        if not _is_pull_author(conn, author_id):
+            conn.execute(
+                insert(t).from_select(["user_id", "post_id", "author_id", "created_at"], recent)
+            )
+            _trim_timelines(conn, [user_id])
+
+    run_write(write)
+
+
+def prune_timeline(user_id: str, author_id: str) -> None:
+    """Drop the author's posts from ``user_id``'s timeline."""
+    t = timelines_table
+    stmt = delete(t).where(t.c.user_id == user_id, t.c.author_id == author_id)
+    run_write(lambda conn: conn.execute(stmt))
+
+
+def pull_followee_ids(user_id: str) -> list[str]:
+    """Followees of ``user_id`` whose posts are not fanned out."""
+    f = follows_table
+    stmt = (
+        select(f.c.followee_id)
+        .join(pull_authors_table, pull_authors_table.c.user_id == f.c.followee_id)
+        .where(f.c.follower_id == user_id)
+    )
+    with engine.connect() as conn:
+        return list(conn.execute(stmt).scalars())
+
+
+def query_home_timeline(
+    user_id: str,
+    exclude_authors=None,
+    category: str | None = None,
+    anonymous: bool | None = None,
+    before=None,
+    after=None,
+    limit: int | None = None,
+):
+    """A page of ``user_id``'s home timeline, newest first.
+
+    The page comes from the materialized timeline and is merged with the
+    same page of posts by followed pull authors.
+    """
+    t = timelines_table
+    conditions = [t.c.user_id == user_id]
+    if exclude_authors:
+        conditions.append(t.c.author_id.notin_(list(exclude_authors)))
+    if category:
+        conditions.append(posts_table.c.category == category)
+    if anonymous is not None:
+        conditions.append(posts_table.c.anonymous == anonymous)
+    posts = select_page(
+        posts_table,
+        *conditions,
+        before=before,
+        after=after,
+        limit=limit,
+        join=posts_table.join(t, t.c.post_id == posts_table.c.id),
+        position=(t.c.created_at, t.c.post_id),
+    )
+    pulled = set(pull_followee_ids(user_id)) - set(exclude_authors or ())
+    if not pulled:
+        return posts
+    posts += query_posts(
+        author_ids=pulled,
+        category=category,
+        anonymous=anonymous,
+        before=before,
+        after=after,
+        limit=limit,
+    )
+    merged = sorted(
+        {p["id"]: p for p in posts}.values(),
+        key=lambda p: (p["created_at"], p["id"]),
+        reverse=True,
+    )
+    if limit is None:
+        return merged
+    return merged[-limit:] if after is not None else merged[:limit]
+
+
+def author_has_posts(author_id: str) -> bool:
+    return row_exists(posts_table, posts_table.c.author_id == author_id)
+
+
+def index_post_tags(post: dict) -> None:
+    """Add a new post to the tag index and its tags' popularity counters."""
+    run_write(lambda conn: _index_post_tags(conn, post))
+
+
+def _index_post_tags(conn, post: dict) -> None:
+    tags = sorted(set(post.get("tags") or []))
+    if not tags:
+        return
+    pt, tc = post_tags_table, tag_counts_table
+    now = time.time()
+    conn.execute(
+        insert(pt),
+        [{"tag": t, "post_id": post["id"], "created_at": post["created_at"]} for t in tags],
+    )
+    for span, bucket in tag_buckets(post["created_at"], now):
+        for tag in tags:
+            key = (tc.c.span == span, tc.c.bucket == bucket, tc.c.tag == tag)
+            bumped = conn.execute(
+                update(tc).where(*key).values(post_count=tc.c.post_count + 1)
+            ).rowcount
+            if not bumped:
+                conn.execute(insert(tc).values(span=span, bucket=bucket, tag=tag, post_count=1))
+    for span, (width, count) in TAG_WINDOWS.items():
+        oldest = int(now // width) - count + 1
+        conn.execute(delete(tc).where(tc.c.span == span, tc.c.bucket < oldest))
+
+
+def popular_tags(window: str = ALL_TIME, limit: int = 10) -> list[dict]:
+    """Most used tags in ``window``, read from the counters only."""
+    tc = tag_counts_table
+    if window == ALL_TIME:
+        stmt = (
+            select(tc.c.tag, tc.c.post_count)
+            .where(tc.c.span == ALL_TIME, tc.c.bucket == 0)
+            .order_by(tc.c.post_count.desc(), tc.c.tag)
+            .limit(limit)
+        )
+    else:
+        width, count = TAG_WINDOWS[window]
+        oldest = int(time.time() // width) - count + 1
+        total = func.sum(tc.c.post_count).label("post_count")
+        stmt = (
+            select(tc.c.tag, total)
+            .where(tc.c.span == window, tc.c.bucket >= oldest)
+            .group_by(tc.c.tag)
+            .order_by(total.desc(), tc.c.tag)
+            .limit(limit)
+        )
+    with engine.connect() as conn:
+        return [{"name": tag, "count": n} for tag, n in conn.execute(stmt)]
+
+
+def query_search_posts(query: str, before=None, after=None, limit: int | None = None):
+    """Posts matching ``query``, best first, as ``(item, position)`` pairs."""
+    return search.search_posts(query, before=before, after=after, limit=limit)
+
+
+def query_tag_posts(tag: str, before=None, after=None, limit: int | None = None):
+    """A page of the posts tagged ``tag``, newest first, from the tag index."""
+    pt = post_tags_table
+    return select_page(
+        posts_table,
+        pt.c.tag == tag,
+        before=before,
+        after=after,
+        limit=limit,
+        join=posts_table.join(pt, pt.c.post_id == posts_table.c.id),
+        position=(pt.c.created_at, pt.c.post_id),
+    )
+
+
+def query_trending_posts(
+    limit: int = 10, category: str | None = None, tag: str | None = None
+):
+    """Top posts by decayed engagement, overall or within a category or tag."""
+    scope = trending.ALL
+    if category:
+        scope = f"category:{category}"
+    elif tag:
+        scope = f"tag:{tag}"
+    with engine.connect() as conn:
+        ids = trending.top_post_ids(conn, scope, limit)
+    return get_items(posts_table, ids)
+
+
+def with_engagement(posts, viewer_id: str | None = None):
+    """Copies of ``posts`` with their like and retweet counts and, for
+    ``viewer_id``, whether that user liked and retweeted each.
+
+    The counts are kept on the posts; the flags are primary-key probes,
+    so a card costs the same however popular the post is.
+    """
+    posts = list(posts)
+    liked = retweeted = set()
+    if viewer_id is not None and posts:
+        ids = [p["id"] for p in posts]
+        with engine.connect() as conn:
+            liked, retweeted = [
+                set(
+                    conn.execute(
+                        select(t.c.post_id).where(t.c.user_id == viewer_id, t.c.post_id.in_(ids))
+                    ).scalars()
+                )
+                for t in (likes_table, retweets_table)
+            ]
+    return [
+        p
+        | {
+            "like_count": p.get("like_count") or 0,
+            "retweet_count": p.get("retweet_count") or 0,
+            "liked": p["id"] in liked,
+            "retweeted": p["id"] in retweeted,
+        }
+        for p in posts
+    ]
+
+
+def set_like(post_id: int, user_id: str, liked: bool):
+    """Like or unlike; returns the post with its new ``like_count`` and
+    whether anything changed."""
+    return set_counted_edge(
+        likes_table, post_id, user_id, liked, posts_table, "like_count", trending.record
+    )
+
+
+def set_retweet(post_id: int, user_id: str, retweeted: bool):
+    return set_counted_edge(
+        retweets_table,
+        post_id,
+        user_id,
+        retweeted,
+        posts_table,
+        "retweet_count",
+        trending.record,
+    )
+
+
+def liker_ids(post_id: int):
+    return group_edges(likes_table, "post_id", [post_id])[post_id]
+
+
+def _query_posts_by_edge(table, user_id: str, before=None, after=None, limit=None):
+    return select_page(
+        posts_table,
+        table.c.user_id == user_id,
+        before=before,
+        after=after,
+        limit=limit,
+        join=posts_table.join(table, table.c.post_id == posts_table.c.id),
+    )
+
+
+def query_bookmarked_posts(user_id: str, before=None, after=None, limit=None):
+    """A page of the posts ``user_id`` bookmarked, newest post first."""
+    return _query_posts_by_edge(bookmarks_table, user_id, before, after, limit)
+
+
+def query_retweeted_posts(user_id: str, before=None, after=None, limit=None):
+    return _query_posts_by_edge(retweets_table, user_id, before, after, limit)
+
+
+def add_bookmark(post_id: int, user_id: str) -> bool:
+    return add_edge(bookmarks_table, post_id, user_id)
+
+
+def remove_bookmark(post_id: int, user_id: str) -> bool:
+    return remove_edge(bookmarks_table, post_id, user_id)
+
+
+def bookmarked_among(user_id: str, post_ids) -> list[int]:
+    """Which of ``post_ids`` ``user_id`` bookmarked, by primary-key probes."""
+    b = bookmarks_table
+    post_ids = list(post_ids)
+    if not post_ids:
+        return []
+    stmt = select(b.c.post_id).where(b.c.user_id == user_id, b.c.post_id.in_(post_ids))
+    with engine.connect() as conn:
+        return sorted(conn.execute(stmt).scalars())
+
+
+def count_bookmarks(user_id: str) -> int:
+    return count_edges(bookmarks_table, "user_id", user_id)
 
 
 def load_comments():
@@ -52,6 +1052,63 @@ def save_comments(comments):
     save_table(comments_table, comments, "id")
 
 
+def get_comment(comment_id: int):
+    return get_item(comments_table, "id", comment_id)
+
+
+def get_comments(comment_ids):
+    return get_items(comments_table, comment_ids)
+
+
+def next_comment_id() -> int:
+    return allocate_id(comments_table)
+
+
+def insert_comment(comment: dict):
+    """Store a comment and count it on its post; returns the updated post."""
+    return insert_counted(
+        comments_table, comment, posts_table, "comment_count", comment["post_id"]
+    )
+
+
+def update_comment(comment: dict):
+    update_one(comments_table, comment)
+
+
+def upsert_comments(comments):
+    upsert_many(comments_table, comments)
+
+
+def delete_comment(comment_id: int):
+    delete_one(comments_table, comment_id)
+
+
+def list_post_comments(post_id: int, after: int | None = None, limit: int | None = None):
+    """A post's comments oldest first; ``after`` is the last id of the
+    previous page."""
+    conditions = [comments_table.c.post_id == post_id]
+    if after is not None:
+        conditions.append(comments_table.c.id > after)
+    return select_rows(
+        comments_table,
+        *conditions,
+        order_by=(comments_table.c.id,),
+        limit=limit,
+    )
+
+
+def comment_exists(comment_id: int, post_id: int) -> bool:
+    return row_exists(
+        comments_table,
+        comments_table.c.id == comment_id,
+        comments_table.c.post_id == post_id,
+    )
+
+
+def author_has_comments(author_id: str) -> bool:
+    return row_exists(comments_table, comments_table.c.author_id == author_id)
+
+
 def load_messages():
     return load_table(messages_table)
 
@@ -60,6 +1117,285 @@ def save_messages(messages):
     save_table(messages_table, messages, "id")
 
 
+def get_message(message_id: int):
+    return get_item(messages_table, "id", message_id)
+
+
+def get_messages(message_ids):
+    return get_items(messages_table, message_ids)
+
+
+def next_message_id() -> int:
+    return allocate_id(messages_table)
+
+
+def _record_in_inboxes(conn, message: dict) -> None:
+    """Make ``message`` the latest of its conversation in both inboxes and
+    count it as unread for the receiver."""
+    c = conversations_table
+    for row in conversation_rows(message):
+        unread = int(row["user_id"] != message["sender_id"])
+        key = (c.c.user_id == row["user_id"], c.c.partner_id == row["partner_id"])
+        bumped = conn.execute(
+            update(c).where(*key).values(unread_count=c.c.unread_count + unread)
+        ).rowcount
+        if not bumped:
+            conn.execute(insert(c).values(row | {"unread_count": unread}))
+            continue
+        # A message committed after a newer one must not replace it.
+        last = {k: v for k, v in row.items() if k.startswith("last_") or k == "preview"}
+        conn.execute(
+            update(c).where(*key, c.c.last_message_id < message["id"]).values(last)
+        )
+
+
+def insert_message(message: dict):
+    """Store a direct message and update both participants' inboxes."""
+    message.setdefault(
+        "conversation_id", conversation_id(message["sender_id"], message["receiver_id"])
+    )
+    insert_one(messages_table, message, lambda conn: _record_in_inboxes(conn, message))
+
+
+def update_message(message: dict):
+    update_one(messages_table, message)
+
+
+def upsert_messages(messages):
+    upsert_many(messages_table, messages)
+
+
+def delete_message(message_id: int):
+    delete_one(messages_table, message_id)
+
+
+def _message_page(table, condition, before_id=None, since_id=None, limit=None):
+    """Messages matching ``condition``, oldest first, read off an index
+    ending in ``id``.
+
+    With ``since_id`` the page continues after that message (polling for
+    new ones); otherwise it holds the latest ``limit`` before ``before_id``.
+    """
+    conditions = [condition]
+    if since_id is not None:
+        conditions.append(table.c.id > since_id)
+    if before_id is not None:
+        conditions.append(table.c.id < before_id)
+    if since_id is not None or limit is None:
+        return select_rows(table, *conditions, order_by=(table.c.id,), limit=limit)
+    latest = select_rows(table, *conditions, order_by=(table.c.id.desc(),), limit=limit)
+    return latest[::-1]
+
+
+def list_conversation(
+    user_id: str,
+    other_id: str,
+    before_id: int | None = None,
+    since_id: int | None = None,
+    limit: int | None = None,
+):
+    """Messages between two users from the conversation index; see
+    ``_message_page`` for the paging."""
+    return _message_page(
+        messages_table,
+        messages_table.c.conversation_id == conversation_id(user_id, other_id),
+        before_id,
+        since_id,
+        limit,
+    )
+
+
+def query_conversations(user_id: str, before=None, after=None, limit: int | None = None):
+    """A page of ``user_id``'s inbox, latest message first, from the
+    summary table; partner names come from the typeahead table."""
+    c, u = conversations_table, user_search_table
+    position = tuple_(c.c.last_at, c.c.last_message_id)
+    stmt = (
+        select(c, u.c.username, u.c.profile_image)
+        .select_from(c.outerjoin(u, u.c.user_id == c.c.partner_id))
+        .where(c.c.user_id == user_id)
+    )
+    if before is not None:
+        stmt = stmt.where(position < tuple_(*before))
+    if after is not None:
+        stmt = stmt.where(position > tuple_(*after))
+    order = (c.c.last_at, c.c.last_message_id)
+    if after is not None:
+        stmt = stmt.order_by(*order)
+    else:
+        stmt = stmt.order_by(*(col.desc() for col in order))
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    with engine.connect() as conn:
+        rows = conn.execute(stmt).all()
+    if after is not None:
+        rows.reverse()
+    return [
+        {
+            "partner_id": r.partner_id,
+            "username": r.username,
+            "profile_image": r.profile_image,
+            "last_message": {
+                "id": r.last_message_id,
+                "sender_id": r.last_sender_id,
+                "preview": r.preview,
+                "created_at": r.last_at,
+            },
+            "unread_count": r.unread_count,
+        }
+        for r in rows
+    ]
+
+
+def mark_conversation_read(user_id: str, partner_id: str) -> bool:
+    """Clear the unread count of one conversation; False if there is none."""
+    c = conversations_table
+    stmt = (
+        update(c)
+        .where(c.c.user_id == user_id, c.c.partner_id == partner_id)
+        .values(unread_count=0)
+    )
+    return run_write(lambda conn: conn.execute(stmt).rowcount > 0)
+
+
+# Latest distinct actors kept on a collapsed notification.
+NOTIFICATION_ACTORS = 3
+
+
+def _notification_group(kind: str, actor_id: str) -> str | None:
+    """Events sharing a group fold into one notification: any follows,
+    or messages from the same sender."""
+    if kind == "follow":
+        return "follow"
+    if kind == "message":
+        return f"message:{actor_id}"
+    return None
+
+
+def _counts_actors(kind: str) -> bool:
+    """Whether a folded notification counts distinct actors (people who
+    followed) rather than events (one sender's messages)."""
+    return kind != "message"
+
+
+def notify(user_id: str, kind: str, actor_id: str, message_id: int | None = None) -> None:
+    """Notify ``user_id`` of an event, folding it into the latest unread
+    notification of its group from within the collapse window."""
+    n, na = notifications_table, notification_actors_table
+    now = datetime.utcnow()
+    group_key = _notification_group(kind, actor_id)
+    cutoff = (now - timedelta(hours=settings.notification_collapse_hours)).isoformat()
+    track = group_key is not None and _counts_actors(kind)
+    actor_key = and_(na.c.user_id == user_id, na.c.group_key == group_key)
+
+    def add_actor(conn) -> bool:
+        seen = conn.execute(select(na.c.actor_id).where(actor_key, na.c.actor_id == actor_id))
+        if seen.first():
+            return False
+        conn.execute(
+            insert(na).values(
+                user_id=user_id, group_key=group_key, actor_id=actor_id, created_at=now.isoformat()
+            )
+        )
+        return True
+
+    def write(conn):
+        latest = None
+        if group_key is not None:
+            latest = conn.execute(
+                select(n.c.id, n.c.actors)
+                .where(
+                    n.c.user_id == user_id,
+                    n.c.read.is_(False),
+                    n.c.group_key == group_key,
+                    n.c.created_at >= cutoff,
+                )
+                .order_by(n.c.id.desc())
+                .limit(1)
+            ).first()
+        event = {
+            # A fresh id moves a folded notification back to the top.
+            "id": next_id(conn, n),
+            "actor_id": actor_id,
+            "message_id": message_id,
+            "created_at": now.isoformat(),
+        }
+        if latest is None:
+            if track:
+                # A new notification starts counting its actors afresh.
+                conn.execute(delete(na).where(actor_key))
+                add_actor(conn)
+            first = {"user_id": user_id, "type": kind, "group_key": group_key, "count": 1}
+            conn.execute(insert(n).values(event | first | {"actors": [actor_id], "read": False}))
+            return
+        counted = add_actor(conn) if track else True
+        actors = [actor_id] + [a for a in latest.actors or [] if a != actor_id]
+        values = event | {"actors": actors[:NOTIFICATION_ACTORS]}
+        if counted:
+            values["count"] = n.c.count + 1
+        conn.execute(update(n).where(n.c.id == latest.id).values(values))
+
+    run_write(write)
+
+
+def query_notifications(
+    user_id: str, before_id: int | None = None, limit: int | None = None
+) -> list[dict]:
+    """A page of ``user_id``'s notifications, newest first."""
+    n = notifications_table
+    stmt = select(n).where(n.c.user_id == user_id).order_by(n.c.id.desc())
+    if before_id is not None:
+        stmt = stmt.where(n.c.id < before_id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    with engine.connect() as conn:
+        rows = conn.execute(stmt).all()
+    return [
+        {
+            "id": r.id,
+            "type": r.type,
+            "from": r.actor_id,
+            "actors": r.actors or [],
+            "count": r.count,
+            "message_id": r.message_id,
+            "read": r.read,
+            "created_at": r.created_at,
+        }
+        for r in rows
+    ]
+
+
+def count_unread_notifications(user_id: str) -> int:
+    n = notifications_table
+    stmt = select(func.count()).where(n.c.user_id == user_id, n.c.read.is_(False))
+    with engine.connect() as conn:
+        return conn.execute(stmt).scalar()
+
+
+def mark_notifications_read(user_id: str, up_to_id: int | None = None) -> int:
+    """Mark ``user_id``'s unread notifications read, those up to ``up_to_id``
+    if given; returns how many changed."""
+    n = notifications_table
+    conditions = [n.c.user_id == user_id, n.c.read.is_(False)]
+    if up_to_id is not None:
+        conditions.append(n.c.id <= up_to_id)
+    stmt = update(n).where(*conditions).values(read=True)
+    return run_write(lambda conn: conn.execute(stmt).rowcount)
+
+
+def compact_notifications() -> int:
+    """Delete notifications past the retention period; returns how many."""
+    n = notifications_table
+    cutoff = datetime.utcnow() - timedelta(days=settings.notification_retention_days)
+    na = notification_actors_table
+
+    def write(conn):
+        conn.execute(delete(na).where(na.c.created_at < cutoff.isoformat()))
+        return conn.execute(delete(n).where(n.c.created_at < cutoff.isoformat())).rowcount
+
+    return run_write(write)
+
+
 def load_reports():
     return load_table(reports_table)
 
@@ -68,6 +1404,44 @@ def save_reports(reports):
     save_table(reports_table, reports, "id")
 
 
+def get_report(report_id: int):
+    return get_item(reports_table, "id", report_id)
+
+
+def get_reports(report_ids):
+    return get_items(reports_table, report_ids)
+
+
+def next_report_id() -> int:
+    return allocate_id(reports_table)
+
+
+def insert_report(report: dict):
+    insert_one(reports_table, report)
+
+
+def update_report(report: dict):
+    update_one(reports_table, report)
+
+
+def upsert_reports(reports):
+    upsert_many(reports_table, reports)
+
+
+def delete_report(report_id: int):
+    delete_one(reports_table, report_id)
+
+
+def report_exists(target_type: str, target_id: int, reporter_id: str) -> bool:
+    r = reports_table.c
+    return row_exists(
+        reports_table,
+        r.target_type == target_type,
+        r.target_id == target_id,
+        r.reporter_id == reporter_id,
+    )
+
+
 def load_jobs():
     return load_table(jobs_table)
 
@@ -76,12 +1450,157 @@ def save_jobs(jobs):
     save_table(jobs_table, jobs, "id")
 
 
+def get_job(job_id: int):
+    return get_item(jobs_table, "id", job_id)
+
+
+def get_jobs(job_ids):
+    return get_items(jobs_table, job_ids)
+
+
+def next_job_id() -> int:
+    return allocate_id(jobs_table)
+
+
+def insert_job(job: dict):
+    insert_one(jobs_table, job)
+
+
+def update_job(job: dict):
+    update_one(jobs_table, job)
+
+
+def upsert_jobs(jobs):
+    upsert_many(jobs_table, jobs)
+
+
+def delete_job(job_id: int):
+    delete_one(jobs_table, job_id)
+
+
+def query_jobs(before=None, after=None, limit: int | None = None):
+    return select_page(jobs_table, before=before, after=after, limit=limit)
+
+
 def load_groups():
     return load_table(groups_table)
 
 
+# Group writes keep the membership index in the same transaction.
+GROUP_TABLES = (groups_table, group_members_table)
+
+
+def _set_group_members(conn, groups) -> None:
+    gm = group_members_table
+    conn.execute(delete(gm).where(gm.c.group_id.in_([g["id"] for g in groups])))
+    rows = group_member_rows(groups)
+    if rows:
+        conn.execute(insert(gm), rows)
+
+
+def _write_groups(op) -> None:
+    # Membership rarely changes; dropping the cached groups is simplest.
+    write_tables(GROUP_TABLES, op, invalidate=True)
+
+
 def save_groups(groups):
-    save_table(groups_table, groups, "id")
+    """Persist the groups and their membership rows in one transaction.
+
+    Lists from ``load_groups`` write only the groups changed since loading;
+    any other iterable replaces every group.
+    """
+    gm = group_members_table
+    if not isinstance(groups, TrackedRows):
+        groups = list(groups)
+
+        def replace(conn):
+            conn.execute(delete(groups_table))
+            conn.execute(delete(gm))
+            if groups:
+                conn.execute(insert(groups_table), [build_record(groups_table, g) for g in groups])
+                _set_group_members(conn, groups)
+
+        _write_groups(replace)
+        return
+    changed, removed = groups.changes("id")
+    if not changed and not removed:
+        return
+    ids = [g["id"] for g in changed] + removed
+
+    def write(conn):
+        conn.execute(delete(groups_table).where(groups_table.c.id.in_(ids)))
+        if changed:
+            conn.execute(insert(groups_table), [build_record(groups_table, g) for g in changed])
+        _set_group_members(conn, changed + [{"id": k} for k in removed])
+
+    _write_groups(write)
+    groups.mark_saved("id")
+
+
+def get_group(group_id: int):
+    return get_item(groups_table, "id", group_id)
+
+
+def get_groups(group_ids):
+    return get_items(groups_table, group_ids)
+
+
+def next_group_id() -> int:
+    return allocate_id(groups_table)
+
+
+def insert_group(group: dict):
+    def write(conn):
+        conn.execute(insert(groups_table).values(build_record(groups_table, group)))
+        _set_group_members(conn, [group])
+
+    _write_groups(write)
+
+
+def update_group(group: dict):
+    stmt = (
+        update(groups_table)
+        .where(groups_table.c.id == group["id"])
+        .values(build_record(groups_table, group))
+    )
+
+    def write(conn):
+        conn.execute(stmt)
+        _set_group_members(conn, [group])
+
+    _write_groups(write)
+
+
+def upsert_groups(groups):
+    groups = list(groups)
+    if not groups:
+        return
+    ids = [g["id"] for g in groups]
+
+    def write(conn):
+        conn.execute(delete(groups_table).where(groups_table.c.id.in_(ids)))
+        conn.execute(insert(groups_table), [build_record(groups_table, g) for g in groups])
+        _set_group_members(conn, groups)
+
+    _write_groups(write)
+
+
+def delete_group(group_id: int):
+    def write(conn):
+        conn.execute(delete(groups_table).where(groups_table.c.id == group_id))
+        _set_group_members(conn, [{"id": group_id}])
+
+    _write_groups(write)
+
+
+def is_group_member(group_id: int, user_id: str) -> bool:
+    """Membership probe, answered from the row cache while it holds."""
+    return cached_edge_exists(group_members_table, group_id, user_id)
+
+
+def list_user_groups(user_id: str):
+    """The groups ``user_id`` belongs to, from the membership index."""
+    return get_groups(list_edges(group_members_table, "user_id", user_id))
 
 
 def load_group_messages():
@@ -92,6 +1611,50 @@ def save_group_messages(messages):
     save_table(group_messages_table, messages, "id")
 
 
+def get_group_message(message_id: int):
+    return get_item(group_messages_table, "id", message_id)
+
+
+def get_group_messages(message_ids):
+    return get_items(group_messages_table, message_ids)
+
+
+def next_group_message_id() -> int:
+    return allocate_id(group_messages_table)
+
+
+def insert_group_message(group_message: dict):
+    insert_one(group_messages_table, group_message)
+
+
+def update_group_message(group_message: dict):
+    update_one(group_messages_table, group_message)
+
+
+def upsert_group_messages(group_messages):
+    upsert_many(group_messages_table, group_messages)
+
+
+def delete_group_message(message_id: int):
+    delete_one(group_messages_table, message_id)
+
+
+def list_group_messages(
+    group_id: int,
+    before_id: int | None = None,
+    since_id: int | None = None,
+    limit: int | None = None,
+):
+    """A group's messages from the ``(group_id, id)`` index."""
+    return _message_page(
+        group_messages_table,
+        group_messages_table.c.group_id == group_id,
+        before_id,
+        since_id,
+        limit,
+    )
+
+
 def load_fan_posts():
     return load_table(fan_posts_table)
 
@@ -100,6 +1663,38 @@ def save_fan_posts(posts):
     save_table(fan_posts_table, posts, "id")
 
 
+def get_fan_post(post_id: int):
+    return get_item(fan_posts_table, "id", post_id)
+
+
+def get_fan_posts(post_ids):
+    return get_items(fan_posts_table, post_ids)
+
+
+def next_fan_post_id() -> int:
+    return allocate_id(fan_posts_table)
+
+
+def insert_fan_post(fan_post: dict):
+    insert_one(fan_posts_table, fan_post)
+
+
+def update_fan_post(fan_post: dict):
+    update_one(fan_posts_table, fan_post)
+
+
+def upsert_fan_posts(fan_posts):
+    upsert_many(fan_posts_table, fan_posts)
+
+
+def delete_fan_post(post_id: int):
+    delete_one(fan_posts_table, post_id)
+
+
+def query_fan_posts(before=None, after=None, limit: int | None = None):
+    return select_page(fan_posts_table, before=before, after=after, limit=limit)
+
+
 def load_appeals():
     return load_table(appeals_table)
 
@@ -108,6 +1703,46 @@ def save_appeals(appeals):
     save_table(appeals_table, appeals, "id")
 
 
+def get_appeal(appeal_id: int):
+    return get_item(appeals_table, "id", appeal_id)
+
+
+def get_appeals(appeal_ids):
+    return get_items(appeals_table, appeal_ids)
+
+
+def next_appeal_id() -> int:
+    return allocate_id(appeals_table)
+
+
+def insert_appeal(appeal: dict):
+    insert_one(appeals_table, appeal)
+
+
+def update_appeal(appeal: dict):
+    update_one(appeals_table, appeal)
+
+
+def upsert_appeals(appeals):
+    upsert_many(appeals_table, appeals)
+
+
+def delete_appeal(appeal_id: int):
+    delete_one(appeals_table, appeal_id)
+
+
+def query_appeals(before=None, after=None, limit: int | None = None):
+    return select_page(appeals_table, before=before, after=after, limit=limit)
+
+
+def has_pending_appeal(user_id: str) -> bool:
+    return row_exists(
+        appeals_table,
+        appeals_table.c.user_id == user_id,
+        appeals_table.c.status == "pending",
+    )
+
+
 def load_materials():
     return load_table(materials_table)
 
@@ -116,6 +1751,62 @@ def save_materials(materials):
     save_table(materials_table, materials, "id")
 
 
+def get_material(material_id: int):
+    return get_item(materials_table, "id", material_id)
+
+
+def get_materials(material_ids):
+    return get_items(materials_table, material_ids)
+
+
+def next_material_id() -> int:
+    return allocate_id(materials_table)
+
+
+def insert_material(material: dict):
+    insert_one(materials_table, material)
+
+
+def update_material(material: dict):
+    update_one(materials_table, material)
+
+
+def upsert_materials(materials):
+    upsert_many(materials_table, materials)
+
+
+def delete_material(material_id: int):
+    delete_one(materials_table, material_id)
+
+
+def query_materials(
+    category: str | None = None,
+    keyword: str | None = None,
+    before=None,
+    after=None,
+    limit: int | None = None,
+):
+    conditions = []
+    if category:
+        conditions.append(materials_table.c.category == category)
+    predicate = None
+    if keyword:
+        kw = keyword.lower()
+
+        def matches(m):
+            return kw in m.get("title", "").lower() or kw in m.get("description", "").lower()
+
+        predicate = matches
+    return select_page(
+        materials_table,
+        *conditions,
+        before=before,
+        after=after,
+        limit=limit,
+        predicate=predicate,
+    )
+
+
 def load_polls():
     return load_table(polls_table)
 
@@ -124,6 +1815,38 @@ def save_polls(polls):
     save_table(polls_table, polls, "id")
 
 
+def get_poll(poll_id: int):
+    return get_item(polls_table, "id", poll_id)
+
+
+def get_polls(poll_ids):
+    return get_items(polls_table, poll_ids)
+
+
+def next_poll_id() -> int:
+    return allocate_id(polls_table)
+
+
+def insert_poll(poll: dict):
+    insert_one(polls_table, poll)
+
+
+def update_poll(poll: dict):
+    update_one(polls_table, poll)
+
+
+def upsert_polls(polls):
+    upsert_many(polls_table, polls)
+
+
+def delete_poll(poll_id: int):
+    delete_one(polls_table, poll_id)
+
+
+def query_polls(before=None, after=None, limit: int | None = None):
+    return select_page(polls_table, before=before, after=after, limit=limit)
+
+
 def load_schedules():
     return load_table(schedules_table)
 
@@ -132,9 +1855,101 @@ def save_schedules(schedules):
     save_table(schedules_table, schedules, "id")
 
 
+def get_schedule(schedule_id: int):
+    return get_item(schedules_table, "id", schedule_id)
+
+
+def get_schedules(schedule_ids):
+    return get_items(schedules_table, schedule_ids)
+
+
+def next_schedule_id() -> int:
+    return allocate_id(schedules_table)
+
+
+def insert_schedule(schedule: dict):
+    insert_one(schedules_table, schedule)
+
+
+def update_schedule(schedule: dict):
+    update_one(schedules_table, schedule)
+
+
+def upsert_schedules(schedules):
+    upsert_many(schedules_table, schedules)
+
+
+def delete_schedule(schedule_id: int):
+    delete_one(schedules_table, schedule_id)
+
+
 def load_approval_calendars():
     return load_table(approval_calendars_table)
 
 
 def save_approval_calendars(calendars):
     save_table(approval_calendars_table, calendars, "id")
+
+
+def get_approval_calendar(calendar_id: int):
+    return get_item(approval_calendars_table, "id", calendar_id)
+
+
+def get_approval_calendars(calendar_ids):
+    return get_items(approval_calendars_table, calendar_ids)
+
+
+def next_approval_calendar_id() -> int:
+    return allocate_id(approval_calendars_table)
+
+
+def insert_approval_calendar(approval_calendar: dict):
+    insert_one(approval_calendars_table, approval_calendar)
+
+
+def update_approval_calendar(approval_calendar: dict):
+    update_one(approval_calendars_table, approval_calendar)
+
+
+def upsert_approval_calendars(approval_calendars):
+    upsert_many(approval_calendars_table, approval_calendars)
+
+
+def delete_approval_calendar(calendar_id: int):
+    delete_one(approval_calendars_table, calendar_id)
+
+
+def list_calendars_by_author(author_id: str):
+    return select_rows(
+        approval_calendars_table,
+        approval_calendars_table.c.author_id == author_id,
+        order_by=(approval_calendars_table.c.id,),
+    )
+
+
+# Awaitable variants for the ``async def`` routes.
+get_user_async = _awaitable(get_user)
+update_user_async = _awaitable(update_user)
+is_blocked_async = _awaitable(is_blocked)
+get_post_async = _awaitable(get_post)
+publish_post_async = _awaitable(publish_post)
+update_post_async = _awaitable(update_post)
+next_post_id_async = _awaitable(next_post_id)
+author_has_posts_async = _awaitable(author_has_posts)
+set_like_async = _awaitable(set_like)
+set_retweet_async = _awaitable(set_retweet)
+next_message_id_async = _awaitable(next_message_id)
+insert_message_async = _awaitable(insert_message)
+is_group_member_async = _awaitable(is_group_member)
+next_group_message_id_async = _awaitable(next_group_message_id)
+insert_group_message_async = _awaitable(insert_group_message)
+next_job_id_async = _awaitable(next_job_id)
+insert_job_async = _awaitable(insert_job)
+get_poll_async = _awaitable(get_poll)
+next_poll_id_async = _awaitable(next_poll_id)
+insert_poll_async = _awaitable(insert_poll)
+update_poll_async = _awaitable(update_poll)
+refresh_suggestions_async = _awaitable(refresh_suggestions)
+notify_async = _awaitable(notify)
+compact_notifications_async = _awaitable(compact_notifications)
+load_social_graph_async = _awaitable(load_social_graph)
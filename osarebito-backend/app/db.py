@@ -1,20 +1,105 @@
+import json
+import logging
+import threading
+import time
+import unicodedata
+from datetime import datetime, timezone
 from sqlalchemy import (
     create_engine,
+    event,
+    make_url,
     MetaData,
     Table,
     Column,
     Integer,
+    Float,
     String,
+    Boolean,
     JSON,
+    Index,
     select,
     insert,
     delete,
     update,
+    func,
+    tuple_,
 )
+from sqlalchemy.pool import StaticPool
 from .config import settings
+from .cache import MISSING, TABLE, TableCache
+from .writer import WriteQueue
+
+logger = logging.getLogger(__name__)
 
 DATABASE_URL = settings.database_url
-engine = create_engine(DATABASE_URL)
+
+
+def _is_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite"
+
+
+def _engine_options(url) -> dict:
+    if _is_sqlite(url) and url.database in (None, "", ":memory:"):
+        # One shared connection, otherwise every thread sees its own empty
+        # in-memory database.
+        return {
+            "poolclass": StaticPool,
+            "connect_args": {"check_same_thread": False},
+        }
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": True,
+    }
+
+
+def _sqlite_pragmas() -> dict:
+    # busy_timeout first: switching the journal mode needs a lock that
+    # another starting worker may hold for a moment.
+    return {
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "cache_size": settings.sqlite_cache_size,
+        "mmap_size": settings.sqlite_mmap_size,
+        "temp_store": settings.sqlite_temp_store,
+    }
+
+
+_url = make_url(DATABASE_URL)
+engine = create_engine(_url, **_engine_options(_url))
+
+if _is_sqlite(_url):
+
+    @event.listens_for(engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in _sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def log_engine_settings() -> None:
+    """Log the effective engine configuration, as reported by the database."""
+    details = {
+        "url": engine.url.render_as_string(hide_password=True),
+        "pool": type(engine.pool).__name__,
+        **{
+            k: v
+            for k, v in _engine_options(engine.url).items()
+            if k not in ("poolclass", "connect_args")
+        },
+    }
+    if _is_sqlite(engine.url):
+        with engine.connect() as conn:
+            for name in _sqlite_pragmas():
+                details[name] = conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+    logger.info(
+        "Database engine: %s", ", ".join(f"{k}={v}" for k, v in details.items())
+    )
+
+
 metadata = MetaData()
 
 users_table = Table(
@@ -29,6 +114,22 @@ posts_table = Table(
     metadata,
     Column("id", Integer, primary_key=True),
     Column("data", JSON, nullable=False),
+    Column("author_id", String),
+    Column("category", String),
+    Column("anonymous", Boolean),
+    Column("created_at", String),
+    # Maintained by the like/retweet/comment writes, mirrored in the JSON blob.
+    Column("like_count", Integer),
+    Column("retweet_count", Integer),
+    Column("comment_count", Integer),
+    Index("ix_posts_created_at", "created_at", "id"),
+    Index("ix_posts_author_created", "author_id", "created_at"),
+    Index("ix_posts_category_created", "category", "created_at"),
+)
+Index(
+    "ix_posts_engagement",
+    (posts_table.c.like_count + posts_table.c.retweet_count).desc(),
+    posts_table.c.id,
 )
 
 comments_table = Table(
@@ -36,6 +137,10 @@ comments_table = Table(
     metadata,
     Column("id", Integer, primary_key=True),
     Column("data", JSON, nullable=False),
+    Column("post_id", Integer),
+    Column("author_id", String, index=True),
+    Column("created_at", String),
+    Index("ix_comments_post_id", "post_id", "id"),
 )
 
 messages_table = Table(
@@ -43,6 +148,82 @@ messages_table = Table(
     metadata,
     Column("id", Integer, primary_key=True),
     Column("data", JSON, nullable=False),
+    Column("sender_id", String),
+    Column("receiver_id", String, index=True),
+    Column("conversation_id", String),
+    Column("created_at", String),
+    Index("ix_messages_conversation", "conversation_id", "id"),
+)
+
+
+def conversation_id(user_id: str, other_id: str) -> str:
+    """The id both directions of a direct conversation share: the ordered pair."""
+    return json.dumps(sorted((user_id, other_id)), separators=(",", ":"))
+
+
+# The inbox: one row per user and conversation partner, updated by every
+# message sent, so listing conversations never reads ``messages``.
+conversations_table = Table(
+    "conversations",
+    metadata,
+    Column("user_id", String, primary_key=True),
+    Column("partner_id", String, primary_key=True),
+    Column("last_message_id", Integer, nullable=False),
+    Column("last_sender_id", String),
+    Column("preview", String),
+    Column("last_at", String),
+    Column("unread_count", Integer, nullable=False, default=0),
+    Index("ix_conversations_recent", "user_id", "last_at", "last_message_id"),
+)
+
+# Characters of the last message shown in the inbox.
+PREVIEW_LENGTH = 100
+
+
+def conversation_rows(message: dict) -> list[dict]:
+    """The inbox rows ``message`` leaves as the latest of its conversation,
+    one for each participant; unread counts are left to the caller."""
+    last = {
+        "last_message_id": message["id"],
+        "last_sender_id": message["sender_id"],
+        "preview": (message.get("content") or "")[:PREVIEW_LENGTH],
+        "last_at": message.get("created_at"),
+    }
+    sender, receiver = message["sender_id"], message["receiver_id"]
+    partners = {sender: receiver, receiver: sender}
+    return [{"user_id": u, "partner_id": p, **last} for u, p in partners.items()]
+
+
+# Per-user notifications, newest id first. Repeated events of one kind
+# share a ``group_key`` and fold into the latest unread notification.
+notifications_table = Table(
+    "notifications",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", String, nullable=False),
+    Column("type", String, nullable=False),
+    Column("group_key", String),
+    Column("actor_id", String),
+    Column("actors", JSON),
+    Column("count", Integer, nullable=False, default=1),
+    Column("message_id", Integer),
+    Column("read", Boolean, nullable=False, default=False),
+    Column("created_at", String),
+    Index("ix_notifications_user", "user_id", "id"),
+    Index("ix_notifications_unread", "user_id", "read", "group_key"),
+    Index("ix_notifications_created_at", "created_at"),
+)
+
+# Who is already counted in the unread notification of a group, so
+# repeat events from one actor do not raise its count.
+notification_actors_table = Table(
+    "notification_actors",
+    metadata,
+    Column("user_id", String, primary_key=True),
+    Column("group_key", String, primary_key=True),
+    Column("actor_id", String, primary_key=True),
+    Column("created_at", String),
+    Index("ix_notification_actors_created_at", "created_at"),
 )
 
 reports_table = Table(
@@ -50,6 +231,10 @@ reports_table = Table(
     metadata,
     Column("id", Integer, primary_key=True),
     Column("data", JSON, nullable=False),
+    Column("target_type", String),
+    Column("target_id", Integer),
+    Column("reporter_id", String),
+    Index("ix_reports_target", "target_type", "target_id", "reporter_id"),
 )
 
 jobs_table = Table(
@@ -57,6 +242,9 @@ jobs_table = Table(
     metadata,
     Column("id", Integer, primary_key=True),
     Column("data", JSON, nullable=False),
+    Column("author_id", String, index=True),
+    Column("created_at", String),
+    Index("ix_jobs_created_at", "created_at", "id"),
 )
 
 groups_table = Table(
@@ -66,11 +254,33 @@ groups_table = Table(
     Column("data", JSON, nullable=False),
 )
 
+# Group membership, mirrored from each group's ``members`` by the group writes.
+group_members_table = Table(
+    "group_members",
+    metadata,
+    Column("group_id", Integer, primary_key=True),
+    Column("user_id", String, primary_key=True),
+    Index("ix_group_members_user", "user_id", "group_id"),
+)
+
+
+def group_member_rows(groups) -> list[dict]:
+    return [
+        {"group_id": g["id"], "user_id": user_id}
+        for g in groups
+        for user_id in dict.fromkeys(g.get("members") or [])
+    ]
+
+
 group_messages_table = Table(
     "group_messages",
     metadata,
     Column("id", Integer, primary_key=True),
     Column("data", JSON, nullable=False),
+    Column("group_id", Integer),
+    Column("sender_id", String),
+    Column("created_at", String),
+    Index("ix_group_messages_group_id", "group_id", "id"),
 )
 
 fan_posts_table = Table(
@@ -78,6 +288,9 @@ fan_posts_table = Table(
     metadata,
     Column("id", Integer, primary_key=True),
     Column("data", JSON, nullable=False),
+    Column("author_id", String, index=True),
+    Column("created_at", String),
+    Index("ix_fan_posts_created_at", "created_at", "id"),
 )
 
 appeals_table = Table(
@@ -85,6 +298,11 @@ appeals_table = Table(
     metadata,
     Column("id", Integer, primary_key=True),
     Column("data", JSON, nullable=False),
+    Column("user_id", String),
+    Column("status", String),
+    Column("created_at", String),
+    Index("ix_appeals_user_status", "user_id", "status"),
+    Index("ix_appeals_created_at", "created_at", "id"),
 )
 
 materials_table = Table(
@@ -92,6 +310,12 @@ materials_table = Table(
     metadata,
     Column("id", Integer, primary_key=True),
     Column("data", JSON, nullable=False),
+    Column("uploader_id", String, index=True),
+    Column("category", String),
+    Column("created_at", String),
+    Index("ix_materials_category", "category", "id"),
+    Index("ix_materials_created_at", "created_at", "id"),
+    Index("ix_materials_category_created", "category", "created_at", "id"),
 )
 
 polls_table = Table(
@@ -99,6 +323,9 @@ polls_table = Table(
     metadata,
     Column("id", Integer, primary_key=True),
     Column("data", JSON, nullable=False),
+    Column("author_id", String, index=True),
+    Column("created_at", String),
+    Index("ix_polls_created_at", "created_at", "id"),
 )
 
 schedules_table = Table(
@@ -106,6 +333,8 @@ schedules_table = Table(
     metadata,
     Column("id", Integer, primary_key=True),
     Column("data", JSON, nullable=False),
+    Column("author_id", String, index=True),
+    Column("created_at", String),
 )
 
 approval_calendars_table = Table(
@@ -113,35 +342,934 @@ approval_calendars_table = Table(
     metadata,
     Column("id", Integer, primary_key=True),
     Column("data", JSON, nullable=False),
+    Column("author_id", String, index=True),
+    Column("created_at", String),
+)
+
+
+def _utcnow() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def iso_epoch(value: str) -> float:
+    """Unix time of a naive UTC ISO timestamp as stored in ``created_at``."""
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+
+
+# Relation tables: one row per edge, keyed by (source, target). The primary
+# key serves "who does X follow" and the reverse index "who follows X".
+follows_table = Table(
+    "follows",
+    metadata,
+    Column("follower_id", String, primary_key=True),
+    Column("followee_id", String, primary_key=True),
+    Column("created_at", String, default=_utcnow),
+    Index("ix_follows_followee", "followee_id", "follower_id"),
+)
+
+# Follower counts kept in step with ``follows``, for the leaderboard.
+follower_counts_table = Table(
+    "follower_counts",
+    metadata,
+    Column("user_id", String, primary_key=True),
+    Column("follower_count", Integer, nullable=False),
+)
+Index(
+    "ix_follower_counts_top",
+    follower_counts_table.c.follower_count.desc(),
+    follower_counts_table.c.user_id,
+)
+
+# "People you may know": the top friends-of-friends per user, rebuilt
+# by a periodic batch job.
+suggestions_table = Table(
+    "suggestions",
+    metadata,
+    Column("user_id", String, primary_key=True),
+    Column("suggested_id", String, primary_key=True),
+    Column("mutual_count", Integer, nullable=False),
+)
+
+blocks_table = Table(
+    "blocks",
+    metadata,
+    Column("blocker_id", String, primary_key=True),
+    Column("blocked_id", String, primary_key=True),
+    Column("created_at", String, default=_utcnow),
+    Index("ix_blocks_blocked", "blocked_id", "blocker_id"),
 )
 
-metadata.create_all(engine)
+# Follow and block writes in commit order, for the in-memory social graph
+# of every process to replay; ids come from ``next_id`` and are contiguous.
+graph_changes_table = Table(
+    "graph_changes",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("kind", String, nullable=False),
+    Column("source_id", String, nullable=False),
+    Column("target_id", String, nullable=False),
+)
+
+interests_table = Table(
+    "interests",
+    metadata,
+    Column("user_id", String, primary_key=True),
+    Column("target_id", String, primary_key=True),
+    Column("created_at", String, default=_utcnow),
+    Index("ix_interests_target", "target_id", "user_id"),
+)
+
+# Engagement tables, keyed (post_id, user_id) with the per-user reverse index.
+likes_table = Table(
+    "likes",
+    metadata,
+    Column("post_id", Integer, primary_key=True),
+    Column("user_id", String, primary_key=True),
+    Column("created_at", String, default=_utcnow),
+    Index("ix_likes_user", "user_id", "post_id"),
+)
+
+retweets_table = Table(
+    "retweets",
+    metadata,
+    Column("post_id", Integer, primary_key=True),
+    Column("user_id", String, primary_key=True),
+    Column("created_at", String, default=_utcnow),
+    Index("ix_retweets_user", "user_id", "post_id"),
+)
+
+bookmarks_table = Table(
+    "bookmarks",
+    metadata,
+    Column("post_id", Integer, primary_key=True),
+    Column("user_id", String, primary_key=True),
+    Column("created_at", String, default=_utcnow),
+    Index("ix_bookmarks_user", "user_id", "post_id"),
+)
+
+# Inverted tag index: tag -> posts, in feed order.
+post_tags_table = Table(
+    "post_tags",
+    metadata,
+    Column("tag", String, primary_key=True),
+    Column("post_id", Integer, primary_key=True),
+    Column("created_at", String),
+    Index("ix_post_tags_tag_created", "tag", "created_at", "post_id"),
+)
+
+# Posts per tag per time bucket. ``span`` names the window the bucket
+# width belongs to ("hour", "day", "week"); "all" has a single bucket 0.
+tag_counts_table = Table(
+    "tag_counts",
+    metadata,
+    Column("span", String, primary_key=True),
+    Column("bucket", Integer, primary_key=True),
+    Column("tag", String, primary_key=True),
+    Column("post_count", Integer, nullable=False),
+    Index("ix_tag_counts_top", "span", "bucket", "post_count"),
+)
+
+# Bucket width in seconds and buckets kept, per popular-tag window.
+TAG_WINDOWS = {"hour": (300, 12), "day": (3600, 24), "week": (6 * 3600, 28)}
+ALL_TIME = "all"
+
+
+def tag_buckets(created_at: str, now: float) -> list[tuple[str, int]]:
+    """The (span, bucket) counters a post created at ``created_at`` adds to.
+
+    Buckets already outside their window at ``now`` are left out.
+    """
+    ts = iso_epoch(created_at)
+    buckets = [(ALL_TIME, 0)]
+    for span, (width, count) in TAG_WINDOWS.items():
+        if ts // width > now // width - count:
+            buckets.append((span, int(ts // width)))
+    return buckets
+
+
+# Typeahead user search: lowercased id and name for prefix range scans,
+# plus the few fields the search dropdown shows. ``id`` keys the rows of
+# the substring index; an INTEGER PRIMARY KEY survives VACUUM, unlike an
+# implicit rowid.
+user_search_table = Table(
+    "user_search",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", String, nullable=False, unique=True),
+    Column("id_key", String, nullable=False),
+    Column("name_key", String, nullable=False),
+    Column("username", String),
+    Column("profile_image", String),
+    Index("ix_user_search_id_key", "id_key"),
+    Index("ix_user_search_name_key", "name_key"),
+)
+
+# Inverted index over creator profile terms. ``public`` leads the lookup
+# index so hidden profiles are filtered out by the index itself.
+creator_terms_table = Table(
+    "creator_terms",
+    metadata,
+    Column("facet", String, primary_key=True),
+    Column("term", String, primary_key=True),
+    Column("user_id", String, primary_key=True),
+    Column("public", Boolean, nullable=False),
+    Index("ix_creator_terms_lookup", "public", "term", "facet", "user_id"),
+    Index("ix_creator_terms_user", "user_id"),
+)
+
+CREATOR_FACETS = ("skills", "software", "equipment")
+
+
+def normalize_term(term: str) -> str:
+    return unicodedata.normalize("NFKC", term).strip().casefold()
+
+
+def creator_term_rows(user: dict) -> list[dict]:
+    """The ``creator_terms`` rows for ``user``'s creator profile."""
+    prof = user.get("creator_profile") or {}
+    public = prof.get("visibility", "public") == "public"
+    rows = {}
+    for facet in CREATOR_FACETS:
+        for term in prof.get(facet) or []:
+            term = normalize_term(term)
+            if term:
+                rows[(facet, term)] = {
+                    "facet": facet,
+                    "term": term,
+                    "user_id": user["user_id"],
+                    "public": public,
+                }
+    return list(rows.values())
+
+
+# Decayed engagement scores per trending list (``scope``), stored as log2
+# so the (scope, score) index reads the top posts directly.
+trending_table = Table(
+    "trending",
+    metadata,
+    Column("scope", String, primary_key=True),
+    Column("post_id", Integer, primary_key=True),
+    Column("score", Float, nullable=False),
+    Column("active_at", Float, nullable=False),
+    Index("ix_trending_scope_score", "scope", "score", "post_id"),
+    Index("ix_trending_active_at", "active_at"),
+)
+
+# Materialized home timelines: one row per (reader, post), written when
+# the post is created (fan-out on write).
+timelines_table = Table(
+    "timelines",
+    metadata,
+    Column("user_id", String, primary_key=True),
+    Column("post_id", Integer, primary_key=True),
+    Column("author_id", String),
+    Column("created_at", String),
+    Index("ix_timelines_user_created", "user_id", "created_at", "post_id"),
+    Index("ix_timelines_user_author", "user_id", "author_id"),
+)
+
+# Authors with too many followers to fan out to; their posts are merged
+# into timelines when they are read instead.
+pull_authors_table = Table(
+    "pull_authors",
+    metadata,
+    Column("user_id", String, primary_key=True),
+    Column("created_at", String, default=_utcnow),
+)
+
+id_sequences_table = Table(
+    "id_sequences",
+    metadata,
+    Column("name", String, primary_key=True),
+    Column("value", Integer, nullable=False),
+)
+
+cache_versions_table = Table(
+    "cache_versions",
+    metadata,
+    Column("name", String, primary_key=True),
+    Column("version", Integer, nullable=False),
+)
+
+schema_version_table = Table(
+    "schema_version",
+    metadata,
+    Column("version", Integer, nullable=False),
+)
+
+_writer = None
+
+
+def start_writer() -> None:
+    """Start the group-commit writer if ``WRITE_QUEUE_ENABLED`` is set."""
+    global _writer
+    if not settings.write_queue_enabled or _writer is not None:
+        return
+    _writer = WriteQueue(
+        engine,
+        window_ms=settings.write_queue_window_ms,
+        max_batch=settings.write_queue_max_batch,
+    )
+    _writer.start()
+
+
+def stop_writer() -> None:
+    global _writer
+    writer, _writer = _writer, None
+    if writer is not None:
+        writer.stop()
+
+
+def run_write(op):
+    """Run ``op(conn)`` inside a write transaction and return its result.
+
+    With the writer running the operation is queued and may share a commit
+    with other requests; the call returns once that commit is durable.
+    """
+    writer = _writer
+    if writer is not None:
+        return writer.submit(op).result()
+    with engine.begin() as conn:
+        return op(conn)
+
+
+_cache = TableCache(settings.cache_max_bytes) if settings.cache_enabled else None
+_known_versions: dict[str, int] = {}
+_versions_lock = threading.Lock()
+_versions_checked_at = 0.0
+
+
+def row_cache_stats() -> dict:
+    """Hit/miss counters and memory use of the row cache."""
+    return _cache.stats() if _cache is not None else {}
+
+
+def _bump_version(conn, table) -> int:
+    v = cache_versions_table
+    stmt = (
+        update(v)
+        .where(v.c.name == table.name)
+        .values(version=v.c.version + 1)
+        .returning(v.c.version)
+    )
+    version = conn.execute(stmt).scalar()
+    if version is None:
+        conn.execute(insert(v).values(name=table.name, version=1))
+        version = 1
+    return version
+
+
+def _refresh_versions() -> None:
+    """Drop cached tables that another process has written to since."""
+    global _versions_checked_at
+    now = time.monotonic()
+    if now - _versions_checked_at < settings.cache_poll_interval_ms / 1000:
+        return
+    _versions_checked_at = now
+    with engine.connect() as conn:
+        rows = conn.execute(select(cache_versions_table)).fetchall()
+    with _versions_lock:
+        for name, version in rows:
+            if version > _known_versions.get(name, 0):
+                _cache.invalidate_table(name, version)
+                _known_versions[name] = version
+
+
+def _note_write(table, version: int) -> None:
+    with _versions_lock:
+        known = _known_versions.get(table.name, 0)
+        if version != known + 1:
+            # Someone else wrote in between; whatever we hold may be stale.
+            _cache.invalidate_table(table.name, version)
+        _known_versions[table.name] = max(known, version)
+
+
+def _read_version(table) -> int:
+    """Refresh versions and return the one a read starting now is tagged with."""
+    _refresh_versions()
+    with _versions_lock:
+        return _known_versions.get(table.name, 0)
+
+
+def _write_table(table, op, rows=(), deleted=()) -> int:
+    """Run ``op(conn)`` as a write to ``table`` and write the cache through.
+
+    ``rows`` are the items now stored, ``deleted`` the keys now absent.
+    Returns the table version created by the write (0 without a cache).
+    """
+    if _cache is None:
+        run_write(op)
+        return 0
+
+    def write(conn):
+        op(conn)
+        return _bump_version(conn, table)
+
+    version = run_write(write)
+    _cache_written(table, version, rows, deleted)
+    return version
+
+
+def _cache_written(table, version: int, rows=(), deleted=()) -> None:
+    _note_write(table, version)
+    key = _key_column(table).name
+    for item in rows:
+        _cache.put(table.name, item[key], item, version)
+    for key_value in deleted:
+        _cache.put(table.name, key_value, None, version)
+    _cache.mark_stale(table.name, TABLE, version)
+
+
+def write_tables(tables, op, invalidate: bool = False):
+    """Run ``op(conn)`` as a write to ``tables`` that caches no rows of them.
+
+    Returns ``op``'s result and the tables' new versions by name (0
+    without a cache), for in-memory structures kept alongside the tables.
+    With ``invalidate`` whatever the cache holds of the tables is dropped,
+    for rare writes whose changed rows are not worth tracking.
+    """
+    if _cache is None:
+        return run_write(op), {t.name: 0 for t in tables}
+
+    def write(conn):
+        return op(conn), {t.name: _bump_version(conn, t) for t in tables}
+
+    result, versions = run_write(write)
+    for table in tables:
+        _note_write(table, versions[table.name])
+        if invalidate:
+            _cache.invalidate_table(table.name, versions[table.name])
+    return result, versions
+
+
+def _key_column(table):
+    return list(table.primary_key.columns)[0]
+
+
+def build_record(table, item):
+    """Build the row for ``item``: its key, the JSON blob and indexed columns."""
+    record = {}
+    for col in table.columns:
+        if col.name == "data":
+            record["data"] = item
+        elif isinstance(col.type, Boolean):
+            record[col.name] = bool(item.get(col.name))
+        else:
+            record[col.name] = item.get(col.name)
+    return record
+
+
+class TrackedRows(list):
+    """Rows returned by ``load_table`` with a snapshot used for dirty tracking.
+
+    ``save_table`` compares the rows against the snapshot and only writes
+    the rows that were added, changed or removed.
+    """
+
+    def __init__(self, key: str, rows, snapshot=None):
+        super().__init__(rows)
+        self.key = key
+        if snapshot is None:
+            snapshot = {row[key]: _fingerprint(row) for row in rows}
+        self.snapshot = snapshot
+
+    def changes(self, key: str) -> tuple[list, list]:
+        """The rows added or changed since the snapshot and the keys removed."""
+        current = {item[key]: item for item in self}
+        removed = [k for k in self.snapshot if k not in current]
+        changed = [
+            item
+            for k, item in current.items()
+            if self.snapshot.get(k) != _fingerprint(item)
+        ]
+        return changed, removed
+
+    def mark_saved(self, key: str) -> None:
+        self.snapshot = {item[key]: _fingerprint(item) for item in self}
+
+
+def _fingerprint(item) -> str:
+    return json.dumps(item, sort_keys=True, ensure_ascii=False, default=str)
 
 
 def load_table(table):
+    key = _key_column(table).name
+    if _cache is not None:
+        version = _read_version(table)
+        cached = _cache.get(table.name)
+        if cached is not MISSING:
+            return TrackedRows(key, *cached)
     with engine.connect() as conn:
-        return [row.data for row in conn.execute(select(table))]
+        rows = TrackedRows(key, [row.data for row in conn.execute(select(table))])
+    if _cache is not None:
+        _cache.put(table.name, TABLE, (list(rows), rows.snapshot), version)
+    return rows
 
 
 def save_table(table, items, key):
-    with engine.begin() as conn:
-        conn.execute(delete(table))
-        records = [{key: item[key], "data": item} for item in items]
-        if records:
-            conn.execute(insert(table), records)
+    """Persist ``items`` into ``table``.
+
+    Lists produced by ``load_table`` are diffed against their snapshot so
+    only dirty rows are written. Any other iterable replaces the table.
+    """
+    if not isinstance(items, TrackedRows):
+        records = [build_record(table, item) for item in items]
+
+        def replace(conn):
+            conn.execute(delete(table))
+            if records:
+                conn.execute(insert(table), records)
+
+        version = _write_table(table, replace)
+        if _cache is not None:
+            _cache.invalidate_table(table.name, version)
+        return
+    changed, removed = items.changes(key)
+    if not removed and not changed:
+        return
+
+    def write_dirty(conn):
+        if removed:
+            conn.execute(delete(table).where(table.c[key].in_(removed)))
+        _upsert(conn, table, changed)
+
+    _write_table(table, write_dirty, rows=changed, deleted=removed)
+    items.mark_saved(key)
+
+
+def _upsert(conn, table, items) -> None:
+    key_col = _key_column(table)
+    for item in items:
+        record = build_record(table, item)
+        result = conn.execute(
+            update(table).where(key_col == record[key_col.name]).values(record)
+        )
+        if result.rowcount == 0:
+            conn.execute(insert(table).values(record))
 
 
 def get_item(table, key_field, key_value):
     """Return a single item from a table by key or None."""
+    cached_key = _cache is not None and key_field == _key_column(table).name
+    if cached_key:
+        version = _read_version(table)
+        cached = _cache.get(table.name, key_value)
+        if cached is not MISSING:
+            return cached
     stmt = select(table.c.data).where(table.c[key_field] == key_value)
     with engine.connect() as conn:
         row = conn.execute(stmt).fetchone()
-        return row.data if row else None
+    item = row.data if row else None
+    if cached_key:
+        _cache.put(table.name, key_value, item, version)
+    return item
+
+
+def get_items(table, keys):
+    """Return the items stored under ``keys`` in that order, skipping missing ones."""
+    keys = list(dict.fromkeys(keys))
+    found = {}
+    pending = keys
+    if _cache is not None and keys:
+        version = _read_version(table)
+        pending = []
+        for key_value in keys:
+            cached = _cache.get(table.name, key_value)
+            if cached is MISSING:
+                pending.append(key_value)
+            elif cached is not None:
+                found[key_value] = cached
+    if pending:
+        key_col = _key_column(table)
+        with engine.connect() as conn:
+            for start in range(0, len(pending), 500):
+                chunk = pending[start:start + 500]
+                stmt = select(key_col, table.c.data).where(key_col.in_(chunk))
+                for row in conn.execute(stmt):
+                    found[row[0]] = row.data
+        if _cache is not None:
+            for key_value in pending:
+                _cache.put(table.name, key_value, found.get(key_value), version)
+    return [found[k] for k in keys if k in found]
 
 
 def update_item(table, key_field, key_value, item):
     """Update a single item in a table."""
-    stmt = update(table).where(table.c[key_field] == key_value).values(data=item)
-    with engine.begin() as conn:
+    stmt = (
+        update(table)
+        .where(table.c[key_field] == key_value)
+        .values(build_record(table, item))
+    )
+    _write_table(table, lambda conn: conn.execute(stmt), rows=[item])
+
+
+def insert_one(table, item, on_insert=None) -> None:
+    """Insert a single new row; ``on_insert(conn)`` runs in the same transaction."""
+    stmt = insert(table).values(build_record(table, item))
+
+    def write(conn):
         conn.execute(stmt)
+        if on_insert is not None:
+            on_insert(conn)
+
+    _write_table(table, write, rows=[item])
+
+
+def update_one(table, item) -> None:
+    """Rewrite the row whose primary key matches ``item``."""
+    key_col = _key_column(table)
+    stmt = (
+        update(table)
+        .where(key_col == item[key_col.name])
+        .values(build_record(table, item))
+    )
+    _write_table(table, lambda conn: conn.execute(stmt), rows=[item])
+
+
+def update_fields(table, key_value, fields: dict):
+    """Set ``fields`` of one row, keeping the rest of the stored item.
+
+    Unlike ``update_one`` nothing else is written back from the caller's
+    copy, so counters bumped since it was read are kept. Returns the new
+    item (None if the row is gone).
+    """
+    key_col = _key_column(table)
+    columns = {
+        k: bool(v) if isinstance(table.c[k].type, Boolean) else v
+        for k, v in fields.items()
+        if k in table.c and k != "data"
+    }
+    rows = []
+
+    def write(conn):
+        # The column update takes the write lock before the blob is read.
+        row = conn.execute(
+            update(table)
+            .where(key_col == key_value)
+            .values(columns or {key_col.name: key_col})
+            .returning(table.c.data)
+        ).first()
+        if row is None:
+            return
+        item = dict(row.data) | fields
+        conn.execute(update(table).where(key_col == key_value).values(data=item))
+        rows.append(item)
+
+    _write_table(table, write, rows=rows)
+    return rows[0] if rows else None
+
+
+def delete_one(table, key_value) -> None:
+    """Delete a single row by primary key."""
+    stmt = delete(table).where(_key_column(table) == key_value)
+    _write_table(table, lambda conn: conn.execute(stmt), deleted=[key_value])
+
+
+def upsert_many(table, items) -> None:
+    """Insert or update several rows in one transaction."""
+    items = list(items)
+    if not items:
+        return
+    _write_table(table, lambda conn: _upsert(conn, table, items), rows=items)
+
+
+def select_rows(table, *conditions, order_by=(), limit=None):
+    """Return the JSON data of rows matching ``conditions``."""
+    stmt = select(table.c.data).where(*conditions).order_by(*order_by)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    with engine.connect() as conn:
+        return [row.data for row in conn.execute(stmt)]
+
+
+def select_page(
+    table,
+    *conditions,
+    before=None,
+    after=None,
+    limit=None,
+    join=None,
+    predicate=None,
+    position=None,
+    positions: bool = False,
+):
+    """Return rows newest first by ``(created_at, key)`` from a range scan.
+
+    ``before``/``after`` are ``(created_at, key)`` positions; only rows
+    strictly older/newer are returned, at most ``limit`` of them and still
+    newest first. ``join`` replaces the FROM clause and ``position`` the
+    two ordering columns, so a joined index can drive the scan.
+    ``predicate`` filters decoded rows that SQL cannot, reading on in
+    batches until the page is full. With ``positions`` each row comes back
+    as ``(item, position)``.
+    """
+    created, key = position or (table.c.created_at, _key_column(table))
+    position = tuple_(created, key)
+    forward = after is not None
+    if forward:
+        order = (created, key)
+    else:
+        order = (created.desc(), key.desc())
+    base = select(table.c.data, created, key)
+    if join is not None:
+        base = base.select_from(join)
+    base = base.where(*conditions).order_by(*order)
+    batch = limit
+    if predicate is not None and limit is not None:
+        batch = max(limit, 200)
+    bound = after if forward else before
+    rows = []
+    with engine.connect() as conn:
+        while True:
+            stmt = base
+            if bound is not None:
+                edge = tuple_(*bound)
+                stmt = stmt.where(position > edge if forward else position < edge)
+            if batch is not None:
+                stmt = stmt.limit(batch)
+            fetched = conn.execute(stmt).fetchall()
+            for row in fetched:
+                if predicate is None or predicate(row.data):
+                    rows.append((row.data, (row[1], row[2])) if positions else row.data)
+                    if len(rows) == limit:
+                        break
+            if len(rows) == limit or batch is None or len(fetched) < batch:
+                break
+            bound = (fetched[-1][1], fetched[-1][2])
+    if forward:
+        rows.reverse()
+    return rows
+
+
+def row_exists(table, *conditions) -> bool:
+    stmt = select(_key_column(table)).where(*conditions).limit(1)
+    with engine.connect() as conn:
+        return conn.execute(stmt).first() is not None
+
+
+def _edge_columns(table):
+    source, target = table.primary_key.columns
+    return source, target
+
+
+def insert_edge(conn, table, source, target, created_at: str | None = None) -> bool:
+    """Add the ``source`` -> ``target`` row unless present; True if it was added.
+
+    ``created_at`` stamps the row when the caller records the same time
+    elsewhere; by default the column's default applies.
+    """
+    src, dst = _edge_columns(table)
+    if conn.execute(select(src).where(src == source, dst == target)).first():
+        return False
+    values = {src.name: source, dst.name: target}
+    if created_at is not None:
+        values["created_at"] = created_at
+    conn.execute(insert(table).values(values))
+    return True
+
+
+def delete_edge(conn, table, source, target) -> bool:
+    """Remove the ``source`` -> ``target`` row; True if there was one."""
+    src, dst = _edge_columns(table)
+    return conn.execute(delete(table).where(src == source, dst == target)).rowcount > 0
+
+
+def add_edge(table, source, target) -> bool:
+    return run_write(lambda conn: insert_edge(conn, table, source, target))
+
+
+def remove_edge(table, source, target) -> bool:
+    return run_write(lambda conn: delete_edge(conn, table, source, target))
+
+
+def edge_exists(table, source, target) -> bool:
+    src, dst = _edge_columns(table)
+    stmt = select(src).where(src == source, dst == target)
+    with engine.connect() as conn:
+        return conn.execute(stmt).first() is not None
+
+
+def cached_edge_exists(table, source, target) -> bool:
+    """``edge_exists`` through the row cache, for edges read far more often
+    than they change; their writes must invalidate the table."""
+    if _cache is None:
+        return edge_exists(table, source, target)
+    version = _read_version(table)
+    cached = _cache.get(table.name, (source, target))
+    if cached is not MISSING:
+        return cached
+    found = edge_exists(table, source, target)
+    _cache.put(table.name, (source, target), found, version)
+    return found
+
+
+def count_edges(table, column: str, value) -> int:
+    stmt = select(func.count()).select_from(table).where(table.c[column] == value)
+    with engine.connect() as conn:
+        return conn.execute(stmt).scalar()
+
+
+def list_edges(table, column: str, value, *conditions, after=None, limit=None) -> list:
+    """Return the other end of every edge whose ``column`` is ``value``.
+
+    Results are ordered by that other id, so ``after`` (the last id of the
+    previous page) continues a listing straight from the index.
+    """
+    src, dst = _edge_columns(table)
+    other = dst if column == src.name else src
+    stmt = select(other).where(table.c[column] == value, *conditions)
+    stmt = stmt.order_by(other)
+    if after is not None:
+        stmt = stmt.where(other > after)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    with engine.connect() as conn:
+        return list(conn.execute(stmt).scalars())
+
+
+def group_edges(table, column: str, values) -> dict:
+    """Map each of ``values`` to the other ends of its edges, for a page of rows."""
+    values = list(values)
+    src, dst = _edge_columns(table)
+    other = dst if column == src.name else src
+    grouped = {value: [] for value in values}
+    if not values:
+        return grouped
+    stmt = (
+        select(table.c[column], other)
+        .where(table.c[column].in_(values))
+        .order_by(table.c.created_at, other)
+    )
+    with engine.connect() as conn:
+        for value, other_id in conn.execute(stmt):
+            grouped[value].append(other_id)
+    return grouped
+
+
+def set_counted_edge(
+    table, source, target, present: bool, counter, column: str, on_change=None
+):
+    """Add or remove an edge and keep ``counter.column`` of ``source`` in step.
+
+    The count is adjusted in the same transaction as the edge, on the
+    indexed column and in the JSON blob, so it never needs recounting.
+    ``on_change(conn, item, present, created_at)`` runs in that transaction
+    too when the edge changed, with the added or removed edge's time.
+    Returns the counter row's item after the write (None if the row is
+    gone) and whether the edge changed.
+    """
+    key_col = _key_column(counter)
+    src, dst = _edge_columns(table)
+    result = {}
+
+    def write(conn):
+        if present:
+            # One time for the edge row and for ``on_change``, so records
+            # derived from it (trending scores) match a rebuild from the rows.
+            created_at = _utcnow()
+            changed = insert_edge(conn, table, source, target, created_at)
+        else:
+            created_at = None
+            if on_change is not None:
+                created_at = conn.execute(
+                    select(table.c.created_at).where(src == source, dst == target)
+                ).scalar()
+            changed = delete_edge(conn, table, source, target)
+        result["changed"] = changed
+        if not changed:
+            row = conn.execute(select(counter.c.data).where(key_col == source)).first()
+            result["item"] = row.data if row else None
+            return
+        item = _bump_counter(conn, counter, source, column, 1 if present else -1)
+        result["item"] = item
+        if item is not None and on_change is not None:
+            on_change(conn, item, present, created_at)
+
+    version = _write_table(counter, write)
+    item = result["item"]
+    if _cache is not None and item is not None:
+        _cache.put(counter.name, source, item, version)
+    return item, result["changed"]
+
+
+def _bump_counter(conn, counter, key, column: str, delta: int):
+    """Add ``delta`` to ``column`` of row ``key`` and its blob; the new item."""
+    key_col = _key_column(counter)
+    col = counter.c[column]
+    row = conn.execute(
+        update(counter)
+        .where(key_col == key)
+        .values({column: func.coalesce(col, 0) + delta})
+        .returning(col, counter.c.data)
+    ).first()
+    if row is None:
+        return None
+    item = dict(row.data)
+    item[column] = row[0]
+    conn.execute(update(counter).where(key_col == key).values(data=item))
+    return item
+
+
+def insert_counted(table, item, counter, column: str, source):
+    """Insert ``item`` and add one to ``counter.column`` of ``source``.
+
+    Both happen in one transaction, like ``set_counted_edge``. Returns the
+    counter row's item after the write (None if there is no such row).
+    """
+    result = {}
+
+    def write(conn):
+        conn.execute(insert(table).values(build_record(table, item)))
+        result["item"] = _bump_counter(conn, counter, source, column, 1)
+        if _cache is not None:
+            result["version"] = _bump_version(conn, table)
+
+    version = _write_table(counter, write)
+    counted = result["item"]
+    if _cache is not None:
+        _cache_written(table, result["version"], rows=[item])
+        if counted is not None:
+            _cache.put(counter.name, source, counted, version)
+    return counted
+
+
+def sync_id_sequence(conn, table) -> None:
+    """Move the id sequence of ``table`` past the largest stored id."""
+    seq = id_sequences_table
+    top = conn.execute(select(func.coalesce(func.max(_key_column(table)), 0))).scalar()
+    current = conn.execute(select(seq.c.value).where(seq.c.name == table.name)).scalar()
+    if current is None:
+        conn.execute(insert(seq).values(name=table.name, value=top))
+    elif current < top:
+        conn.execute(update(seq).where(seq.c.name == table.name).values(value=top))
+
+
+def allocate_id(table) -> int:
+    """Reserve the next integer id for ``table``.
+
+    The increment is a single ``UPDATE ... RETURNING`` so it costs O(1) and
+    concurrent requests, including other worker processes, never receive
+    the same id.
+    """
+    return run_write(lambda conn: next_id(conn, table))
+
+
+def next_id(conn, table) -> int:
+    """``allocate_id`` inside a write transaction that is already open."""
+    seq = id_sequences_table
+    stmt = (
+        update(seq)
+        .where(seq.c.name == table.name)
+        .values(value=seq.c.value + 1)
+        .returning(seq.c.value)
+    )
+    value = conn.execute(stmt).scalar()
+    if value is None:
+        sync_id_sequence(conn, table)
+        value = conn.execute(stmt).scalar()
+    return value
+
+
+from .migrations import run_migrations  # noqa: E402
 
+run_migrations(engine)
@@ -1,9 +1,57 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from .config import init_logging
+from .config import init_logging, settings
+from .crud import (
+    compact_notifications_async,
+    load_social_graph_async,
+    refresh_suggestions_async,
+)
+from .db import log_engine_settings, start_writer, stop_writer
 from .routes import users, posts, misc, ws
 
 init_logging()
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+
+async def run_periodically(job, interval: float, name: str) -> None:
+    while True:
+        try:
+            await job()
+        except Exception:
+            logger.exception("%s failed", name)
+        await asyncio.sleep(interval)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_engine_settings()
+    start_writer()
+    if settings.social_graph_enabled:
+        await load_social_graph_async()
+    jobs = []
+    for job, interval, name in (
+        (
+            refresh_suggestions_async,
+            settings.suggestions_interval_seconds,
+            "Refreshing user suggestions",
+        ),
+        (
+            compact_notifications_async,
+            settings.notification_compact_interval_seconds,
+            "Compacting notifications",
+        ),
+    ):
+        if interval > 0:
+            jobs.append(asyncio.create_task(run_periodically(job, interval, name)))
+    yield
+    for job in jobs:
+        job.cancel()
+    stop_writer()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(users.router)
 app.include_router(posts.router)
@@ -0,0 +1,514 @@
+"""In-place schema upgrades for existing databases.
+
+``metadata.create_all`` only creates missing tables, so columns and
+indexes added to tables that already exist are applied here. Each step
+runs once and the reached version is stored in ``schema_version``.
+
+Table creation and the steps run in one transaction holding the write
+lock, so workers starting together on the same database take turns and
+the later ones find the schema current.
+"""
+import logging
+import time
+from collections import Counter
+from sqlalchemy import (
+    bindparam,
+    delete,
+    func,
+    inspect,
+    insert,
+    select,
+    text,
+    tuple_,
+    union_all,
+    update,
+)
+from sqlalchemy.schema import CreateIndex
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _add_missing_columns(conn, table) -> list[str]:
+    existing = {c["name"] for c in inspect(conn).get_columns(table.name)}
+    preparer = conn.dialect.identifier_preparer
+    added = []
+    for col in table.columns:
+        if col.name in existing:
+            continue
+        col_type = col.type.compile(dialect=conn.dialect)
+        conn.execute(
+            text(
+                f"ALTER TABLE {preparer.format_table(table)} "
+                f"ADD COLUMN {preparer.format_column(col)} {col_type}"
+            )
+        )
+        added.append(col.name)
+    return added
+
+
+def _backfill(conn, table, columns, batch_size: int = 500) -> None:
+    """Copy values for ``columns`` out of the JSON blob of every row."""
+    from .db import _key_column, build_record
+
+    key_col = _key_column(table)
+    stmt = (
+        update(table)
+        .where(key_col == bindparam("_key"))
+        .values({name: bindparam(name) for name in columns})
+    )
+    last = None
+    while True:
+        query = select(key_col, table.c.data).order_by(key_col).limit(batch_size)
+        if last is not None:
+            query = query.where(key_col > last)
+        rows = conn.execute(query).fetchall()
+        if not rows:
+            break
+        params = []
+        for row in rows:
+            record = build_record(table, row.data)
+            params.append({"_key": row[0], **{name: record[name] for name in columns}})
+        conn.execute(stmt, params)
+        last = rows[-1][0]
+
+
+def _sync_columns(conn, tables) -> None:
+    for table in tables:
+        added = _add_missing_columns(conn, table)
+        if added:
+            logger.info("Backfilling %s columns: %s", table.name, ", ".join(added))
+            _backfill(conn, table, added)
+        for index in table.indexes:
+            # Expression indexes are not reflected, so checkfirst misses them.
+            conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def _index_blob_columns(conn, db) -> None:
+    """v1: hot filter/sort keys become real indexed columns."""
+    _sync_columns(conn, db.metadata.sorted_tables)
+
+
+def _seed_id_sequences(conn, db) -> None:
+    """v2: start every id sequence after the largest existing id."""
+    for table in db.metadata.sorted_tables:
+        if "data" in table.c and table.c.get("id") is not None:
+            db.sync_id_sequence(conn, table)
+
+
+def _seed_cache_versions(conn, db) -> None:
+    """v3: one cache version row per data table."""
+    existing = set(conn.execute(select(db.cache_versions_table.c.name)).scalars())
+    for table in db.metadata.sorted_tables:
+        if "data" in table.c and table.name not in existing:
+            conn.execute(insert(db.cache_versions_table).values(name=table.name, version=0))
+
+
+def _insert_edges(conn, table, pairs) -> None:
+    source, target = table.primary_key.columns
+    existing = set(conn.execute(select(source, target)).tuples())
+    records = [{source.name: s, target.name: t} for s, t in sorted(pairs - existing)]
+    if records:
+        logger.info("Moving %d rows into %s", len(records), table.name)
+        conn.execute(insert(table), records)
+
+
+def _strip_blobs(conn, table, strip, batch_size: int = 500) -> None:
+    """Rewrite every row whose blob ``strip(key, data)`` returns a new blob for."""
+    from .db import _key_column
+
+    key_col = _key_column(table)
+    stmt = update(table).where(key_col == bindparam("_key")).values(data=bindparam("data"))
+    last = None
+    while True:
+        query = select(key_col, table.c.data).order_by(key_col).limit(batch_size)
+        if last is not None:
+            query = query.where(key_col > last)
+        rows = conn.execute(query).fetchall()
+        if not rows:
+            break
+        params = []
+        for key, data in rows:
+            stripped = strip(key, data)
+            if stripped is not None:
+                params.append({"_key": key, "data": stripped})
+        if params:
+            conn.execute(stmt, params)
+        last = rows[-1][0]
+
+
+RELATION_KEYS = ("followers", "following", "blocks", "interested")
+
+
+def split_user_relations(conn, db) -> None:
+    """v4: follow, block and interest lists move from user blobs to edge tables."""
+    follows, blocks, interests = set(), set(), set()
+
+    def strip(user_id, data):
+        follows.update((user_id, x) for x in data.get("following") or [])
+        follows.update((x, user_id) for x in data.get("followers") or [])
+        blocks.update((user_id, x) for x in data.get("blocks") or [])
+        interests.update((x, user_id) for x in data.get("interested") or [])
+        if any(key in data for key in RELATION_KEYS):
+            return {k: v for k, v in data.items() if k not in RELATION_KEYS}
+        return None
+
+    _strip_blobs(conn, db.users_table, strip)
+    _insert_edges(conn, db.follows_table, follows)
+    _insert_edges(conn, db.blocks_table, blocks)
+    _insert_edges(conn, db.interests_table, interests)
+
+
+def split_post_engagement(conn, db) -> None:
+    """v5: likes, retweets and bookmarks move to edge tables with counters."""
+    _sync_columns(conn, [db.posts_table])
+    likes, retweets, bookmarks = set(), set(), set()
+
+    def strip_post(post_id, data):
+        likes.update((post_id, x) for x in data.get("likes") or [])
+        retweets.update((post_id, x) for x in data.get("retweets") or [])
+        if "likes" not in data and "retweets" not in data:
+            return None
+        stripped = {k: v for k, v in data.items() if k not in ("likes", "retweets")}
+        stripped["like_count"] = len(set(data.get("likes") or []))
+        stripped["retweet_count"] = len(set(data.get("retweets") or []))
+        return stripped
+
+    def strip_user(user_id, data):
+        bookmarks.update((x, user_id) for x in data.get("bookmarks") or [])
+        if "bookmarks" not in data:
+            return None
+        return {k: v for k, v in data.items() if k != "bookmarks"}
+
+    _strip_blobs(conn, db.posts_table, strip_post)
+    _strip_blobs(conn, db.users_table, strip_user)
+    _insert_edges(conn, db.likes_table, likes)
+    _insert_edges(conn, db.retweets_table, retweets)
+    _insert_edges(conn, db.bookmarks_table, bookmarks)
+    _backfill(conn, db.posts_table, ["like_count", "retweet_count"])
+
+
+def _index_page_order(conn, db) -> None:
+    """v6: (created_at, id) indexes behind cursor pagination."""
+    _sync_columns(
+        conn,
+        [
+            db.jobs_table,
+            db.fan_posts_table,
+            db.appeals_table,
+            db.materials_table,
+            db.polls_table,
+        ],
+    )
+
+
+def _ranked_timeline_entries(entries):
+    """``entries`` with each row's position in its user's timeline, newest first."""
+    rank = func.row_number().over(
+        partition_by=entries.c.user_id,
+        order_by=(entries.c.created_at.desc(), entries.c.post_id.desc()),
+    )
+    return select(entries, rank.label("rank")).subquery()
+
+
+def fill_timelines(conn, db) -> None:
+    """v7: materialize home timelines from the existing follows and posts,
+    the newest ``TIMELINE_MAX_ENTRIES`` of each."""
+    follows, posts, t = db.follows_table, db.posts_table, db.timelines_table
+    columns = ["user_id", "post_id", "author_id", "created_at"]
+    conn.execute(
+        insert(db.pull_authors_table).from_select(
+            ["user_id"],
+            select(follows.c.followee_id)
+            .group_by(follows.c.followee_id)
+            .having(func.count() > settings.timeline_fanout_max_followers),
+        )
+    )
+    pushed = follows.c.followee_id.notin_(select(db.pull_authors_table.c.user_id))
+    entries = union_all(
+        select(
+            follows.c.follower_id.label("user_id"),
+            posts.c.id.label("post_id"),
+            posts.c.author_id,
+            posts.c.created_at,
+        )
+        .join(posts, posts.c.author_id == follows.c.followee_id)
+        .where(pushed, follows.c.follower_id != follows.c.followee_id),
+        select(
+            posts.c.author_id.label("user_id"),
+            posts.c.id.label("post_id"),
+            posts.c.author_id,
+            posts.c.created_at,
+        ).where(posts.c.author_id.isnot(None)),
+    ).subquery()
+    ranked = _ranked_timeline_entries(entries)
+    conn.execute(
+        insert(t).from_select(
+            columns,
+            select(*(ranked.c[c] for c in columns)).where(
+                ranked.c.rank <= settings.timeline_max_entries
+            ),
+        )
+    )
+
+
+def _index_blocked_by(conn, db) -> None:
+    """v8: reverse block index, for "who blocked me"."""
+    _sync_columns(conn, [db.blocks_table])
+
+
+def fill_post_tags(conn, db) -> None:
+    """v9: inverted tag index and popularity counters from existing posts."""
+    posts = db.posts_table
+    now = time.time()
+    edges, counts = [], Counter()
+    for post_id, data, created_at in conn.execute(
+        select(posts.c.id, posts.c.data, posts.c.created_at)
+    ):
+        tags = sorted(set(data.get("tags") or []))
+        if not tags or not created_at:
+            continue
+        edges.extend({"tag": t, "post_id": post_id, "created_at": created_at} for t in tags)
+        for span, bucket in db.tag_buckets(created_at, now):
+            counts.update((span, bucket, t) for t in tags)
+    if edges:
+        logger.info("Indexing %d post tags", len(edges))
+        conn.execute(insert(db.post_tags_table), edges)
+        conn.execute(
+            insert(db.tag_counts_table),
+            [
+                {"span": s, "bucket": b, "tag": t, "post_count": n}
+                for (s, b, t), n in counts.items()
+            ],
+        )
+
+
+def fill_trending(conn, db) -> None:
+    """v10: decayed trending scores from the existing likes and retweets."""
+    from .trending import rebuild
+
+    rebuild(conn, db.posts_table, db.likes_table, db.retweets_table)
+
+
+def _index_post_text(conn, db) -> None:
+    """v11: full-text index over post content and tags (SQLite only)."""
+    from .search import create_index
+
+    create_index(conn)
+
+
+def count_comments(conn, db) -> None:
+    """v12: comment_count on posts, from the comments stored so far."""
+    _sync_columns(conn, [db.posts_table])
+    comments = db.comments_table
+    counts = dict(
+        conn.execute(
+            select(comments.c.post_id, func.count()).group_by(comments.c.post_id)
+        ).all()
+    )
+
+    def strip(post_id, data):
+        count = counts.get(post_id, 0)
+        if data.get("comment_count") == count:
+            return None
+        return data | {"comment_count": count}
+
+    _strip_blobs(conn, db.posts_table, strip)
+    _backfill(conn, db.posts_table, ["comment_count"])
+
+
+def fill_user_search(conn, db) -> None:
+    """v13: typeahead user search index."""
+    from .search import create_user_index, user_entry
+
+    conn.execute(delete(db.user_search_table))
+    entries = [user_entry(data) for (data,) in conn.execute(select(db.users_table.c.data))]
+    if entries:
+        conn.execute(insert(db.user_search_table), entries)
+    create_user_index(conn)
+
+
+def fill_creator_terms(conn, db) -> None:
+    """v14: inverted index over creator profile terms."""
+    conn.execute(delete(db.creator_terms_table))
+    rows = []
+    for (data,) in conn.execute(select(db.users_table.c.data)):
+        rows += db.creator_term_rows(data)
+    if rows:
+        conn.execute(insert(db.creator_terms_table), rows)
+
+
+def count_followers(conn, db) -> None:
+    """v15: follower counts behind the recommended-users leaderboard."""
+    follows, fc = db.follows_table, db.follower_counts_table
+    conn.execute(delete(fc))
+    conn.execute(
+        insert(fc).from_select(
+            ["user_id", "follower_count"],
+            select(follows.c.followee_id, func.count()).group_by(follows.c.followee_id),
+        )
+    )
+
+
+def key_conversations(conn, db, batch_size: int = 500) -> None:
+    """v16: key direct messages by conversation, indexed with the id."""
+    m = db.messages_table
+    conn.execute(text("DROP INDEX IF EXISTS ix_messages_pair"))
+    _sync_columns(conn, [m])
+    stmt = (
+        update(m)
+        .where(m.c.id == bindparam("_key"))
+        .values(data=bindparam("data"), conversation_id=bindparam("_conversation"))
+    )
+    while True:
+        query = (
+            select(m.c.id, m.c.data)
+            .where(m.c.conversation_id.is_(None))
+            .order_by(m.c.id)
+            .limit(batch_size)
+        )
+        rows = conn.execute(query).fetchall()
+        if not rows:
+            break
+        params = []
+        for key, data in rows:
+            cid = db.conversation_id(data.get("sender_id") or "", data.get("receiver_id") or "")
+            params.append({"_key": key, "_conversation": cid, "data": data | {"conversation_id": cid}})
+        conn.execute(stmt, params)
+
+
+def fill_conversations(conn, db) -> None:
+    """v17: the inbox summary, from the latest message of each conversation.
+
+    Unread counts start at zero: there was no read state before.
+    """
+    m, c = db.messages_table, db.conversations_table
+    latest = {}
+    for (data,) in conn.execute(select(m.c.data).order_by(m.c.id)):
+        if data.get("sender_id") and data.get("receiver_id"):
+            for row in db.conversation_rows(data):
+                latest[(row["user_id"], row["partner_id"])] = row
+    conn.execute(delete(c))
+    if latest:
+        conn.execute(insert(c), [row | {"unread_count": 0} for row in latest.values()])
+
+
+def move_notifications(conn, db) -> None:
+    """v18: notifications leave the user blob for their own table.
+
+    Existing ones are stored as read, one per event.
+    """
+    rows = []
+
+    def strip_user(user_id, data):
+        if "notifications" not in data:
+            return None
+        for note in data["notifications"] or []:
+            rows.append(
+                {
+                    "user_id": user_id,
+                    "type": note.get("type") or "",
+                    "actor_id": note.get("from"),
+                    "actors": [note["from"]] if note.get("from") else [],
+                    "count": 1,
+                    "message_id": note.get("message_id"),
+                    "read": True,
+                    "created_at": note.get("created_at"),
+                }
+            )
+        return {k: v for k, v in data.items() if k != "notifications"}
+
+    _strip_blobs(conn, db.users_table, strip_user)
+    rows.sort(key=lambda r: r["created_at"] or "")
+    if rows:
+        conn.execute(insert(db.notifications_table), rows)
+    db.sync_id_sequence(conn, db.notifications_table)
+
+
+def fill_group_members(conn, db) -> None:
+    """v19: the user -> groups membership index."""
+    groups = [data for (data,) in conn.execute(select(db.groups_table.c.data))]
+    conn.execute(delete(db.group_members_table))
+    rows = db.group_member_rows(groups)
+    if rows:
+        conn.execute(insert(db.group_members_table), rows)
+
+
+def key_user_search(conn, db) -> None:
+    """v20: ``user_search`` gets an integer key for the substring index,
+    which was tied to its implicit rowids; both are rebuilt."""
+    if conn.dialect.name == "sqlite":
+        conn.execute(text("DROP TABLE IF EXISTS users_fts"))
+    db.user_search_table.drop(conn)
+    db.user_search_table.create(conn)
+    fill_user_search(conn, db)
+
+
+def trim_timelines(conn, db) -> None:
+    """v21: home timelines keep their newest ``TIMELINE_MAX_ENTRIES``."""
+    t = db.timelines_table
+    ranked = _ranked_timeline_entries(t)
+    older = select(ranked.c.user_id, ranked.c.post_id).where(
+        ranked.c.rank > settings.timeline_max_entries
+    )
+    conn.execute(delete(t).where(tuple_(t.c.user_id, t.c.post_id).in_(older)))
+
+
+MIGRATIONS = [
+    (1, _index_blob_columns),
+    (2, _seed_id_sequences),
+    (3, _seed_cache_versions),
+    (4, split_user_relations),
+    (5, split_post_engagement),
+    (6, _index_page_order),
+    (7, fill_timelines),
+    (8, _index_blocked_by),
+    (9, fill_post_tags),
+    (10, fill_trending),
+    (11, _index_post_text),
+    (12, count_comments),
+    (13, fill_user_search),
+    (14, fill_creator_terms),
+    (15, count_followers),
+    (16, key_conversations),
+    (17, fill_conversations),
+    (18, move_notifications),
+    (19, fill_group_members),
+    (20, key_user_search),
+    (21, trim_timelines),
+]
+
+
+def _lock_schema(conn) -> None:
+    """Take the write lock before anything reads the schema. Waiting workers
+    allow for a migration that takes longer than the usual busy timeout."""
+    if conn.dialect.name == "sqlite":
+        conn.exec_driver_sql(f"PRAGMA busy_timeout={settings.migration_lock_timeout_ms}")
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _unlock_schema(conn) -> None:
+    if conn.dialect.name == "sqlite":
+        conn.exec_driver_sql(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+
+
+def run_migrations(engine) -> None:
+    from . import db
+
+    version_table = db.schema_version_table
+    with engine.connect() as conn:
+        with conn.begin():
+            _lock_schema(conn)
+            db.metadata.create_all(conn)
+            current = conn.execute(select(version_table.c.version)).scalar()
+            if current is None:
+                current = 0
+                conn.execute(insert(version_table).values(version=0))
+            for version, step in MIGRATIONS:
+                if version <= current:
+                    continue
+                logger.info("Applying schema migration %s", version)
+                step(conn, db)
+                conn.execute(update(version_table).values(version=version))
+                current = version
+        _unlock_schema(conn)
@@ -0,0 +1,75 @@
+"""Cursor pagination for feed-style list endpoints.
+
+Lists are ordered newest first by ``(created_at, id)``. A cursor is that
+pair for one item, base64-encoded so clients treat it as opaque. Pass a
+response's ``next_cursor`` back as ``before`` to page towards older items
+or as ``after`` to poll for newer ones; it continues in the direction of
+the request that returned it.
+"""
+import base64
+import binascii
+import json
+from fastapi import HTTPException
+from .config import settings
+
+
+def encode_cursor(item: dict) -> str:
+    return encode_position((item["created_at"], item["id"]))
+
+
+def encode_position(position: tuple) -> str:
+    raw = json.dumps(list(position), separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, key = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return created_at, key
+
+
+def page_limit(limit: int | None, unpaginated: bool = False) -> int | None:
+    """The page size to query: ``limit`` capped at ``PAGE_SIZE_MAX``, the
+    default without one, None (everything) with ``unpaginated``."""
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="Invalid limit")
+    if unpaginated:
+        return None
+    return min(limit or settings.page_size_default, settings.page_size_max)
+
+
+class Page:
+    """Query parameters of a paginated list, usable as ``Depends(Page)``.
+
+    ``unpaginated=true`` opts back into the full, unlimited list.
+    """
+
+    def __init__(
+        self,
+        before: str | None = None,
+        after: str | None = None,
+        limit: int | None = None,
+        unpaginated: bool = False,
+    ) -> None:
+        if before and after:
+            raise HTTPException(status_code=400, detail="Use either before or after")
+        self.limit = page_limit(limit, unpaginated)
+        self.before = decode_cursor(before) if before else None
+        self.after = decode_cursor(after) if after else None
+
+    @property
+    def query(self) -> dict:
+        return {"before": self.before, "after": self.after, "limit": self.limit}
+
+    def next_cursor(self, items: list, positions: list | None = None) -> str | None:
+        """Cursor continuing after ``items``; lists not ordered by
+        ``(created_at, id)`` pass each item's sort position."""
+        if self.limit is None or len(items) < self.limit:
+            return None
+        index = 0 if self.after else -1
+        if positions is not None:
+            return encode_position(positions[index])
+        return encode_cursor(items[index])
@@ -1,5 +1,5 @@
 from datetime import datetime, timedelta
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from ..models import (
     MessageCreate,
     GroupCreate,
@@ -18,29 +18,64 @@ from ..models import (
     CalendarApproveRequest,
 )
 from ..crud import (
-    load_users,
-    save_users,
-    load_messages,
-    save_messages,
-    load_groups,
-    save_groups,
-    load_group_messages,
-    save_group_messages,
-    load_jobs,
-    save_jobs,
-    load_fan_posts,
-    save_fan_posts,
-    load_appeals,
-    save_appeals,
-    load_materials,
-    save_materials,
-    load_polls,
-    save_polls,
-    load_schedules,
-    save_schedules,
-    load_approval_calendars,
-    save_approval_calendars,
+    get_user,
+    get_user_async,
+    get_users,
+    update_user,
+    is_blocked,
+    is_blocked_async,
+    block_related_ids,
+    next_message_id_async,
+    insert_message_async,
+    list_conversation,
+    query_conversations,
+    mark_conversation_read,
+    notify_async,
+    query_notifications,
+    count_unread_notifications,
+    mark_notifications_read,
+    list_user_groups,
+    is_group_member_async,
+    next_group_id,
+    insert_group,
+    next_group_message_id_async,
+    insert_group_message_async,
+    list_group_messages,
+    next_job_id_async,
+    insert_job_async,
+    query_jobs,
+    next_fan_post_id,
+    insert_fan_post,
+    query_fan_posts,
+    get_appeal,
+    next_appeal_id,
+    insert_appeal,
+    update_appeal,
+    query_appeals,
+    has_pending_appeal,
+    get_material,
+    get_materials,
+    next_material_id,
+    insert_material,
+    query_materials,
+    get_poll as fetch_poll,
+    get_poll_async,
+    next_poll_id_async,
+    insert_poll_async,
+    update_poll_async,
+    query_polls,
+    get_schedule,
+    next_schedule_id,
+    insert_schedule,
+    get_approval_calendar,
+    next_approval_calendar_id,
+    insert_approval_calendar,
+    update_approval_calendar,
+    list_calendars_by_author,
+    cache_stats,
 )
+from ..config import settings
+from ..pagination import Page, page_limit
 from ..utils import (
     schedule_broadcast,
     TUTORIAL_TASKS,
@@ -53,19 +88,17 @@ router = APIRouter()
 
 @router.post("/messages")
 async def send_message(msg: MessageCreate):
-    users = load_users()
-    sender = next((u for u in users if u["user_id"] == msg.sender_id), None)
+    sender = await get_user_async(msg.sender_id)
     if not sender:
         raise HTTPException(status_code=404, detail="Sender not found")
     if is_semibanned(sender):
         raise HTTPException(status_code=403, detail="Temporarily banned")
-    receiver = next((u for u in users if u["user_id"] == msg.receiver_id), None)
+    receiver = await get_user_async(msg.receiver_id)
     if not receiver:
         raise HTTPException(status_code=404, detail="Receiver not found")
-    if msg.receiver_id in sender.get("blocks", []) or msg.sender_id in receiver.get("blocks", []):
+    if await is_blocked_async(msg.sender_id, msg.receiver_id):
         raise HTTPException(status_code=403, detail="Blocked")
-    messages = load_messages()
-    new_id = max([m["id"] for m in messages], default=0) + 1
+    new_id = await next_message_id_async()
     item = {
         "id": new_id,
         "sender_id": msg.sender_id,
@@ -73,49 +106,81 @@ async def send_message(msg: MessageCreate):
         "content": msg.content,
         "created_at": datetime.utcnow().isoformat(),
     }
-    messages.append(item)
-    save_messages(messages)
-    for u in users:
-        if u["user_id"] == msg.receiver_id:
-            notes = u.setdefault("notifications", [])
-            notes.append({"type": "message", "from": msg.sender_id, "message_id": new_id, "created_at": item["created_at"]})
-            break
-    save_users(users)
+    await insert_message_async(item)
+    await notify_async(msg.receiver_id, "message", msg.sender_id, new_id)
     schedule_broadcast({"type": "new_message", "message": item})
     return item
 
 
 @router.get("/messages/{user_id}/with/{other_id}")
-def get_messages(user_id: str, other_id: str):
-    users = load_users()
-    me = next((u for u in users if u["user_id"] == user_id), None)
-    other = next((u for u in users if u["user_id"] == other_id), None)
+def get_messages(
+    user_id: str,
+    other_id: str,
+    before_id: int | None = None,
+    since_id: int | None = None,
+    limit: int | None = None,
+    unpaginated: bool = False,
+):
+    limit = page_limit(limit, unpaginated)
+    me = get_user(user_id)
+    other = get_user(other_id)
     if not me or not other:
         raise HTTPException(status_code=404, detail="User not found")
-    if other_id in me.get("blocks", []) or user_id in other.get("blocks", []):
+    if is_blocked(user_id, other_id):
         raise HTTPException(status_code=403, detail="Blocked")
-    messages = load_messages()
-    convo = [
-        m for m in messages
-        if (m["sender_id"] == user_id and m["receiver_id"] == other_id) or (m["sender_id"] == other_id and m["receiver_id"] == user_id)
+    messages = list_conversation(
+        user_id, other_id, before_id=before_id, since_id=since_id, limit=limit
+    )
+    return {"messages": messages}
+
+
+@router.get("/users/{user_id}/conversations")
+def list_conversations(user_id: str, page: Page = Depends()):
+    if not get_user(user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    conversations = query_conversations(user_id, **page.query)
+    positions = [
+        (c["last_message"]["created_at"], c["last_message"]["id"]) for c in conversations
     ]
-    convo.sort(key=lambda x: x["id"])
-    return {"messages": convo}
+    next_cursor = page.next_cursor(conversations, positions)
+    blocked = block_related_ids(user_id)
+    return {
+        "conversations": [c for c in conversations if c["partner_id"] not in blocked],
+        "next_cursor": next_cursor,
+    }
+
+
+@router.post("/users/{user_id}/conversations/{partner_id}/read")
+def mark_read(user_id: str, partner_id: str):
+    if not mark_conversation_read(user_id, partner_id):
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return {"message": "read"}
 
 
 @router.get("/users/{user_id}/notifications")
-def get_notifications(user_id: str):
-    users = load_users()
-    user = next((u for u in users if u["user_id"] == user_id), None)
-    if not user:
+def get_notifications(user_id: str, before_id: int | None = None, limit: int | None = None):
+    if not get_user(user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="Invalid limit")
+    limit = min(limit or settings.page_size_default, settings.page_size_max)
+    return {
+        "notifications": query_notifications(user_id, before_id=before_id, limit=limit),
+        "unread_count": count_unread_notifications(user_id),
+    }
+
+
+@router.post("/users/{user_id}/notifications/read")
+def read_notifications(user_id: str, up_to_id: int | None = None):
+    if not get_user(user_id):
         raise HTTPException(status_code=404, detail="User not found")
-    return {"notifications": user.get("notifications", [])}
+    mark_notifications_read(user_id, up_to_id)
+    return {"message": "read"}
 
 
 @router.get("/users/{user_id}/achievements")
 def get_achievements(user_id: str):
-    users = load_users()
-    user = next((u for u in users if u["user_id"] == user_id), None)
+    user = get_user(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return {"achievements": user.get("achievements", [])}
@@ -123,8 +188,7 @@ def get_achievements(user_id: str):
 
 @router.get("/users/{user_id}/tutorial_tasks")
 def tutorial_tasks(user_id: str):
-    users = load_users()
-    user = next((u for u in users if u["user_id"] == user_id), None)
+    user = get_user(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     created_at = user.get("created_at")
@@ -141,41 +205,40 @@ def tutorial_tasks(user_id: str):
 
 @router.post("/groups")
 def create_group(group: GroupCreate):
-    users = load_users()
-    for mid in group.members:
-        if not any(u["user_id"] == mid for u in users):
-            raise HTTPException(status_code=404, detail="Member not found")
-    groups = load_groups()
-    new_id = max([g["id"] for g in groups], default=0) + 1
+    found = {u["user_id"] for u in get_users(group.members)}
+    if any(mid not in found for mid in group.members):
+        raise HTTPException(status_code=404, detail="Member not found")
+    new_id = next_group_id()
     item = {"id": new_id, "name": group.name, "members": group.members}
-    groups.append(item)
-    save_groups(groups)
+    insert_group(item)
     return item
 
 
 @router.get("/groups/{user_id}")
 def list_groups(user_id: str):
-    groups = load_groups()
-    result = [g for g in groups if user_id in g.get("members", [])]
-    return {"groups": result}
+    return {"groups": list_user_groups(user_id)}
 
 
 @router.get("/groups/{group_id}/messages")
-def group_messages(group_id: int):
-    msgs = load_group_messages()
-    result = [m for m in msgs if m["group_id"] == group_id]
-    result.sort(key=lambda x: x["id"])
-    return {"messages": result}
+def group_messages(
+    group_id: int,
+    before_id: int | None = None,
+    since_id: int | None = None,
+    limit: int | None = None,
+    unpaginated: bool = False,
+):
+    limit = page_limit(limit, unpaginated)
+    messages = list_group_messages(
+        group_id, before_id=before_id, since_id=since_id, limit=limit
+    )
+    return {"messages": messages}
 
 
 @router.post("/groups/{group_id}/messages")
 async def send_group_message(group_id: int, msg: GroupMessageCreate):
-    groups = load_groups()
-    group = next((g for g in groups if g["id"] == group_id), None)
-    if not group or msg.sender_id not in group.get("members", []):
+    if not await is_group_member_async(group_id, msg.sender_id):
         raise HTTPException(status_code=403, detail="Not a member")
-    messages = load_group_messages()
-    new_id = max([m["id"] for m in messages], default=0) + 1
+    new_id = await next_group_message_id_async()
     item = {
         "id": new_id,
         "group_id": group_id,
@@ -183,26 +246,22 @@ async def send_group_message(group_id: int, msg: GroupMessageCreate):
         "content": msg.content,
         "created_at": datetime.utcnow().isoformat(),
     }
-    messages.append(item)
-    save_group_messages(messages)
+    await insert_group_message_async(item)
     schedule_broadcast({"type": "group_message", "group_id": group_id, "message": item})
     return item
 
 
 @router.get("/jobs")
-def list_jobs():
-    jobs = load_jobs()
-    jobs.sort(key=lambda x: x["id"], reverse=True)
-    return {"jobs": jobs}
+def list_jobs(page: Page = Depends()):
+    jobs = query_jobs(**page.query)
+    return {"jobs": jobs, "next_cursor": page.next_cursor(jobs)}
 
 
 @router.post("/jobs")
 async def create_job(job: JobPostCreate):
-    users = load_users()
-    if not any(u["user_id"] == job.author_id for u in users):
+    if not await get_user_async(job.author_id):
         raise HTTPException(status_code=404, detail="User not found")
-    jobs = load_jobs()
-    new_id = max([j["id"] for j in jobs], default=0) + 1
+    new_id = await next_job_id_async()
     item = {
         "id": new_id,
         "author_id": job.author_id,
@@ -212,58 +271,50 @@ async def create_job(job: JobPostCreate):
         "deadline": job.deadline,
         "created_at": datetime.utcnow().isoformat(),
     }
-    jobs.append(item)
-    save_jobs(jobs)
+    await insert_job_async(item)
     schedule_broadcast({"type": "new_job", "job": item})
     return item
 
 
 @router.get("/fan_posts")
-def list_fan_posts(viewer_id: str):
-    users = load_users()
-    viewer = next((u for u in users if u["user_id"] == viewer_id), None)
+def list_fan_posts(viewer_id: str, page: Page = Depends()):
+    viewer = get_user(viewer_id)
     if not viewer:
         raise HTTPException(status_code=404, detail="User not found")
     if viewer.get("role") != "推し人":
         raise HTTPException(status_code=403, detail="Only fans can view")
-    posts = load_fan_posts()
-    posts.sort(key=lambda x: x["id"], reverse=True)
-    return {"posts": posts}
+    posts = query_fan_posts(**page.query)
+    return {"posts": posts, "next_cursor": page.next_cursor(posts)}
 
 
 @router.post("/fan_posts")
 def create_fan_post(post: FanPostCreate):
-    users = load_users()
-    user = next((u for u in users if u["user_id"] == post.author_id), None)
+    user = get_user(post.author_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if user.get("role") != "推し人":
         raise HTTPException(status_code=403, detail="Only fans can post")
-    posts = load_fan_posts()
-    new_id = max([p["id"] for p in posts], default=0) + 1
+    new_id = next_fan_post_id()
     item = {
         "id": new_id,
         "author_id": post.author_id,
         "content": post.content,
         "created_at": datetime.utcnow().isoformat(),
     }
-    posts.append(item)
-    save_fan_posts(posts)
+    insert_fan_post(item)
     return item
 
 
 @router.post("/appeals")
 def create_appeal(appc: AppealCreate):
-    users = load_users()
-    user = next((u for u in users if u["user_id"] == appc.user_id), None)
+    user = get_user(appc.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if not is_semibanned(user):
         raise HTTPException(status_code=400, detail="Not semibanned")
-    appeals = load_appeals()
-    if any(a["user_id"] == appc.user_id and a["status"] == "pending" for a in appeals):
+    if has_pending_appeal(appc.user_id):
         raise HTTPException(status_code=400, detail="Already appealed")
-    new_id = max([a["id"] for a in appeals], default=0) + 1
+    new_id = next_appeal_id()
     item = {
         "id": new_id,
         "user_id": appc.user_id,
@@ -271,15 +322,13 @@ def create_appeal(appc: AppealCreate):
         "status": "pending",
         "created_at": datetime.utcnow().isoformat(),
     }
-    appeals.append(item)
-    save_appeals(appeals)
+    insert_appeal(item)
     return item
 
 
 @router.post("/appeals/{appeal_id}/resolve")
 def resolve_appeal(appeal_id: int, req: AppealResolveRequest):
-    appeals = load_appeals()
-    appeal = next((a for a in appeals if a["id"] == appeal_id), None)
+    appeal = get_appeal(appeal_id)
     if not appeal:
         raise HTTPException(status_code=404, detail="Appeal not found")
     if appeal.get("status") != "pending":
@@ -287,49 +336,38 @@ def resolve_appeal(appeal_id: int, req: AppealResolveRequest):
     action = req.action.lower()
     if action not in {"approve", "reject"}:
         raise HTTPException(status_code=400, detail="Invalid action")
-    users = load_users()
-    user = next((u for u in users if u["user_id"] == appeal["user_id"]), None)
+    user = get_user(appeal["user_id"])
     if action == "approve" and user:
         appeal["status"] = "approved"
         user["semiban_until"] = None
-        save_users(users)
+        update_user(user)
     elif action == "reject":
         appeal["status"] = "rejected"
-    save_appeals(appeals)
+    update_appeal(appeal)
     return {"message": appeal["status"]}
 
 
 @router.get("/appeals")
-def list_appeals():
-    appeals = load_appeals()
-    appeals.sort(key=lambda x: x["id"], reverse=True)
-    return {"appeals": appeals}
+def list_appeals(page: Page = Depends()):
+    appeals = query_appeals(**page.query)
+    return {"appeals": appeals, "next_cursor": page.next_cursor(appeals)}
 
 
 @router.get("/materials")
-def list_materials(keyword: str | None = None, category: str | None = None):
-    materials = load_materials()
-    if keyword:
-        kw = keyword.lower()
-        materials = [
-            m
-            for m in materials
-            if kw in m.get("title", "").lower()
-            or kw in m.get("description", "").lower()
-        ]
-    if category:
-        materials = [m for m in materials if m.get("category") == category]
-    materials.sort(key=lambda x: x["id"], reverse=True)
-    return {"materials": materials}
+def list_materials(
+    keyword: str | None = None,
+    category: str | None = None,
+    page: Page = Depends(),
+):
+    materials = query_materials(category, keyword, **page.query)
+    return {"materials": materials, "next_cursor": page.next_cursor(materials)}
 
 
 @router.post("/materials")
 def create_material(mat: MaterialCreate):
-    users = load_users()
-    if not any(u["user_id"] == mat.uploader_id for u in users):
+    if not get_user(mat.uploader_id):
         raise HTTPException(status_code=404, detail="User not found")
-    materials = load_materials()
-    new_id = max([m["id"] for m in materials], default=0) + 1
+    new_id = next_material_id()
     item = {
         "id": new_id,
         "uploader_id": mat.uploader_id,
@@ -339,70 +377,60 @@ def create_material(mat: MaterialCreate):
         "url": mat.url,
         "created_at": datetime.utcnow().isoformat(),
     }
-    materials.append(item)
-    save_materials(materials)
+    insert_material(item)
     return item
 
 
 @router.post("/materials/{material_id}/save")
 def save_material_to_box(material_id: int, req: MaterialBoxRequest):
-    materials = load_materials()
-    if not any(m["id"] == material_id for m in materials):
+    if not get_material(material_id):
         raise HTTPException(status_code=404, detail="Material not found")
-    users = load_users()
-    user = next((u for u in users if u["user_id"] == req.user_id), None)
+    user = get_user(req.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     box = user.setdefault("material_box", [])
     if material_id not in box:
         box.append(material_id)
-        save_users(users)
+        update_user(user)
     return {"count": len(box)}
 
 
 @router.post("/materials/{material_id}/unsave")
 def unsave_material_from_box(material_id: int, req: MaterialBoxRequest):
-    users = load_users()
-    user = next((u for u in users if u["user_id"] == req.user_id), None)
+    user = get_user(req.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     box = user.setdefault("material_box", [])
     if material_id in box:
         box.remove(material_id)
-        save_users(users)
+        update_user(user)
     return {"count": len(box)}
 
 
 @router.get("/users/{user_id}/material_box")
 def list_material_box(user_id: str):
-    users = load_users()
-    user = next((u for u in users if u["user_id"] == user_id), None)
+    user = get_user(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    materials = load_materials()
-    ids = set(user.get("material_box", []))
-    result = [m for m in materials if m["id"] in ids]
+    result = get_materials(set(user.get("material_box", [])))
     result.sort(key=lambda x: x["id"], reverse=True)
     return {"materials": result}
 
 
 @router.get("/polls")
-def list_polls():
-    polls = load_polls()
-    polls.sort(key=lambda x: x["id"], reverse=True)
-    return {"polls": polls}
+def list_polls(page: Page = Depends()):
+    polls = query_polls(**page.query)
+    return {"polls": polls, "next_cursor": page.next_cursor(polls)}
 
 
 @router.post("/polls")
 async def create_poll(poll: PollCreate):
-    users = load_users()
-    user = next((u for u in users if u["user_id"] == poll.author_id), None)
+    user = await get_user_async(poll.author_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if user.get("role") != "推され人":
         raise HTTPException(status_code=403, detail="Only performers can create")
-    polls = load_polls()
-    new_id = max([p["id"] for p in polls], default=0) + 1
+    new_id = await next_poll_id_async()
     item = {
         "id": new_id,
         "author_id": poll.author_id,
@@ -411,16 +439,14 @@ async def create_poll(poll: PollCreate):
         "votes": [[] for _ in poll.options],
         "created_at": datetime.utcnow().isoformat(),
     }
-    polls.append(item)
-    save_polls(polls)
+    await insert_poll_async(item)
     schedule_broadcast({"type": "new_poll", "poll": item})
     return item
 
 
 @router.get("/polls/{poll_id}")
 def get_poll(poll_id: int):
-    polls = load_polls()
-    poll = next((p for p in polls if p["id"] == poll_id), None)
+    poll = fetch_poll(poll_id)
     if not poll:
         raise HTTPException(status_code=404, detail="Poll not found")
     return poll
@@ -428,12 +454,10 @@ def get_poll(poll_id: int):
 
 @router.post("/polls/{poll_id}/vote")
 async def vote_poll(poll_id: int, req: PollVoteRequest):
-    polls = load_polls()
-    poll = next((p for p in polls if p["id"] == poll_id), None)
+    poll = await get_poll_async(poll_id)
     if not poll:
         raise HTTPException(status_code=404, detail="Poll not found")
-    users = load_users()
-    if not any(u["user_id"] == req.user_id for u in users):
+    if not await get_user_async(req.user_id):
         raise HTTPException(status_code=404, detail="User not found")
     if req.option < 0 or req.option >= len(poll.get("options", [])):
         raise HTTPException(status_code=400, detail="Invalid option")
@@ -441,7 +465,7 @@ async def vote_poll(poll_id: int, req: PollVoteRequest):
         if req.user_id in voters:
             voters.remove(req.user_id)
     poll["votes"][req.option].append(req.user_id)
-    save_polls(polls)
+    await update_poll_async(poll)
     counts = [len(v) for v in poll["votes"]]
     schedule_broadcast({"type": "vote", "poll_id": poll_id, "counts": counts})
     return {"counts": counts}
@@ -449,11 +473,9 @@ async def vote_poll(poll_id: int, req: PollVoteRequest):
 
 @router.post("/schedules")
 def create_schedule(req: ScheduleCreate):
-    users = load_users()
-    if not any(u["user_id"] == req.author_id for u in users):
+    if not get_user(req.author_id):
         raise HTTPException(status_code=404, detail="User not found")
-    schedules = load_schedules()
-    new_id = max([s["id"] for s in schedules], default=0) + 1
+    new_id = next_schedule_id()
     events = [e.dict() for e in req.events]
     item = {
         "id": new_id,
@@ -462,8 +484,7 @@ def create_schedule(req: ScheduleCreate):
         "template": req.template or "default",
         "created_at": datetime.utcnow().isoformat(),
     }
-    schedules.append(item)
-    save_schedules(schedules)
+    insert_schedule(item)
     image = generate_schedule_image(events)
     item_with_image = item | {"image": image}
     return item_with_image
@@ -471,8 +492,7 @@ def create_schedule(req: ScheduleCreate):
 
 @router.get("/schedules/{schedule_id}/image")
 def get_schedule_image(schedule_id: int):
-    schedules = load_schedules()
-    sched = next((s for s in schedules if s["id"] == schedule_id), None)
+    sched = get_schedule(schedule_id)
     if not sched:
         raise HTTPException(status_code=404, detail="Schedule not found")
     image = generate_schedule_image(sched.get("events", []))
@@ -481,11 +501,9 @@ def get_schedule_image(schedule_id: int):
 
 @router.post("/approval_calendars")
 def create_calendar(cal: ApprovalCalendarCreate):
-    users = load_users()
-    if not any(u["user_id"] == cal.author_id for u in users):
+    if not get_user(cal.author_id):
         raise HTTPException(status_code=404, detail="User not found")
-    calendars = load_approval_calendars()
-    new_id = max([c["id"] for c in calendars], default=0) + 1
+    new_id = next_approval_calendar_id()
     slots = []
     for i, s in enumerate(cal.slots, start=1):
         data = s.dict()
@@ -499,22 +517,18 @@ def create_calendar(cal: ApprovalCalendarCreate):
         "slots": slots,
         "created_at": datetime.utcnow().isoformat(),
     }
-    calendars.append(item)
-    save_approval_calendars(calendars)
+    insert_approval_calendar(item)
     return item
 
 
 @router.get("/approval_calendars/{user_id}")
 def get_calendars(user_id: str):
-    calendars = load_approval_calendars()
-    result = [c for c in calendars if c["author_id"] == user_id]
-    return {"calendars": result}
+    return {"calendars": list_calendars_by_author(user_id)}
 
 
 @router.post("/approval_calendars/{calendar_id}/request")
 def request_slot(calendar_id: int, req: CalendarRequest):
-    calendars = load_approval_calendars()
-    cal = next((c for c in calendars if c["id"] == calendar_id), None)
+    cal = get_approval_calendar(calendar_id)
     if not cal:
         raise HTTPException(status_code=404, detail="Calendar not found")
     slot = next((s for s in cal["slots"] if s["id"] == req.slot_id), None)
@@ -523,14 +537,13 @@ def request_slot(calendar_id: int, req: CalendarRequest):
     if req.user_id in slot.get("approved", []) or req.user_id in slot.get("requests", []):
         return {"status": "already"}
     slot.setdefault("requests", []).append(req.user_id)
-    save_approval_calendars(calendars)
+    update_approval_calendar(cal)
     return {"status": "requested"}
 
 
 @router.post("/approval_calendars/{calendar_id}/approve")
 def approve_slot(calendar_id: int, req: CalendarApproveRequest):
-    calendars = load_approval_calendars()
-    cal = next((c for c in calendars if c["id"] == calendar_id), None)
+    cal = get_approval_calendar(calendar_id)
     if not cal:
         raise HTTPException(status_code=404, detail="Calendar not found")
     if cal["author_id"] != req.user_id:
@@ -544,6 +557,10 @@ def approve_slot(calendar_id: int, req: CalendarApproveRequest):
         raise HTTPException(status_code=400, detail="Capacity full")
     slot["requests"].remove(req.requester_id)
     slot.setdefault("approved", []).append(req.requester_id)
-    save_approval_calendars(calendars)
+    update_approval_calendar(cal)
     return {"status": "approved"}
 
+
+@router.get("/cache_stats")
+def get_cache_stats():
+    return cache_stats()
@@ -1,6 +1,5 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from datetime import datetime, timedelta
-from collections import Counter
 from ..models import (
     PostCreate,
     CommentCreate,
@@ -11,17 +10,46 @@ from ..models import (
     ReportCreate,
 )
 from ..crud import (
-    load_users,
-    save_users,
-    load_posts,
-    save_posts,
-    get_post,
+    get_user as fetch_user,
+    get_user_async,
+    get_users,
+    list_users,
+    update_user,
+    update_user_async,
+    most_followed_ids,
+    block_related_ids,
+    next_post_id_async,
+    get_post as fetch_post,
+    get_post_async,
+    publish_post_async,
     update_post,
-    load_comments,
-    save_comments,
-    load_reports,
-    save_reports,
+    set_like_async,
+    set_retweet_async,
+    query_posts,
+    query_home_timeline,
+    query_trending_posts,
+    query_tag_posts,
+    query_search_posts,
+    popular_tags as top_tags,
+    TAG_WINDOWS,
+    ALL_TIME,
+    with_engagement,
+    liker_ids,
+    add_bookmark,
+    remove_bookmark,
+    count_bookmarks,
+    author_has_posts_async,
+    get_comment,
+    next_comment_id,
+    insert_comment,
+    list_post_comments,
+    comment_exists,
+    author_has_comments,
+    next_report_id,
+    insert_report,
+    report_exists,
 )
+from ..pagination import Page, page_limit
 from ..utils import (
     remove_sensitive_fields,
     add_achievement,
@@ -38,15 +66,13 @@ router = APIRouter()
 
 @router.post("/posts")
 async def create_post(post: PostCreate):
-    users = load_users()
-    user = next((u for u in users if u["user_id"] == post.author_id), None)
+    user = await get_user_async(post.author_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if is_semibanned(user):
         raise HTTPException(status_code=403, detail="Temporarily banned")
-    posts = load_posts()
-    first_post = not any(p["author_id"] == post.author_id for p in posts)
-    new_id = max([p["id"] for p in posts], default=0) + 1
+    first_post = not await author_has_posts_async(post.author_id)
+    new_id = await next_post_id_async()
     item = {
         "id": new_id,
         "author_id": post.author_id,
@@ -55,16 +81,17 @@ async def create_post(post: PostCreate):
         "category": post.category,
         "anonymous": post.anonymous,
         "best_answer_id": None,
-        "likes": [],
-        "retweets": [],
+        "like_count": 0,
+        "retweet_count": 0,
+        "comment_count": 0,
         "image": post.image,
         "created_at": datetime.utcnow().isoformat(),
     }
-    posts.append(item)
-    save_posts(posts)
+    await publish_post_async(item)
     if first_post:
         add_achievement(user, FIRST_POST_ACHIEVEMENT)
-        save_users(users)
+        await update_user_async(user)
+    item = item | {"liked": False, "retweeted": False}
     schedule_broadcast({"type": "new_post", "post": item})
     return item
 
@@ -75,212 +102,235 @@ def list_posts(
     user_id: str | None = None,
     category: str | None = None,
     anonymous: bool | None = None,
+    page: Page = Depends(),
 ):
-    posts = load_posts()
-    users = load_users()
-    blocked_me = set()
-    blocked_by_me = set()
-    if user_id:
-        me = next((u for u in users if u["user_id"] == user_id), None)
-        if me:
-            blocked_me = set(u["user_id"] for u in users if user_id in u.get("blocks", []))
-            blocked_by_me = set(me.get("blocks", []))
-    if category:
-        posts = [p for p in posts if p.get("category") == category]
-    if anonymous is not None:
-        posts = [p for p in posts if bool(p.get("anonymous")) == anonymous]
+    blocked = set()
+    me = fetch_user(user_id) if user_id else None
+    if me:
+        blocked = block_related_ids(user_id)
     if feed == "following" and user_id:
-        me = next((u for u in users if u["user_id"] == user_id), None)
         if not me:
             raise HTTPException(status_code=404, detail="User not found")
-        follow = set(me.get("following", []))
-        posts = [p for p in posts if p["author_id"] in follow or p["author_id"] == user_id]
-    elif feed == "user" and user_id:
-        posts = [p for p in posts if p["author_id"] == user_id]
+        posts = query_home_timeline(
+            user_id,
+            exclude_authors=blocked,
+            category=category,
+            anonymous=anonymous,
+            **page.query,
+        )
+    else:
+        posts = query_posts(
+            author_ids={user_id} if feed == "user" and user_id else None,
+            exclude_authors=blocked,
+            category=category,
+            anonymous=anonymous,
+            **page.query,
+        )
     result = []
-    for p in posts:
-        if user_id and (p["author_id"] in blocked_by_me or p["author_id"] in blocked_me):
-            continue
-        item = p.copy()
+    for item in with_engagement(posts, user_id):
         if item.get("anonymous"):
             item["author_id"] = "匿名"
         result.append(item)
-    result.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-    return {"posts": result}
+    return {"posts": result, "next_cursor": page.next_cursor(posts)}
 
 
 @router.get("/recommended_users")
 def recommended_users():
-    users = load_users()
-    ranked = sorted(users, key=lambda u: len(u.get("followers", [])), reverse=True)
-    return [remove_sensitive_fields(u) for u in ranked[:5]]
+    ranked = get_users(most_followed_ids(5))
+    if len(ranked) < 5:
+        seen = [u["user_id"] for u in ranked]
+        ranked += list_users(exclude=seen, limit=5 - len(ranked))
+    return [remove_sensitive_fields(u) for u in ranked]
 
 
 @router.get("/popular_tags")
-def popular_tags():
-    posts = load_posts()
-    counter = Counter()
-    for p in posts:
-        for t in p.get("tags", []):
-            counter[t] += 1
-    return [{"name": t, "count": c} for t, c in counter.most_common(10)]
+def popular_tags(window: str = ALL_TIME):
+    if window != ALL_TIME and window not in TAG_WINDOWS:
+        raise HTTPException(status_code=400, detail="Invalid window")
+    return top_tags(window, 10)
 
 
 @router.get("/trending_posts")
-def trending_posts():
-    posts = load_posts()
-    posts.sort(key=lambda x: len(x.get("likes", [])) + len(x.get("retweets", [])), reverse=True)
+def trending_posts(
+    category: str | None = None, tag: str | None = None, viewer_id: str | None = None
+):
+    # Rankings are kept per category and per tag, not per combination.
+    if category and tag:
+        raise HTTPException(status_code=400, detail="Use either category or tag")
     result = []
-    for p in posts[:10]:
-        item = p.copy()
+    posts = query_trending_posts(10, category=category, tag=tag)
+    for item in with_engagement(posts, viewer_id):
         if item.get("anonymous"):
             item["author_id"] = "匿名"
         result.append(item)
     return {"posts": result}
 
 
+@router.get("/posts/search")
+def search_posts(q: str, viewer_id: str | None = None, page: Page = Depends()):
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Empty query")
+    hits = query_search_posts(q, **page.query)
+    posts = [post for post, _ in hits]
+    result = []
+    for item in with_engagement(posts, viewer_id):
+        if item.get("anonymous"):
+            item["author_id"] = "匿名"
+        result.append(item)
+    return {
+        "posts": result,
+        "next_cursor": page.next_cursor(posts, [position for _, position in hits]),
+    }
+
+
+@router.get("/posts/by_tag")
+def posts_by_tag(tag: str, viewer_id: str | None = None, page: Page = Depends()):
+    posts = query_tag_posts(tag, **page.query)
+    result = []
+    for item in with_engagement(posts, viewer_id):
+        if item.get("anonymous"):
+            item["author_id"] = "匿名"
+        result.append(item)
+    return {"posts": result, "next_cursor": page.next_cursor(posts)}
+
+
 @router.get("/posts/{post_id}")
-def get_post(post_id: int):
-    posts = load_posts()
-    post = next((p for p in posts if p["id"] == post_id), None)
+def get_post(post_id: int, viewer_id: str | None = None):
+    post = fetch_post(post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
-    item = post.copy()
+    item = with_engagement([post], viewer_id)[0]
     if item.get("anonymous"):
         item["author_id"] = "匿名"
     return item
 
 
-@router.get("/posts/by_tag")
-def posts_by_tag(tag: str):
-    posts = load_posts()
-    result = []
-    for p in posts:
-        if tag in p.get("tags", []):
-            item = p.copy()
-            if item.get("anonymous"):
-                item["author_id"] = "匿名"
-            result.append(item)
-    result.sort(key=lambda x: x["id"], reverse=True)
-    return {"posts": result}
-
-
 @router.post("/posts/{post_id}/like")
 async def like_post(post_id: int, data: LikeRequest):
-    post = get_post(post_id)
+    post = await get_post_async(post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
-    likes = post.setdefault("likes", [])
-    if data.user_id not in likes:
-        likes.append(data.user_id)
-        update_post(post)
-        schedule_broadcast({"type": "like", "post_id": post_id, "likes": likes})
-    return {"likes": len(likes)}
+    post, changed = await set_like_async(post_id, data.user_id, True)
+    if changed:
+        schedule_broadcast(
+            {
+                "type": "like",
+                "post_id": post_id,
+                "like_count": post["like_count"],
+                "user_id": data.user_id,
+                "liked": True,
+            }
+        )
+    return {"likes": post["like_count"]}
 
 
 @router.post("/posts/{post_id}/unlike")
 async def unlike_post(post_id: int, data: LikeRequest):
-    post = get_post(post_id)
+    post = await get_post_async(post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
-    likes = post.setdefault("likes", [])
-    if data.user_id in likes:
-        likes.remove(data.user_id)
-        update_post(post)
-        schedule_broadcast({"type": "like", "post_id": post_id, "likes": likes})
-    return {"likes": len(likes)}
+    post, changed = await set_like_async(post_id, data.user_id, False)
+    if changed:
+        schedule_broadcast(
+            {
+                "type": "like",
+                "post_id": post_id,
+                "like_count": post["like_count"],
+                "user_id": data.user_id,
+                "liked": False,
+            }
+        )
+    return {"likes": post["like_count"]}
 
 
 @router.post("/posts/{post_id}/retweet")
 async def retweet_post(post_id: int, data: RetweetRequest):
-    post = get_post(post_id)
+    post = await get_post_async(post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
-    retweets = post.setdefault("retweets", [])
-    if data.user_id not in retweets:
-        retweets.append(data.user_id)
-        update_post(post)
-        schedule_broadcast({"type": "retweet", "post_id": post_id, "retweets": retweets})
-    return {"retweets": len(retweets)}
+    post, changed = await set_retweet_async(post_id, data.user_id, True)
+    if changed:
+        schedule_broadcast(
+            {
+                "type": "retweet",
+                "post_id": post_id,
+                "retweet_count": post["retweet_count"],
+                "user_id": data.user_id,
+                "retweeted": True,
+            }
+        )
+    return {"retweets": post["retweet_count"]}
 
 
 @router.post("/posts/{post_id}/unretweet")
 async def unretweet_post(post_id: int, data: RetweetRequest):
-    post = get_post(post_id)
+    post = await get_post_async(post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
-    retweets = post.setdefault("retweets", [])
-    if data.user_id in retweets:
-        retweets.remove(data.user_id)
-        update_post(post)
-        schedule_broadcast({"type": "retweet", "post_id": post_id, "retweets": retweets})
-    return {"retweets": len(retweets)}
+    post, changed = await set_retweet_async(post_id, data.user_id, False)
+    if changed:
+        schedule_broadcast(
+            {
+                "type": "retweet",
+                "post_id": post_id,
+                "retweet_count": post["retweet_count"],
+                "user_id": data.user_id,
+                "retweeted": False,
+            }
+        )
+    return {"retweets": post["retweet_count"]}
 
 
 @router.post("/posts/{post_id}/bookmark")
 def bookmark_post(post_id: int, data: BookmarkRequest):
-    posts = load_posts()
-    if not any(p["id"] == post_id for p in posts):
+    if not fetch_post(post_id):
         raise HTTPException(status_code=404, detail="Post not found")
-    users = load_users()
-    user = next((u for u in users if u["user_id"] == data.user_id), None)
-    if not user:
+    if not fetch_user(data.user_id):
         raise HTTPException(status_code=404, detail="User not found")
-    bookmarks = user.setdefault("bookmarks", [])
-    if post_id not in bookmarks:
-        bookmarks.append(post_id)
-        save_users(users)
-    return {"bookmarks": len(bookmarks)}
+    add_bookmark(post_id, data.user_id)
+    return {"bookmarks": count_bookmarks(data.user_id)}
 
 
 @router.post("/posts/{post_id}/unbookmark")
 def unbookmark_post(post_id: int, data: BookmarkRequest):
-    posts = load_posts()
-    if not any(p["id"] == post_id for p in posts):
+    if not fetch_post(post_id):
         raise HTTPException(status_code=404, detail="Post not found")
-    users = load_users()
-    user = next((u for u in users if u["user_id"] == data.user_id), None)
-    if not user:
+    if not fetch_user(data.user_id):
         raise HTTPException(status_code=404, detail="User not found")
-    bookmarks = user.setdefault("bookmarks", [])
-    if post_id in bookmarks:
-        bookmarks.remove(post_id)
-        save_users(users)
-    return {"bookmarks": len(bookmarks)}
+    remove_bookmark(post_id, data.user_id)
+    return {"bookmarks": count_bookmarks(data.user_id)}
 
 
 @router.get("/posts/{post_id}/likers")
 def list_likers(post_id: int):
-    posts = load_posts()
-    post = next((p for p in posts if p["id"] == post_id), None)
+    post = fetch_post(post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
-    users = load_users()
-    result = [remove_sensitive_fields(u) for u in users if u["user_id"] in post.get("likes", [])]
-    return result
+    return [remove_sensitive_fields(u) for u in get_users(liker_ids(post_id))]
 
 
 @router.get("/posts/{post_id}/comments")
-def list_comments(post_id: int):
-    comments = load_comments()
-    post_comments = [c for c in comments if c["post_id"] == post_id]
-    return {"comments": post_comments}
+def list_comments(
+    post_id: int,
+    after: int | None = None,
+    limit: int | None = None,
+    unpaginated: bool = False,
+):
+    limit = page_limit(limit, unpaginated)
+    return {"comments": list_post_comments(post_id, after=after, limit=limit)}
 
 
 @router.post("/posts/{post_id}/comments")
 def create_comment(post_id: int, comment: CommentCreate):
-    posts = load_posts()
-    if not any(p["id"] == post_id for p in posts):
+    if not fetch_post(post_id):
         raise HTTPException(status_code=404, detail="Post not found")
-    users = load_users()
-    user = next((u for u in users if u["user_id"] == comment.author_id), None)
+    user = fetch_user(comment.author_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if is_semibanned(user):
         raise HTTPException(status_code=403, detail="Temporarily banned")
-    comments = load_comments()
-    first_comment = not any(c["author_id"] == comment.author_id for c in comments)
-    new_id = max([c["id"] for c in comments], default=0) + 1
+    first_comment = not author_has_comments(comment.author_id)
+    new_id = next_comment_id()
     item = {
         "id": new_id,
         "post_id": post_id,
@@ -288,52 +338,40 @@ def create_comment(post_id: int, comment: CommentCreate):
         "content": comment.content,
         "created_at": datetime.utcnow().isoformat(),
     }
-    comments.append(item)
-    save_comments(comments)
+    insert_comment(item)
     if first_comment:
         add_achievement(user, FIRST_COMMENT_ACHIEVEMENT)
-        save_users(users)
+        update_user(user)
     return item
 
 
 @router.put("/posts/{post_id}/best_answer")
 def set_best_answer(post_id: int, req: BestAnswerRequest):
-    posts = load_posts()
-    post = next((p for p in posts if p["id"] == post_id), None)
+    post = fetch_post(post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     if post["author_id"] != req.user_id:
         raise HTTPException(status_code=403, detail="Forbidden")
-    comments = load_comments()
-    if not any(c["id"] == req.comment_id and c["post_id"] == post_id for c in comments):
+    if not comment_exists(req.comment_id, post_id):
         raise HTTPException(status_code=404, detail="Comment not found")
-    if post.get("best_answer_id") == req.comment_id:
-        post["best_answer_id"] = None
-    else:
-        post["best_answer_id"] = req.comment_id
-    save_posts(posts)
-    return {"best_answer_id": post["best_answer_id"]}
+    best_answer_id = None if post.get("best_answer_id") == req.comment_id else req.comment_id
+    update_post(post_id, {"best_answer_id": best_answer_id})
+    return {"best_answer_id": best_answer_id}
 
 
 @router.post("/reports/post/{post_id}")
 def report_post(post_id: int, rep: ReportCreate):
-    posts = load_posts()
-    post = next((p for p in posts if p["id"] == post_id), None)
+    post = fetch_post(post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
-    users = load_users()
-    reporter = next((u for u in users if u["user_id"] == rep.reporter_id), None)
+    reporter = fetch_user(rep.reporter_id)
     if not reporter:
         raise HTTPException(status_code=404, detail="User not found")
     if rep.category not in REPORT_CATEGORIES:
         raise HTTPException(status_code=400, detail="Invalid category")
-    reports = load_reports()
-    if any(
-        r["target_type"] == "post" and r["target_id"] == post_id and r["reporter_id"] == rep.reporter_id
-        for r in reports
-    ):
+    if report_exists("post", post_id, rep.reporter_id):
         raise HTTPException(status_code=400, detail="Already reported")
-    new_id = max([r["id"] for r in reports], default=0) + 1
+    new_id = next_report_id()
     item = {
         "id": new_id,
         "target_type": "post",
@@ -343,38 +381,31 @@ def report_post(post_id: int, rep: ReportCreate):
         "reason": rep.reason or "",
         "created_at": datetime.utcnow().isoformat(),
     }
-    reports.append(item)
-    target = next((u for u in users if u["user_id"] == post["author_id"]), None)
+    insert_report(item)
+    target = fetch_user(post["author_id"])
     if target:
         weight = ROLE_REPORT_POINTS.get(reporter.get("role"), 1)
         target["report_points"] = target.get("report_points", 0) + weight
         if target["report_points"] >= 3:
             target["semiban_until"] = (datetime.utcnow() + timedelta(days=7)).isoformat()
             target["report_points"] = 0
-    save_reports(reports)
-    save_users(users)
+        update_user(target)
     return {"message": "reported"}
 
 
 @router.post("/reports/comment/{comment_id}")
 def report_comment(comment_id: int, rep: ReportCreate):
-    comments = load_comments()
-    comment = next((c for c in comments if c["id"] == comment_id), None)
+    comment = get_comment(comment_id)
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
-    users = load_users()
-    reporter = next((u for u in users if u["user_id"] == rep.reporter_id), None)
+    reporter = fetch_user(rep.reporter_id)
     if not reporter:
         raise HTTPException(status_code=404, detail="User not found")
     if rep.category not in REPORT_CATEGORIES:
         raise HTTPException(status_code=400, detail="Invalid category")
-    reports = load_reports()
-    if any(
-        r["target_type"] == "comment" and r["target_id"] == comment_id and r["reporter_id"] == rep.reporter_id
-        for r in reports
-    ):
+    if report_exists("comment", comment_id, rep.reporter_id):
         raise HTTPException(status_code=400, detail="Already reported")
-    new_id = max([r["id"] for r in reports], default=0) + 1
+    new_id = next_report_id()
     item = {
         "id": new_id,
         "target_type": "comment",
@@ -384,14 +415,13 @@ def report_comment(comment_id: int, rep: ReportCreate):
         "reason": rep.reason or "",
         "created_at": datetime.utcnow().isoformat(),
     }
-    reports.append(item)
-    target = next((u for u in users if u["user_id"] == comment["author_id"]), None)
+    insert_report(item)
+    target = fetch_user(comment["author_id"])
     if target:
         weight = ROLE_REPORT_POINTS.get(reporter.get("role"), 1)
         target["report_points"] = target.get("report_points", 0) + weight
         if target["report_points"] >= 3:
             target["semiban_until"] = (datetime.utcnow() + timedelta(days=7)).isoformat()
             target["report_points"] = 0
-    save_reports(reports)
-    save_users(users)
+        update_user(target)
     return {"message": "reported"}
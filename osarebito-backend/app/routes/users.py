@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from datetime import datetime
 from ..models import (
     User,
@@ -11,11 +11,40 @@ from ..models import (
     BlockRequest,
 )
 from ..crud import (
-    load_users,
-    save_users,
-    load_posts,
-    save_posts,
+    get_user as fetch_user,
+    get_users,
+    insert_user,
+    index_user,
+    query_search_users,
+    index_creator_profile,
+    query_creator_profiles,
+    creator_facets,
+    CREATOR_FACETS,
+    update_user,
+    notify,
+    follow,
+    unfollow,
+    is_following,
+    backfill_timeline,
+    prune_timeline,
+    follower_ids,
+    following_ids,
+    mutual_follower_ids,
+    suggested_ids,
+    block,
+    unblock,
+    is_blocked,
+    blocked_ids,
+    add_interest as record_interest,
+    remove_interest as drop_interest,
+    user_relations,
+    with_engagement,
+    query_bookmarked_posts,
+    bookmarked_among,
+    query_retweeted_posts,
 )
+from ..config import settings
+from ..pagination import Page, decode_cursor, encode_position, page_limit
 from ..utils import (
     ALLOWED_ROLES,
     remove_sensitive_fields,
@@ -28,103 +57,78 @@ router = APIRouter()
 def register(user: User):
     if user.role not in ALLOWED_ROLES:
         raise HTTPException(status_code=400, detail="Invalid role")
-    users = load_users()
-    if any(u["user_id"] == user.user_id for u in users):
+    if fetch_user(user.user_id):
         raise HTTPException(status_code=400, detail="User ID already exists")
-    users.append(
+    insert_user(
         {
             **user.dict(),
             "created_at": datetime.utcnow().isoformat(),
             "profile": {},
             "collab_profile": {},
             "creator_profile": {},
-            "followers": [],
-            "following": [],
-            "interested": [],
-            "bookmarks": [],
-            "notifications": [],
             "achievements": [],
             "report_points": 0,
             "semiban_until": None,
-            "blocks": [],
         }
     )
-    save_users(users)
     return {"message": "registered"}
 
 
 @router.post("/login")
 def login(data: LoginInput):
-    users = load_users()
-    for u in users:
-        if u["user_id"] == data.user_id and u["password"] == data.password:
-            return {"message": "logged in"}
+    u = fetch_user(data.user_id)
+    if u and u["password"] == data.password:
+        return {"message": "logged in"}
     raise HTTPException(status_code=401, detail="Invalid credentials")
 
 
+@router.get("/users/search")
+def search_users(query: str, limit: int = 20):
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="Invalid limit")
+    return query_search_users(query, min(limit, settings.page_size_max))
+
+
 @router.get("/users/{user_id}")
 def get_user(user_id: str, viewer_id: str | None = None):
-    users = load_users()
-    for u in users:
-        if u["user_id"] == user_id:
-            result = remove_sensitive_fields(u)
-            profile = result.get("profile", {})
-            vis = profile.get("visibility", "public")
-            if viewer_id != user_id:
-                if vis == "private" or (
-                    vis == "followers" and viewer_id not in u.get("followers", [])
-                ):
-                    result["profile"] = {}
-            return result
-    raise HTTPException(status_code=404, detail="User not found")
+    u = fetch_user(user_id)
+    if not u:
+        raise HTTPException(status_code=404, detail="User not found")
+    result = remove_sensitive_fields(u) | user_relations(user_id, viewer_id)
+    profile = result.get("profile", {})
+    vis = profile.get("visibility", "public")
+    if viewer_id != user_id:
+        if vis == "private" or (
+            vis == "followers" and not (viewer_id and result["followed"])
+        ):
+            result["profile"] = {}
+    return result
 
 
 @router.post("/users/{target_id}/follow")
 def follow_user(target_id: str, data: FollowRequest):
     if target_id == data.follower_id:
         raise HTTPException(status_code=400, detail="Cannot follow yourself")
-    users = load_users()
-    target = next((u for u in users if u["user_id"] == target_id), None)
-    follower = next((u for u in users if u["user_id"] == data.follower_id), None)
+    target = fetch_user(target_id)
+    follower = fetch_user(data.follower_id)
     if not target or not follower:
         raise HTTPException(status_code=404, detail="User not found")
-    if target_id in follower.get("blocks", []) or data.follower_id in target.get("blocks", []):
+    if is_blocked(data.follower_id, target_id):
         raise HTTPException(status_code=403, detail="Blocked")
-    followers = target.setdefault("followers", [])
-    following = follower.setdefault("following", [])
-    new = False
-    if data.follower_id not in followers:
-        followers.append(data.follower_id)
-        new = True
-    if target_id not in following:
-        following.append(target_id)
-    if new:
-        notes = target.setdefault("notifications", [])
-        notes.append(
-            {
-                "type": "follow",
-                "from": data.follower_id,
-                "created_at": datetime.utcnow().isoformat(),
-            }
-        )
-    save_users(users)
+    if follow(data.follower_id, target_id):
+        backfill_timeline(data.follower_id, target_id)
+        notify(target_id, "follow", data.follower_id)
     return {"message": "followed"}
 
 
 @router.post("/users/{target_id}/unfollow")
 def unfollow_user(target_id: str, data: FollowRequest):
-    users = load_users()
-    target = next((u for u in users if u["user_id"] == target_id), None)
-    follower = next((u for u in users if u["user_id"] == data.follower_id), None)
+    target = fetch_user(target_id)
+    follower = fetch_user(data.follower_id)
     if not target or not follower:
         raise HTTPException(status_code=404, detail="User not found")
-    followers = target.setdefault("followers", [])
-    following = follower.setdefault("following", [])
-    if data.follower_id in followers:
-        followers.remove(data.follower_id)
-    if target_id in following:
-        following.remove(target_id)
-    save_users(users)
+    if unfollow(data.follower_id, target_id):
+        prune_timeline(data.follower_id, target_id)
     return {"message": "unfollowed"}
 
 
@@ -132,28 +136,20 @@ def unfollow_user(target_id: str, data: FollowRequest):
 def add_interest(target_id: str, data: InterestRequest):
     if target_id == data.user_id:
         raise HTTPException(status_code=400, detail="Cannot interest yourself")
-    users = load_users()
-    target = next((u for u in users if u["user_id"] == target_id), None)
-    requester = next((u for u in users if u["user_id"] == data.user_id), None)
+    target = fetch_user(target_id)
+    requester = fetch_user(data.user_id)
     if not target or not requester:
         raise HTTPException(status_code=404, detail="User not found")
-    lst = target.setdefault("interested", [])
-    if data.user_id not in lst:
-        lst.append(data.user_id)
-        save_users(users)
+    record_interest(data.user_id, target_id)
     return {"message": "interested"}
 
 
 @router.post("/users/{target_id}/uninterest")
 def remove_interest(target_id: str, data: InterestRequest):
-    users = load_users()
-    target = next((u for u in users if u["user_id"] == target_id), None)
+    target = fetch_user(target_id)
     if not target:
         raise HTTPException(status_code=404, detail="User not found")
-    lst = target.setdefault("interested", [])
-    if data.user_id in lst:
-        lst.remove(data.user_id)
-        save_users(users)
+    drop_interest(data.user_id, target_id)
     return {"message": "uninterested"}
 
 
@@ -161,204 +157,231 @@ def remove_interest(target_id: str, data: InterestRequest):
 def block_user(target_id: str, req: BlockRequest):
     if target_id == req.user_id:
         raise HTTPException(status_code=400, detail="Cannot block yourself")
-    users = load_users()
-    target = next((u for u in users if u["user_id"] == target_id), None)
-    me = next((u for u in users if u["user_id"] == req.user_id), None)
+    target = fetch_user(target_id)
+    me = fetch_user(req.user_id)
     if not target or not me:
         raise HTTPException(status_code=404, detail="User not found")
-    blocks = me.setdefault("blocks", [])
-    if target_id not in blocks:
-        blocks.append(target_id)
-        if target_id in me.get("following", []):
-            me["following"].remove(target_id)
-        if req.user_id in target.get("followers", []):
-            target["followers"].remove(req.user_id)
-        save_users(users)
+    block(req.user_id, target_id)
     return {"message": "blocked"}
 
 
 @router.post("/users/{target_id}/unblock")
 def unblock_user(target_id: str, req: BlockRequest):
-    users = load_users()
-    me = next((u for u in users if u["user_id"] == req.user_id), None)
+    me = fetch_user(req.user_id)
     if not me:
         raise HTTPException(status_code=404, detail="User not found")
-    blocks = me.setdefault("blocks", [])
-    if target_id in blocks:
-        blocks.remove(target_id)
-        save_users(users)
+    if unblock(req.user_id, target_id) and is_following(target_id, req.user_id):
+        backfill_timeline(target_id, req.user_id)
     return {"message": "unblocked"}
 
 
 @router.get("/users/{user_id}/mutual_followers")
-def mutual_followers(user_id: str, my_id: str):
-    users = load_users()
-    target = next((u for u in users if u["user_id"] == user_id), None)
-    me = next((u for u in users if u["user_id"] == my_id), None)
+def mutual_followers(
+    user_id: str,
+    my_id: str,
+    after: str | None = None,
+    limit: int | None = None,
+    unpaginated: bool = False,
+):
+    limit = page_limit(limit, unpaginated)
+    target = fetch_user(user_id)
+    me = fetch_user(my_id)
     if not target or not me:
         raise HTTPException(status_code=404, detail="User not found")
-    mutual = set(target.get("followers", [])) & set(me.get("following", []))
-    result = [remove_sensitive_fields(u) for u in users if u["user_id"] in mutual]
-    return result
+    mutual = mutual_follower_ids(user_id, my_id, after=after, limit=limit)
+    return [remove_sensitive_fields(u) for u in get_users(mutual)]
+
+
+@router.get("/users/{user_id}/suggestions")
+def people_you_may_know(user_id: str, limit: int = 10):
+    if not fetch_user(user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="Invalid limit")
+    mutual = dict(suggested_ids(user_id, min(limit, settings.suggestions_per_user)))
+    return [
+        remove_sensitive_fields(u) | {"mutual_count": mutual[u["user_id"]]}
+        for u in get_users(list(mutual))
+    ]
 
 
 @router.get("/users/{user_id}/followers")
-def list_followers(user_id: str):
-    users = load_users()
-    target = next((u for u in users if u["user_id"] == user_id), None)
+def list_followers(
+    user_id: str,
+    after: str | None = None,
+    limit: int | None = None,
+    unpaginated: bool = False,
+):
+    limit = page_limit(limit, unpaginated)
+    target = fetch_user(user_id)
     if not target:
         raise HTTPException(status_code=404, detail="User not found")
-    follower_ids = target.get("followers", [])
-    result = [remove_sensitive_fields(u) for u in users if u["user_id"] in follower_ids]
-    return result
+    ids = follower_ids(user_id, after=after, limit=limit)
+    return [remove_sensitive_fields(u) for u in get_users(ids)]
 
 
 @router.get("/users/{user_id}/following")
-def list_following(user_id: str):
-    users = load_users()
-    target = next((u for u in users if u["user_id"] == user_id), None)
+def list_following(
+    user_id: str,
+    after: str | None = None,
+    limit: int | None = None,
+    unpaginated: bool = False,
+):
+    limit = page_limit(limit, unpaginated)
+    target = fetch_user(user_id)
     if not target:
         raise HTTPException(status_code=404, detail="User not found")
-    following_ids = target.get("following", [])
-    result = [remove_sensitive_fields(u) for u in users if u["user_id"] in following_ids]
-    return result
+    ids = following_ids(user_id, after=after, limit=limit)
+    return [remove_sensitive_fields(u) for u in get_users(ids)]
 
 
 @router.get("/users/{user_id}/blocks")
-def list_blocks(user_id: str):
-    users = load_users()
-    target = next((u for u in users if u["user_id"] == user_id), None)
+def list_blocks(
+    user_id: str,
+    after: str | None = None,
+    limit: int | None = None,
+    unpaginated: bool = False,
+):
+    limit = page_limit(limit, unpaginated)
+    target = fetch_user(user_id)
     if not target:
         raise HTTPException(status_code=404, detail="User not found")
-    block_ids = target.get("blocks", [])
-    result = [remove_sensitive_fields(u) for u in users if u["user_id"] in block_ids]
-    return result
+    ids = blocked_ids(user_id, after=after, limit=limit)
+    return [remove_sensitive_fields(u) for u in get_users(ids)]
 
 
 @router.get("/users/{user_id}/bookmarks")
-def list_bookmarks(user_id: str):
-    users = load_users()
-    user = next((u for u in users if u["user_id"] == user_id), None)
+def list_bookmarks(user_id: str, page: Page = Depends()):
+    user = fetch_user(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    posts = load_posts()
-    ids = set(user.get("bookmarks", []))
     result = []
-    for p in posts:
-        if p["id"] in ids:
-            item = p.copy()
-            if item.get("anonymous"):
-                item["author_id"] = "匿名"
-            result.append(item)
-    result.sort(key=lambda x: x["id"], reverse=True)
-    return {"posts": result}
+    posts = query_bookmarked_posts(user_id, **page.query)
+    for item in with_engagement(posts, user_id):
+        if item.get("anonymous"):
+            item["author_id"] = "匿名"
+        result.append(item)
+    return {"posts": result, "next_cursor": page.next_cursor(posts)}
+
+
+@router.get("/users/{user_id}/bookmarked")
+def bookmark_state(user_id: str, post_id: list[int] = Query([])):
+    """Which of the given posts the user bookmarked, for feeds and post
+    pages that cannot tell from one page of bookmarks."""
+    if not fetch_user(user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    if len(post_id) > settings.page_size_max:
+        raise HTTPException(status_code=400, detail="Too many posts")
+    return {"post_ids": bookmarked_among(user_id, post_id)}
 
 
 @router.get("/users/{user_id}/retweets")
-def list_retweets(user_id: str):
-    users = load_users()
-    if not any(u["user_id"] == user_id for u in users):
+def list_retweets(user_id: str, page: Page = Depends()):
+    if not fetch_user(user_id):
         raise HTTPException(status_code=404, detail="User not found")
-    posts = load_posts()
     result = []
-    for p in posts:
-        if user_id in p.get("retweets", []):
-            item = p.copy()
-            if item.get("anonymous"):
-                item["author_id"] = "匿名"
-            result.append(item)
-    result.sort(key=lambda x: x["id"], reverse=True)
-    return {"posts": result}
-
-
-@router.get("/users/search")
-def search_users(query: str):
-    users = load_users()
-    query_lower = query.lower()
-    result = [
-        remove_sensitive_fields(u)
-        for u in users
-        if query_lower in u["user_id"].lower() or query_lower in u["username"].lower()
-    ]
-    return result
+    posts = query_retweeted_posts(user_id, **page.query)
+    for item in with_engagement(posts, user_id):
+        if item.get("anonymous"):
+            item["author_id"] = "匿名"
+        result.append(item)
+    return {"posts": result, "next_cursor": page.next_cursor(posts)}
 
 
 @router.put("/users/{user_id}/profile")
 def update_profile(user_id: str, profile: ProfileUpdate):
-    users = load_users()
-    for u in users:
-        if u["user_id"] == user_id:
-            prof = u.get("profile", {})
-            data = profile.dict(exclude_unset=True)
-            prof.update({k: v for k, v in data.items() if v is not None})
-            u["profile"] = prof
-            save_users(users)
-            return {"message": "updated"}
-    raise HTTPException(status_code=404, detail="User not found")
+    u = fetch_user(user_id)
+    if not u:
+        raise HTTPException(status_code=404, detail="User not found")
+    prof = u.get("profile", {})
+    data = profile.dict(exclude_unset=True)
+    prof.update({k: v for k, v in data.items() if v is not None})
+    u["profile"] = prof
+    update_user(u)
+    index_user(u)
+    return {"message": "updated"}
 
 
 @router.get("/users/{user_id}/collab_profile")
 def get_collab_profile(user_id: str):
-    users = load_users()
-    for u in users:
-        if u["user_id"] == user_id:
-            return u.get("collab_profile", {})
-    raise HTTPException(status_code=404, detail="User not found")
+    u = fetch_user(user_id)
+    if not u:
+        raise HTTPException(status_code=404, detail="User not found")
+    return u.get("collab_profile", {})
 
 
 @router.put("/users/{user_id}/collab_profile")
 def update_collab_profile(user_id: str, profile: CollabProfileUpdate):
-    users = load_users()
-    for u in users:
-        if u["user_id"] == user_id:
-            prof = u.get("collab_profile", {})
-            data = profile.dict(exclude_unset=True)
-            prof.update({k: v for k, v in data.items() if v is not None})
-            u["collab_profile"] = prof
-            save_users(users)
-            return {"message": "updated"}
-    raise HTTPException(status_code=404, detail="User not found")
+    u = fetch_user(user_id)
+    if not u:
+        raise HTTPException(status_code=404, detail="User not found")
+    prof = u.get("collab_profile", {})
+    data = profile.dict(exclude_unset=True)
+    prof.update({k: v for k, v in data.items() if v is not None})
+    u["collab_profile"] = prof
+    update_user(u)
+    return {"message": "updated"}
 
 
 @router.get("/users/{user_id}/creator_profile")
 def get_creator_profile(user_id: str, viewer_id: str | None = None):
-    users = load_users()
-    for u in users:
-        if u["user_id"] == user_id:
-            prof = u.get("creator_profile", {})
-            vis = prof.get("visibility", "public")
-            if viewer_id != user_id and vis != "public":
-                return {}
-            return prof
-    raise HTTPException(status_code=404, detail="User not found")
+    u = fetch_user(user_id)
+    if not u:
+        raise HTTPException(status_code=404, detail="User not found")
+    prof = u.get("creator_profile", {})
+    vis = prof.get("visibility", "public")
+    if viewer_id != user_id and vis != "public":
+        return {}
+    return prof
 
 
 @router.put("/users/{user_id}/creator_profile")
 def update_creator_profile(user_id: str, profile: CreatorProfileUpdate):
-    users = load_users()
-    for u in users:
-        if u["user_id"] == user_id:
-            prof = u.get("creator_profile", {})
-            data = profile.dict(exclude_unset=True)
-            prof.update({k: v for k, v in data.items() if v is not None})
-            u["creator_profile"] = prof
-            save_users(users)
-            return {"message": "updated"}
-    raise HTTPException(status_code=404, detail="User not found")
+    u = fetch_user(user_id)
+    if not u:
+        raise HTTPException(status_code=404, detail="User not found")
+    prof = u.get("creator_profile", {})
+    data = profile.dict(exclude_unset=True)
+    prof.update({k: v for k, v in data.items() if v is not None})
+    u["creator_profile"] = prof
+    update_user(u)
+    index_creator_profile(u)
+    return {"message": "updated"}
 
 
 @router.get("/creator_profiles/search")
-def search_creator_profiles(keyword: str):
-    users = load_users()
-    kw = keyword.lower()
-    result = []
-    for u in users:
-        prof = u.get("creator_profile", {})
-        if prof.get("visibility", "public") != "public":
-            continue
-        texts = " ".join(prof.get("skills", []) or []) + " " + " ".join(prof.get("equipment", []) or []) + " " + " ".join(prof.get("software", []) or [])
-        if kw in texts.lower():
-            item = remove_sensitive_fields(u)
-            item["creator_profile"] = prof
-            result.append(item)
-    return result
+def search_creator_profiles(
+    keyword: str | None = None,
+    term: list[str] = Query([]),
+    mode: str = "and",
+    facet: str | None = None,
+    cursor: str | None = None,
+    limit: int | None = None,
+):
+    if mode not in ("and", "or"):
+        raise HTTPException(status_code=400, detail="Invalid mode")
+    if facet is not None and facet not in CREATOR_FACETS:
+        raise HTTPException(status_code=400, detail="Invalid facet")
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="Invalid limit")
+    terms = term + (keyword.split() if keyword else [])
+    limit = min(limit or settings.page_size_default, settings.page_size_max)
+    after = decode_cursor(cursor) if cursor else None
+    match_all = mode == "and"
+    hits = query_creator_profiles(terms, match_all, facet, after=after, limit=limit)
+    users = {u["user_id"]: u for u in get_users([user_id for user_id, _ in hits])}
+    result = [
+        {
+            "user_id": user_id,
+            "username": users[user_id].get("username"),
+            "creator_profile": users[user_id].get("creator_profile", {}),
+            "matched": matched,
+        }
+        for user_id, matched in hits
+        if user_id in users
+    ]
+    return {
+        "users": result,
+        "facets": creator_facets(terms, match_all, facet),
+        "next_cursor": encode_position(hits[-1]) if len(hits) == limit else None,
+    }
@@ -0,0 +1,257 @@
+"""Full-text search over post content and tags, and user typeahead.
+
+On SQLite posts are indexed in an FTS5 table with the trigram tokenizer,
+which needs no word segmentation and so works for Japanese. Triggers on
+``posts`` keep it in step with every insert, content or tag change and
+delete, whichever code path writes the row. Other databases fall back to
+scanning posts newest first.
+
+Matches are ranked by BM25 plus a recency bonus of one BM25 unit per
+``SEARCH_RECENCY_DAYS``. The bonus grows with the post's creation time
+rather than shrinking with its age, so time alone does not reorder
+results. BM25 itself depends on corpus statistics (post count, average
+length, term frequencies), so every post written shifts every score a
+little; paging by a ``(score, id)`` cursor is best-effort and may skip or
+repeat a result near a page boundary when posts change between requests.
+
+Users are looked up in ``user_search``: prefix matches on the lowercased
+id and name come from B-tree range scans, and substring matches from a
+trigram index over the same keys kept in step by triggers.
+"""
+from sqlalchemy import (
+    Integer,
+    String,
+    and_,
+    func,
+    literal,
+    literal_column,
+    or_,
+    select,
+    sql,
+    text,
+)
+from .config import settings
+from .db import engine, posts_table, select_page, user_search_table
+
+posts_fts = sql.table(
+    "posts_fts",
+    sql.column("rowid", Integer),
+    sql.column("content", String),
+    sql.column("tags", String),
+)
+
+users_fts = sql.table(
+    "users_fts",
+    sql.column("rowid", Integer),
+    sql.column("id_key", String),
+    sql.column("name_key", String),
+)
+
+# Shortest term the trigram index can look up; shorter ones are scanned.
+MIN_TERM = 3
+
+_INDEXED = """
+    new.id,
+    json_extract(new.data, '$.content'),
+    (SELECT group_concat(value, ' ') FROM json_each(new.data, '$.tags'))
+"""
+
+DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts "
+    "USING fts5(content, tags, tokenize='trigram')",
+    f"""CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+        INSERT INTO posts_fts(rowid, content, tags) VALUES ({_INDEXED});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+        DELETE FROM posts_fts WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF data ON posts
+    WHEN json_extract(old.data, '$.content') IS NOT json_extract(new.data, '$.content')
+      OR json_extract(old.data, '$.tags') IS NOT json_extract(new.data, '$.tags')
+    BEGIN
+        DELETE FROM posts_fts WHERE rowid = old.id;
+        INSERT INTO posts_fts(rowid, content, tags) VALUES ({_INDEXED});
+    END""",
+]
+
+
+USER_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts "
+    "USING fts5(id_key, name_key, tokenize='trigram')",
+    """CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON user_search BEGIN
+        INSERT INTO users_fts(rowid, id_key, name_key)
+        VALUES (new.id, new.id_key, new.name_key);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON user_search BEGIN
+        DELETE FROM users_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS users_fts_update
+    AFTER UPDATE OF id_key, name_key ON user_search BEGIN
+        UPDATE users_fts SET id_key = new.id_key, name_key = new.name_key
+        WHERE rowid = old.id;
+    END""",
+]
+
+
+def create_index(conn) -> None:
+    """Create the index and its triggers and fill it from ``posts``."""
+    if conn.dialect.name != "sqlite":
+        return
+    for stmt in DDL:
+        conn.execute(text(stmt))
+    conn.execute(text("DELETE FROM posts_fts"))
+    conn.execute(
+        text(
+            "INSERT INTO posts_fts(rowid, content, tags) SELECT "
+            + _INDEXED.replace("new.", "")
+            + " FROM posts"
+        )
+    )
+
+
+def _phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _like(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _ranked(terms: list[str]):
+    """Subquery of matching post ids and their BM25 relevance."""
+    fts = literal_column("posts_fts")
+    long_terms = [t for t in terms if len(t) >= MIN_TERM]
+    conditions = [
+        or_(
+            posts_fts.c.content.like(_like(t), escape="\\"),
+            posts_fts.c.tags.like(_like(t), escape="\\"),
+        )
+        for t in terms
+        if len(t) < MIN_TERM
+    ]
+    if long_terms:
+        conditions.append(fts.match(" ".join(_phrase(t) for t in long_terms)))
+        relevance = -func.bm25(fts)
+    else:
+        relevance = literal(0.0)
+    return (
+        select(posts_fts.c.rowid.label("post_id"), relevance.label("relevance"))
+        .where(and_(*conditions))
+        .subquery()
+    )
+
+
+def search_posts(query: str, before=None, after=None, limit: int | None = None):
+    """Posts containing every whitespace-separated term of ``query``."""
+    terms = query.split()
+    if engine.dialect.name != "sqlite":
+        lowered = [t.lower() for t in terms]
+
+        def matches(post):
+            haystack = " ".join([post.get("content") or "", *(post.get("tags") or [])])
+            return all(t in haystack.lower() for t in lowered)
+
+        return select_page(
+            posts_table,
+            before=before,
+            after=after,
+            limit=limit,
+            predicate=matches,
+            positions=True,
+        )
+    ranked = _ranked(terms)
+    recency = func.julianday(posts_table.c.created_at) / settings.search_recency_days
+    return select_page(
+        posts_table,
+        before=before,
+        after=after,
+        limit=limit,
+        join=posts_table.join(ranked, ranked.c.post_id == posts_table.c.id),
+        position=(ranked.c.relevance + func.coalesce(recency, 0), posts_table.c.id),
+        positions=True,
+    )
+
+
+def user_entry(user: dict) -> dict:
+    """The ``user_search`` row for ``user``."""
+    return {
+        "user_id": user["user_id"],
+        "id_key": user["user_id"].lower(),
+        "name_key": (user.get("username") or "").lower(),
+        "username": user.get("username"),
+        "profile_image": (user.get("profile") or {}).get("profile_image"),
+    }
+
+
+def create_user_index(conn) -> None:
+    """Create the substring index and its triggers (SQLite only)."""
+    if conn.dialect.name != "sqlite":
+        return
+    for stmt in USER_DDL:
+        conn.execute(text(stmt))
+    conn.execute(text("DELETE FROM users_fts"))
+    conn.execute(
+        text(
+            "INSERT INTO users_fts(rowid, id_key, name_key) "
+            "SELECT id, id_key, name_key FROM user_search"
+        )
+    )
+
+
+def _rank(q: str, row) -> tuple:
+    """Exact matches first, then prefix, then substring; shorter first."""
+    keys = (row.id_key, row.name_key)
+    if q in keys:
+        kind = 0
+    elif any(k.startswith(q) for k in keys):
+        kind = 1
+    else:
+        kind = 2
+    return kind, min((len(k) for k in keys if q in k), default=0), row.user_id
+
+
+def search_users(query: str, limit: int) -> list[dict]:
+    """Users whose id or name contains ``query``, case-insensitively."""
+    q = query.strip().lower()
+    if not q:
+        return []
+    u = user_search_table
+    columns = (u.c.user_id, u.c.id_key, u.c.name_key, u.c.username, u.c.profile_image)
+    found = {}
+    with engine.connect() as conn:
+        # Prefix matches: range scans over the key indexes.
+        for key in (u.c.id_key, u.c.name_key):
+            stmt = (
+                select(*columns)
+                .where(key >= q, key < q + "\U0010ffff")
+                .order_by(key)
+                .limit(limit)
+            )
+            for row in conn.execute(stmt):
+                found[row.user_id] = row
+        if len(found) < limit:
+            if len(q) >= MIN_TERM and conn.dialect.name == "sqlite":
+                fts = literal_column("users_fts")
+                stmt = (
+                    select(*columns)
+                    .select_from(u.join(users_fts, users_fts.c.rowid == u.c.id))
+                    .where(fts.match(_phrase(q)))
+                    .order_by(func.bm25(fts))
+                )
+            else:
+                pattern = _like(q)
+                stmt = select(*columns).where(
+                    or_(
+                        u.c.id_key.like(pattern, escape="\\"),
+                        u.c.name_key.like(pattern, escape="\\"),
+                    )
+                )
+            # Substring matches; ``limit`` rows leaves room for repeats.
+            for row in conn.execute(stmt.limit(limit)):
+                found.setdefault(row.user_id, row)
+    ranked = sorted(found.values(), key=lambda row: _rank(q, row))[:limit]
+    return [
+        {"user_id": r.user_id, "username": r.username, "profile_image": r.profile_image}
+        for r in ranked
+    ]
@@ -0,0 +1,128 @@
+"""Time-decayed trending scores, updated on every like and retweet.
+
+A post's score is the sum of ``2 ** ((t - t0) / half_life)`` over its
+likes and retweets, ``t`` being when each happened. Decaying every score
+to "now" divides them all by the same factor, so their order never
+changes and nothing needs recomputing as time passes: a list is read off
+the top of the ``(scope, score)`` index. Scores are stored as log2 to
+keep the exponentials in range.
+
+Besides the global list (scope "all") a post is ranked in
+"category:<name>" and "tag:<name>" lists when those are enabled.
+"""
+import math
+import time
+from sqlalchemy import delete, insert, select, union_all, update
+from .config import settings
+from .db import iso_epoch, trending_table
+
+ALL = "all"
+
+
+def _half_life() -> float:
+    return settings.trending_half_life_hours * 3600
+
+
+def scopes(post: dict) -> list[str]:
+    """The trending lists ``post`` is ranked in."""
+    result = [ALL]
+    if settings.trending_by_category and post.get("category"):
+        result.append(f"category:{post['category']}")
+    if settings.trending_by_tag:
+        result += [f"tag:{t}" for t in sorted(set(post.get("tags") or []))]
+    return result
+
+
+def log2_add(a: float, b: float) -> float:
+    """``log2(2**a + 2**b)`` without overflowing."""
+    hi, lo = max(a, b), min(a, b)
+    return hi + math.log2(1 + 2 ** (lo - hi))
+
+
+def log2_sub(a: float, b: float) -> float | None:
+    """``log2(2**a - 2**b)``, or None once nothing is left."""
+    if b - a > -1e-9:
+        return None
+    return a + math.log2(1 - 2 ** (b - a))
+
+
+def record(conn, post: dict, present: bool, created_at: str | None) -> None:
+    """Add (or take back) one engagement with ``post`` in all its lists."""
+    if created_at is None:
+        return
+    t = trending_table
+    active = iso_epoch(created_at)
+    x = active / _half_life()
+    for scope in scopes(post):
+        key = (t.c.scope == scope, t.c.post_id == post["id"])
+        score = conn.execute(select(t.c.score).where(*key)).scalar()
+        if present:
+            if score is None:
+                conn.execute(
+                    insert(t).values(scope=scope, post_id=post["id"], score=x, active_at=active)
+                )
+            else:
+                conn.execute(
+                    update(t).where(*key).values(score=log2_add(score, x), active_at=active)
+                )
+        elif score is not None:
+            left = log2_sub(score, x)
+            if left is None:
+                conn.execute(delete(t).where(*key))
+            else:
+                conn.execute(update(t).where(*key).values(score=left))
+    prune(conn, time.time())
+
+
+def prune(conn, now: float) -> None:
+    """Drop posts without engagement in the window."""
+    cutoff = now - settings.trending_window_hours * 3600
+    conn.execute(delete(trending_table).where(trending_table.c.active_at < cutoff))
+
+
+def top_post_ids(conn, scope: str, limit: int) -> list[int]:
+    t = trending_table
+    cutoff = time.time() - settings.trending_window_hours * 3600
+    stmt = (
+        select(t.c.post_id)
+        .where(t.c.scope == scope, t.c.active_at >= cutoff)
+        .order_by(t.c.score.desc(), t.c.post_id.desc())
+        .limit(limit)
+    )
+    return list(conn.execute(stmt).scalars())
+
+
+def rebuild(conn, posts, likes, retweets) -> None:
+    """Recompute every list from the engagement tables."""
+    now = time.time()
+    cutoff = now - settings.trending_window_hours * 3600
+    events = union_all(
+        select(likes.c.post_id, likes.c.created_at),
+        select(retweets.c.post_id, retweets.c.created_at),
+    ).subquery()
+    rows = conn.execute(
+        select(posts.c.id, posts.c.data, events.c.created_at).join(
+            events, events.c.post_id == posts.c.id
+        )
+    )
+    scores: dict[tuple[str, int], list[float]] = {}
+    for post_id, data, created_at in rows:
+        if not created_at:
+            continue
+        ts = iso_epoch(created_at)
+        x = ts / _half_life()
+        for scope in scopes(data | {"id": post_id}):
+            entry = scores.get((scope, post_id))
+            if entry is None:
+                scores[(scope, post_id)] = [x, ts]
+            else:
+                entry[0] = log2_add(entry[0], x)
+                entry[1] = max(entry[1], ts)
+    conn.execute(delete(trending_table))
+    records = [
+        {"scope": scope, "post_id": post_id, "score": score, "active_at": active}
+        for (scope, post_id), (score, active) in scores.items()
+        if active >= cutoff
+    ]
+    if records:
+        conn.execute(insert(trending_table), records)
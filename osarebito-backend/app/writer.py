@@ -0,0 +1,92 @@
+"""Single-writer commit queue for SQLite.
+
+SQLite allows one writer at a time and every commit pays for an fsync.
+``WriteQueue`` funnels write operations through one thread and commits
+the operations that arrive within a short window in a single transaction
+(group commit). Each caller gets a future that resolves once the
+transaction containing its operation has committed.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class WriteQueue:
+    def __init__(self, engine, window_ms: float = 2.0, max_batch: int = 128) -> None:
+        self.engine = engine
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.batches = 0
+        self.operations = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Commit everything already queued, then stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def submit(self, op) -> Future:
+        """Queue ``op(conn)`` and return a future for its result."""
+        future: Future = Future()
+        self._queue.put((op, future))
+        return future
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            stopping = False
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        entry = self._queue.get(timeout=remaining)
+                    else:
+                        entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stopping = True
+                    break
+                batch.append(entry)
+            self._commit(batch)
+            if stopping:
+                return
+
+    def _commit(self, batch) -> None:
+        try:
+            with self.engine.begin() as conn:
+                results = [op(conn) for op, _ in batch]
+        except Exception as exc:
+            if len(batch) == 1:
+                batch[0][1].set_exception(exc)
+                return
+            # One operation failed and rolled back the whole group; retry
+            # them one by one so only the failing caller sees the error.
+            logger.debug("Group commit of %d operations failed, retrying singly", len(batch))
+            for entry in batch:
+                self._commit([entry])
+            return
+        self.batches += 1
+        self.operations += len(batch)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
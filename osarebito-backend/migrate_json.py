@@ -2,8 +2,11 @@ import json
 from pathlib import Path
 from sqlalchemy import insert, delete
 
+from app import db
 from app.db import (
     engine,
+    build_record,
+    sync_id_sequence,
     users_table,
     posts_table,
     comments_table,
@@ -14,6 +17,21 @@ from app.db import (
     group_messages_table,
     schedules_table,
 )
+from app.migrations import (
+    count_comments,
+    count_followers,
+    fill_conversations,
+    fill_creator_terms,
+    fill_group_members,
+    fill_post_tags,
+    fill_timelines,
+    fill_trending,
+    fill_user_search,
+    key_conversations,
+    move_notifications,
+    split_post_engagement,
+    split_user_relations,
+)
 
 DATA_DIR = Path(__file__).resolve().parent / "app"
 TABLES = {
@@ -43,8 +61,41 @@ def migrate() -> None:
             conn.execute(delete(table))
             conn.execute(
                 insert(table),
-                [{key: item.get(key), "data": item} for item in items],
+                [build_record(table, item) for item in items],
             )
+            if key == "id":
+                sync_id_sequence(conn, table)
+            if table is users_table:
+                for relation in (
+                    db.follows_table,
+                    db.blocks_table,
+                    db.interests_table,
+                    db.bookmarks_table,
+                ):
+                    conn.execute(delete(relation))
+                split_user_relations(conn, db)
+                conn.execute(delete(db.notifications_table))
+                move_notifications(conn, db)
+                count_followers(conn, db)
+                fill_user_search(conn, db)
+                fill_creator_terms(conn, db)
+            if table is messages_table:
+                key_conversations(conn, db)
+                fill_conversations(conn, db)
+            if table is groups_table:
+                fill_group_members(conn, db)
+            if table is posts_table:
+                for relation in (db.likes_table, db.retweets_table):
+                    conn.execute(delete(relation))
+        split_post_engagement(conn, db)
+        count_comments(conn, db)
+        conn.execute(delete(db.timelines_table))
+        conn.execute(delete(db.pull_authors_table))
+        fill_timelines(conn, db)
+        conn.execute(delete(db.post_tags_table))
+        conn.execute(delete(db.tag_counts_table))
+        fill_post_tags(conn, db)
+        fill_trending(conn, db)
 
 if __name__ == "__main__":
     migrate()
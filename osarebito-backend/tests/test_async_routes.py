@@ -0,0 +1,47 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+from fastapi.testclient import TestClient
+
+
+def test_async_routes_offload_storage(tmp_path, monkeypatch):
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud
+    from app.main import app
+    from app.routes import posts
+
+    # Record whether the storage calls ran off the event loop.
+    on_loop = []
+
+    def watched(func):
+        def call(*args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return func(*args, **kwargs)
+
+        return crud._awaitable(call)
+
+    monkeypatch.setattr(posts, "publish_post_async", watched(crud.publish_post))
+    monkeypatch.setattr(posts, "set_like_async", watched(crud.set_like))
+
+    client = TestClient(app)
+    for user_id in ("ar_a", "ar_b"):
+        user = {"user_id": user_id, "email": f"{user_id}@x.com", "username": user_id,
+                "password": "pw", "role": "推し人"}
+        assert client.post("/register", json=user).status_code == 200
+    client.post("/users/ar_a/follow", json={"follower_id": "ar_b"})
+
+    post = client.post("/posts", json={"author_id": "ar_a", "content": "async"}).json()
+    like = client.post(f"/posts/{post['id']}/like", json={"user_id": "ar_b"})
+    assert like.json() == {"likes": 1}
+    assert on_loop == [False, False]
+
+    feed = client.get("/posts", params={"feed": "following", "user_id": "ar_b"}).json()
+    assert post["id"] in [p["id"] for p in feed["posts"]]
+    assert client.get(f"/posts/{post['id']}").json()["like_count"] == 1
@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.cache import MISSING, TableCache  # noqa: E402
+
+
+def test_lru_eviction_and_copies():
+    cache = TableCache(max_bytes=200)
+    cache.put("users", "a", {"user_id": "a", "bio": "x" * 60}, 1)
+    cache.put("users", "b", {"user_id": "b", "bio": "y" * 60}, 1)
+    first = cache.get("users", "a")
+    first["bio"] = "mutated"
+    assert cache.get("users", "a")["bio"] == "x" * 60
+    cache.put("users", "c", {"user_id": "c", "bio": "z" * 60}, 1)
+    assert cache.get("users", "b") is MISSING
+    assert cache.evictions == 1
+    assert cache.stats()["hits"] == 2
+
+
+def test_stale_puts_are_ignored():
+    cache = TableCache(max_bytes=10_000)
+    cache.put("posts", 1, {"id": 1, "likes": 2}, 5)
+    cache.put("posts", 1, {"id": 1, "likes": 1}, 4)
+    assert cache.get("posts", 1)["likes"] == 2
+    cache.mark_stale("posts", 2, 6)
+    cache.put("posts", 2, {"id": 2}, 5)
+    assert cache.get("posts", 2) is MISSING
+    cache.invalidate_table("posts", 7)
+    cache.put("posts", 1, {"id": 1}, 6)
+    assert cache.get("posts", 1) is MISSING
@@ -0,0 +1,303 @@
+import os
+import sys
+from pathlib import Path
+
+
+def test_row_level_writes(tmp_path):
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud
+
+    crud.insert_job({"id": 9001, "title": "a"})
+    crud.insert_job({"id": 9002, "title": "b"})
+    jobs = crud.load_jobs()
+    job = next(j for j in jobs if j["id"] == 9001)
+    job["title"] = "changed"
+    jobs.remove(next(j for j in jobs if j["id"] == 9002))
+    jobs.append({"id": 9003, "title": "c"})
+    crud.save_jobs(jobs)
+    stored = {j["id"]: j["title"] for j in crud.load_jobs() if j["id"] >= 9001}
+    assert stored == {9001: "changed", 9003: "c"}
+
+    crud.upsert_jobs([{"id": 9003, "title": "d"}, {"id": 9004, "title": "e"}])
+    crud.delete_job(9001)
+    stored = {j["id"]: j["title"] for j in crud.load_jobs() if j["id"] >= 9001}
+    assert stored == {9003: "d", 9004: "e"}
+
+
+def test_id_allocation_is_unique(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        ids = list(pool.map(lambda _: crud.next_poll_id(), range(50)))
+    assert len(set(ids)) == 50
+    assert crud.next_poll_id() == max(ids) + 1
+
+
+def test_keyed_lookups(tmp_path):
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud
+
+    crud.upsert_polls([{"id": 9101, "question": "a"}, {"id": 9102, "question": "b"}])
+    assert crud.get_poll(9101)["question"] == "a"
+    assert crud.get_poll(9999) is None
+    polls = crud.get_polls([9102, 9999, 9101, 9102])
+    assert [p["id"] for p in polls] == [9102, 9101]
+
+
+def test_follow_relations(tmp_path):
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud
+
+    for follower in ("rel_b", "rel_c", "rel_d"):
+        assert crud.follow(follower, "rel_a")
+    assert not crud.follow("rel_b", "rel_a")
+    crud.follow("rel_x", "rel_c")
+    crud.follow("rel_x", "rel_d")
+    assert crud.is_following("rel_b", "rel_a")
+    assert crud.count_followers("rel_a") == 3
+    assert crud.follower_ids("rel_a", limit=2) == ["rel_b", "rel_c"]
+    assert crud.follower_ids("rel_a", after="rel_c") == ["rel_d"]
+    assert crud.mutual_follower_ids("rel_a", "rel_x") == ["rel_c", "rel_d"]
+
+    crud.block("rel_b", "rel_a")
+    assert not crud.is_following("rel_b", "rel_a")
+    assert crud.is_blocked("rel_a", "rel_b")
+    assert crud.unfollow("rel_c", "rel_a")
+    assert crud.follower_ids("rel_a") == ["rel_d"]
+
+
+def test_engagement_counters(tmp_path):
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud
+
+    crud.insert_post({"id": 9201, "content": "x", "like_count": 0, "retweet_count": 0})
+    post, changed = crud.set_like(9201, "eng_a", True)
+    assert changed and post["like_count"] == 1
+    post, changed = crud.set_like(9201, "eng_a", True)
+    assert not changed and post["like_count"] == 1
+    crud.set_like(9201, "eng_b", True)
+    crud.set_retweet(9201, "eng_b", True)
+    assert crud.get_post(9201)["like_count"] == 2
+    post, _ = crud.set_like(9201, "eng_a", False)
+    assert post["like_count"] == 1
+    item = crud.with_engagement([crud.get_post(9201)], "eng_b")[0]
+    assert (item["like_count"], item["retweet_count"]) == (1, 1)
+    assert item["liked"] and item["retweeted"]
+    item = crud.with_engagement([crud.get_post(9201)], "eng_a")[0]
+    assert not item["liked"] and not item["retweeted"]
+
+    # Editing other fields keeps a like counted since the post was read.
+    crud.set_like(9201, "eng_c", True)
+    post = crud.update_post(9201, {"best_answer_id": 1})
+    assert (post["like_count"], post["best_answer_id"]) == (2, 1)
+    assert crud.get_post(9201)["like_count"] == 2
+
+
+def test_block_index(tmp_path):
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud
+
+    crud.block("blk_a", "blk_b")
+    crud.block("blk_c", "blk_a")
+    assert crud.blocked_ids("blk_a") == ["blk_b"]
+    assert crud.blocker_ids("blk_a") == ["blk_c"]
+    assert crud.block_related_ids("blk_a") == {"blk_b", "blk_c"}
+    assert crud.is_blocked("blk_b", "blk_a") and not crud.is_blocked("blk_b", "blk_c")
+    crud.unblock("blk_c", "blk_a")
+    assert crud.block_related_ids("blk_a") == {"blk_b"}
+
+
+def test_comment_threads(tmp_path):
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud
+
+    crud.insert_post({"id": 9801, "content": "x", "comment_count": 0})
+    for comment_id in (9811, 9812, 9813):
+        post = crud.insert_comment(
+            {"id": comment_id, "post_id": 9801, "author_id": "cmt_a", "content": "c"}
+        )
+    assert post["comment_count"] == 3
+    assert crud.get_post(9801)["comment_count"] == 3
+    page = crud.list_post_comments(9801, limit=2)
+    assert [c["id"] for c in page] == [9811, 9812]
+    assert [c["id"] for c in crud.list_post_comments(9801, after=9812)] == [9813]
+    assert crud.author_has_comments("cmt_a") and not crud.author_has_comments("cmt_b")
+
+
+def test_leaderboard_and_suggestions(tmp_path):
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud
+
+    for follower, followee in [
+        ("sg_a", "sg_b"),
+        ("sg_a", "sg_c"),
+        ("sg_b", "sg_d"),
+        ("sg_b", "sg_e"),
+        ("sg_b", "sg_f"),
+        ("sg_c", "sg_d"),
+        ("sg_c", "sg_f"),
+        ("sg_f", "sg_d"),
+    ]:
+        crud.follow(follower, followee)
+    crud.block("sg_a", "sg_e")
+    crud.unfollow("sg_f", "sg_d")
+    crud.block("sg_c", "sg_f")
+    ranked = [u for u in crud.most_followed_ids(1000) if u.startswith("sg_")]
+    assert ranked == ["sg_d", "sg_b", "sg_c", "sg_e", "sg_f"]
+    assert crud.count_followers("sg_f") == 1
+
+    crud.refresh_suggestions(batch_size=2)
+    assert crud.suggested_ids("sg_a", 10) == [("sg_d", 2), ("sg_f", 1)]
+    crud.follow("sg_a", "sg_d")
+    assert crud.suggested_ids("sg_a", 10) == [("sg_f", 1)]
+
+
+def test_conversation_pages(tmp_path):
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud
+
+    for message_id, sender, receiver in [
+        (9901, "dm_a", "dm_b"),
+        (9902, "dm_b", "dm_a"),
+        (9903, "dm_a", "dm_c"),
+        (9904, "dm_a", "dm_b"),
+        (9905, "dm_b", "dm_a"),
+    ]:
+        crud.insert_message({"id": message_id, "sender_id": sender, "receiver_id": receiver})
+
+    def ids(messages):
+        return [m["id"] for m in messages]
+
+    assert ids(crud.list_conversation("dm_b", "dm_a")) == [9901, 9902, 9904, 9905]
+    assert ids(crud.list_conversation("dm_a", "dm_b", limit=2)) == [9904, 9905]
+    assert ids(crud.list_conversation("dm_a", "dm_b", before_id=9904, limit=2)) == [9901, 9902]
+    assert ids(crud.list_conversation("dm_a", "dm_b", since_id=9902, limit=1)) == [9904]
+    assert ids(crud.list_conversation("dm_a", "dm_b", since_id=9905)) == []
+
+
+def test_inbox_summary(tmp_path):
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud
+
+    for message_id, sender, receiver, at in [
+        (9921, "ib_a", "ib_b", "2024-01-01T00:00:01"),
+        (9922, "ib_c", "ib_a", "2024-01-01T00:00:02"),
+        (9924, "ib_b", "ib_a", "2024-01-01T00:00:04"),
+        (9923, "ib_a", "ib_b", "2024-01-01T00:00:03"),
+    ]:
+        message = {"id": message_id, "sender_id": sender, "receiver_id": receiver}
+        crud.insert_message(message | {"content": f"m{message_id}", "created_at": at})
+
+    inbox = crud.query_conversations("ib_a")
+    assert [(c["partner_id"], c["last_message"]["id"], c["unread_count"]) for c in inbox] == [
+        ("ib_b", 9924, 1),
+        ("ib_c", 9922, 1),
+    ]
+    assert inbox[0]["last_message"]["preview"] == "m9924"
+    first = crud.query_conversations("ib_a", limit=1)
+    position = (first[0]["last_message"]["created_at"], 9924)
+    assert [c["partner_id"] for c in crud.query_conversations("ib_a", before=position)] == ["ib_c"]
+    assert crud.mark_conversation_read("ib_a", "ib_b")
+    assert not crud.mark_conversation_read("ib_a", "ib_x")
+    assert crud.query_conversations("ib_a", limit=1)[0]["unread_count"] == 0
+    assert crud.query_conversations("ib_b")[0]["unread_count"] == 2
+
+
+def test_notifications(tmp_path, monkeypatch):
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud
+
+    for actor in ("nt_b", "nt_c", "nt_b", "nt_d"):
+        crud.notify("nt_a", "follow", actor)
+    crud.notify("nt_a", "message", "nt_b", message_id=1)
+    crud.notify("nt_a", "message", "nt_c", message_id=2)
+    crud.notify("nt_a", "message", "nt_b", message_id=3)
+
+    notes = crud.query_notifications("nt_a")
+    assert [(n["type"], n["from"], n["count"]) for n in notes] == [
+        ("message", "nt_b", 2),
+        ("message", "nt_c", 1),
+        # Distinct followers; nt_b following twice counts once.
+        ("follow", "nt_d", 3),
+    ]
+    assert notes[2]["actors"] == ["nt_d", "nt_b", "nt_c"]
+    assert notes[0]["message_id"] == 3
+    assert crud.count_unread_notifications("nt_a") == 3
+    assert crud.query_notifications("nt_a", before_id=notes[0]["id"], limit=1) == [notes[1]]
+
+    assert crud.mark_notifications_read("nt_a", up_to_id=notes[1]["id"]) == 2
+    assert crud.count_unread_notifications("nt_a") == 1
+    # Read notifications no longer collect new events.
+    crud.notify("nt_a", "follow", "nt_e")
+    assert [n["count"] for n in crud.query_notifications("nt_a", limit=1)] == [1]
+    crud.notify("nt_a", "follow", "nt_b")
+    assert [n["count"] for n in crud.query_notifications("nt_a", limit=1)] == [2]
+    assert crud.mark_notifications_read("nt_a") == 2
+    assert crud.count_unread_notifications("nt_a") == 0
+
+    monkeypatch.setattr(crud.settings, "notification_retention_days", 0)
+    assert crud.compact_notifications() >= 4
+    assert crud.query_notifications("nt_a") == []
+
+
+def test_group_chat(tmp_path):
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud
+
+    crud.insert_group({"id": 9951, "name": "a", "members": ["gc_a", "gc_b"]})
+    crud.insert_group({"id": 9952, "name": "b", "members": ["gc_b"]})
+    assert crud.is_group_member(9951, "gc_a") and not crud.is_group_member(9952, "gc_a")
+    assert [g["id"] for g in crud.list_user_groups("gc_b")] == [9951, 9952]
+
+    crud.update_group({"id": 9952, "name": "b", "members": ["gc_a", "gc_b"]})
+    assert crud.is_group_member(9952, "gc_a")
+    crud.delete_group(9951)
+    assert not crud.is_group_member(9951, "gc_a")
+    assert [g["id"] for g in crud.list_user_groups("gc_a")] == [9952]
+
+    # A loaded list saves only the changed groups, members included.
+    crud.insert_group({"id": 9953, "name": "c", "members": ["gc_c"]})
+    groups = crud.load_groups()
+    by_id = {g["id"]: g for g in groups}
+    by_id[9952]["members"] = ["gc_b"]
+    groups.remove(by_id[9953])
+    crud.save_groups(groups)
+    assert not crud.is_group_member(9952, "gc_a") and crud.is_group_member(9952, "gc_b")
+    assert crud.list_user_groups("gc_c") == [] and crud.get_group(9953) is None
+
+    for message_id in (9961, 9962, 9963):
+        crud.insert_group_message({"id": message_id, "group_id": 9952, "sender_id": "gc_a"})
+
+    def ids(messages):
+        return [m["id"] for m in messages]
+
+    assert ids(crud.list_group_messages(9952, limit=2)) == [9962, 9963]
+    assert ids(crud.list_group_messages(9952, before_id=9962)) == [9961]
+    assert ids(crud.list_group_messages(9952, since_id=9962)) == [9963]
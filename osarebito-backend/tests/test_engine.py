@@ -0,0 +1,72 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+# Reports what a new connection and the pool were configured with.
+PROBE = """
+import json
+from app import db
+
+pool = db.engine.pool
+with db.engine.connect() as conn:
+    pragmas = {
+        name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+        for name in ("journal_mode", "synchronous", "busy_timeout",
+                     "cache_size", "mmap_size", "temp_store")
+    }
+options = ("_max_overflow", "_recycle", "_pre_ping")
+print(json.dumps({
+    "pragmas": pragmas,
+    "pool": [type(pool).__name__, pool.size() if hasattr(pool, "size") else None]
+    + [getattr(pool, name, None) for name in options],
+}))
+"""
+
+
+def _probe(env: dict) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=BACKEND,
+        env=os.environ | {"SOCIAL_GRAPH_ENABLED": "0"} | env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(out.splitlines()[-1])
+
+
+def test_connection_settings(tmp_path):
+    # A fresh interpreter, so the engine is built from these settings.
+    settings = _probe(
+        {
+            "DATABASE_URL": f"sqlite:///{tmp_path / 'tuned.db'}",
+            "SQLITE_JOURNAL_MODE": "WAL",
+            "SQLITE_SYNCHRONOUS": "FULL",
+            "SQLITE_BUSY_TIMEOUT_MS": "1234",
+            "SQLITE_CACHE_SIZE": "-2000",
+            "SQLITE_MMAP_SIZE": "1048576",
+            "SQLITE_TEMP_STORE": "FILE",
+            "DB_POOL_SIZE": "3",
+            "DB_MAX_OVERFLOW": "4",
+            "DB_POOL_RECYCLE": "60",
+        }
+    )
+    assert settings["pragmas"] == {
+        "journal_mode": "wal",
+        "synchronous": 2,
+        "busy_timeout": 1234,
+        "cache_size": -2000,
+        "mmap_size": 1048576,
+        "temp_store": 1,
+    }
+    assert settings["pool"] == ["QueuePool", 3, 4, 60, True]
+
+
+def test_memory_database_shares_one_connection():
+    settings = _probe({"DATABASE_URL": "sqlite://"})
+    assert settings["pool"][0] == "StaticPool"
+    assert settings["pragmas"]["busy_timeout"] == 5000
@@ -0,0 +1,63 @@
+import os
+import sys
+from pathlib import Path
+
+
+def test_social_graph(tmp_path, monkeypatch):
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud, db
+    from app.config import settings
+    from sqlalchemy import delete, insert
+
+    # Check the change log on every read.
+    monkeypatch.setattr(settings, "cache_poll_interval_ms", 0)
+
+    for follower, followee in [
+        ("gr_b", "gr_a"),
+        ("gr_c", "gr_a"),
+        ("gr_d", "gr_a"),
+        ("gr_x", "gr_c"),
+        ("gr_x", "gr_d"),
+        ("gr_a", "gr_x"),
+    ]:
+        crud.follow(follower, followee)
+    crud.block("gr_e", "gr_a")
+    crud.load_social_graph()
+
+    # Loaded ids are interned in sorted order.
+    assert crud.follower_ids("gr_a", limit=2) == ["gr_b", "gr_c"]
+    assert crud.follower_ids("gr_a", after="gr_c") == ["gr_d"]
+    assert crud.mutual_follower_ids("gr_a", "gr_x") == ["gr_c", "gr_d"]
+    assert crud.count_followers("gr_a") == 3 and crud.count_following("gr_x") == 2
+    assert crud.is_blocked("gr_a", "gr_e") and crud.blocker_ids("gr_a") == ["gr_e"]
+
+    # Kept current from this process's writes; new users list last.
+    crud.follow("gr_0", "gr_a")
+    crud.block("gr_b", "gr_a")
+    assert crud.follower_ids("gr_a") == ["gr_c", "gr_d", "gr_0"]
+    assert crud.block_related_ids("gr_a") == {"gr_b", "gr_e"}
+    crud.unblock("gr_e", "gr_a")
+    assert crud.blocked_ids("gr_e") == [] and not crud.is_following("gr_b", "gr_a")
+
+    # Another process's writes are replayed from the change log, with or
+    # without the row cache.
+    with db.engine.begin() as conn:
+        conn.execute(insert(db.follows_table).values(follower_id="gr_y", followee_id="gr_a"))
+        crud._log_graph_change(conn, "follow", "gr_y", "gr_a")
+        conn.execute(insert(db.blocks_table).values(blocker_id="gr_a", blocked_id="gr_y"))
+        crud._log_graph_change(conn, "block", "gr_a", "gr_y")
+    assert crud.is_following("gr_y", "gr_a") and crud.is_blocked("gr_y", "gr_a")
+    # This process's write past that gap is ordered after it.
+    crud.unblock("gr_a", "gr_y")
+    assert not crud.is_blocked("gr_a", "gr_y")
+    assert crud.follower_ids("gr_a") == ["gr_c", "gr_d", "gr_0", "gr_y"]
+
+    # A graph behind the trimmed end of the log reloads from the tables.
+    with db.engine.begin() as conn:
+        conn.execute(insert(db.follows_table).values(follower_id="gr_z", followee_id="gr_a"))
+        change_id = crud._log_graph_change(conn, "follow", "gr_z", "gr_a")
+        crud._log_graph_change(conn, "unfollow", "gr_q", "gr_a")
+        conn.execute(delete(db.graph_changes_table).where(db.graph_changes_table.c.id == change_id))
+    assert "gr_z" in crud.follower_ids("gr_a")
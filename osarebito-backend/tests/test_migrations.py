@@ -0,0 +1,177 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+# The schema before the migration series: every table a key and a JSON blob.
+BASELINE_TABLES = {
+    "users": "user_id VARCHAR NOT NULL PRIMARY KEY",
+    "posts": "id INTEGER NOT NULL PRIMARY KEY",
+    "comments": "id INTEGER NOT NULL PRIMARY KEY",
+    "messages": "id INTEGER NOT NULL PRIMARY KEY",
+    "reports": "id INTEGER NOT NULL PRIMARY KEY",
+    "jobs": "id INTEGER NOT NULL PRIMARY KEY",
+    "groups": "id INTEGER NOT NULL PRIMARY KEY",
+    "group_messages": "id INTEGER NOT NULL PRIMARY KEY",
+    "fan_posts": "id INTEGER NOT NULL PRIMARY KEY",
+    "appeals": "id INTEGER NOT NULL PRIMARY KEY",
+    "materials": "id INTEGER NOT NULL PRIMARY KEY",
+    "polls": "id INTEGER NOT NULL PRIMARY KEY",
+    "schedules": "id INTEGER NOT NULL PRIMARY KEY",
+    "approval_calendars": "id INTEGER NOT NULL PRIMARY KEY",
+}
+
+
+def _baseline_db(path, now):
+    users = {
+        "mg_a": {
+            "user_id": "mg_a",
+            "username": "Alice",
+            "followers": ["mg_b", "mg_c"],
+            "following": ["mg_b"],
+            "blocks": ["mg_d"],
+            "interested": ["mg_c"],
+            "bookmarks": [2],
+            "notifications": [
+                {"type": "follow", "from": "mg_c", "created_at": now},
+                {"type": "message", "from": "mg_b", "message_id": 1, "created_at": now},
+            ],
+        },
+        "mg_b": {"user_id": "mg_b", "username": "Bob", "following": ["mg_a"]},
+        "mg_c": {"user_id": "mg_c", "username": "Carol", "following": ["mg_a"]},
+        "mg_d": {"user_id": "mg_d", "username": "Dave"},
+    }
+    posts = {
+        1: {
+            "id": 1,
+            "author_id": "mg_a",
+            "content": "hello migration",
+            "category": "雑談",
+            "tags": ["vtuber", "art"],
+            "likes": ["mg_b", "mg_c"],
+            "retweets": ["mg_b"],
+            "created_at": now,
+        },
+        2: {"id": 2, "author_id": "mg_b", "content": "second", "likes": [], "created_at": now},
+    }
+    comments = {
+        1: {"id": 1, "post_id": 1, "author_id": "mg_b", "content": "hi", "created_at": now},
+        2: {"id": 2, "post_id": 1, "author_id": "mg_c", "content": "yo", "created_at": now},
+    }
+    messages = {
+        1: {"id": 1, "sender_id": "mg_b", "receiver_id": "mg_a", "content": "hey", "created_at": now},
+    }
+    groups = {1: {"id": 1, "name": "g", "owner_id": "mg_a", "members": ["mg_a", "mg_b"]}}
+
+    conn = sqlite3.connect(path)
+    for table, key in BASELINE_TABLES.items():
+        conn.execute(f"CREATE TABLE {table} ({key}, data JSON NOT NULL)")
+    for table, rows in [("users", users), ("posts", posts), ("comments", comments),
+                        ("messages", messages), ("groups", groups)]:
+        conn.executemany(
+            f"INSERT INTO {table} VALUES (?, ?)",
+            [(key, json.dumps(data)) for key, data in rows.items()],
+        )
+    conn.commit()
+    conn.close()
+
+
+def test_upgrade_from_blob_only_baseline(tmp_path):
+    db_file = tmp_path / "baseline.db"
+    now = datetime.now(timezone.utc).isoformat()
+    _baseline_db(db_file, now)
+
+    # A fresh interpreter: this process has already imported app on another database.
+    env = os.environ | {"DATABASE_URL": f"sqlite:///{db_file}", "SOCIAL_GRAPH_ENABLED": "0"}
+    subprocess.run(
+        [sys.executable, "-c", "from app import db"], cwd=BACKEND, env=env, check=True
+    )
+
+    sys.path.append(str(BACKEND))
+    from app.migrations import MIGRATIONS
+
+    conn = sqlite3.connect(db_file)
+
+    def rows(sql):
+        return conn.execute(sql).fetchall()
+
+    assert rows("SELECT version FROM schema_version") == [(MIGRATIONS[-1][0],)]
+
+    # Blob fields become indexed columns and counters.
+    assert rows(
+        "SELECT id, author_id, category, created_at, like_count, retweet_count, comment_count"
+        " FROM posts ORDER BY id"
+    ) == [(1, "mg_a", "雑談", now, 2, 1, 2), (2, "mg_b", None, now, 0, 0, 0)]
+    assert rows("SELECT post_id FROM comments ORDER BY id") == [(1,), (1,)]
+    post = json.loads(rows("SELECT data FROM posts WHERE id = 1")[0][0])
+    assert "likes" not in post and "retweets" not in post
+    assert (post["like_count"], post["retweet_count"], post["comment_count"]) == (2, 1, 2)
+
+    # Relations leave the user blobs for edge tables.
+    assert set(rows("SELECT follower_id, followee_id FROM follows")) == {
+        ("mg_a", "mg_b"), ("mg_b", "mg_a"), ("mg_c", "mg_a"),
+    }
+    assert rows("SELECT blocker_id, blocked_id FROM blocks") == [("mg_a", "mg_d")]
+    assert rows("SELECT user_id, target_id FROM interests") == [("mg_c", "mg_a")]
+    assert set(rows("SELECT post_id, user_id FROM likes")) == {(1, "mg_b"), (1, "mg_c")}
+    assert rows("SELECT post_id, user_id FROM retweets") == [(1, "mg_b")]
+    assert rows("SELECT post_id, user_id FROM bookmarks") == [(2, "mg_a")]
+    for (data,) in rows("SELECT data FROM users"):
+        assert not {"followers", "following", "blocks", "interested", "bookmarks",
+                    "notifications"} & json.loads(data).keys()
+
+    # Derived tables are filled from the moved data.
+    assert set(rows("SELECT user_id, follower_count FROM follower_counts")) == {
+        ("mg_a", 2), ("mg_b", 1),
+    }
+    assert set(rows("SELECT tag, post_id FROM post_tags")) == {("art", 1), ("vtuber", 1)}
+    assert set(rows("SELECT tag, post_count FROM tag_counts WHERE span = 'all'")) == {
+        ("art", 1), ("vtuber", 1),
+    }
+    assert rows("SELECT post_id FROM trending WHERE scope = 'all'") == [(1,)]
+    assert set(rows("SELECT user_id, post_id FROM timelines")) == {
+        ("mg_a", 1), ("mg_a", 2), ("mg_b", 1), ("mg_b", 2), ("mg_c", 1),
+    }
+    assert rows("SELECT user_id FROM user_search ORDER BY id") == [
+        ("mg_a",), ("mg_b",), ("mg_c",), ("mg_d",),
+    ]
+    assert rows("SELECT rowid FROM posts_fts WHERE posts_fts MATCH 'migration'") == [(1,)]
+
+    cid = json.dumps(["mg_a", "mg_b"], separators=(",", ":"))
+    assert rows("SELECT conversation_id FROM messages") == [(cid,)]
+    assert set(rows("SELECT user_id, partner_id, last_message_id, unread_count FROM conversations")) == {
+        ("mg_a", "mg_b", 1, 0), ("mg_b", "mg_a", 1, 0),
+    }
+    assert rows("SELECT user_id, type, actor_id, read FROM notifications ORDER BY id") == [
+        ("mg_a", "follow", "mg_c", 1), ("mg_a", "message", "mg_b", 1),
+    ]
+    assert set(rows("SELECT group_id, user_id FROM group_members")) == {(1, "mg_a"), (1, "mg_b")}
+    conn.close()
+
+
+def test_concurrent_upgrade(tmp_path):
+    db_file = tmp_path / "baseline.db"
+    _baseline_db(db_file, datetime.now(timezone.utc).isoformat())
+
+    # Workers starting together: one migrates, the others wait and find it done.
+    env = os.environ | {"DATABASE_URL": f"sqlite:///{db_file}", "SOCIAL_GRAPH_ENABLED": "0"}
+    workers = [
+        subprocess.Popen([sys.executable, "-c", "from app import db"], cwd=BACKEND, env=env)
+        for _ in range(4)
+    ]
+    assert [w.wait() for w in workers] == [0, 0, 0, 0]
+
+    sys.path.append(str(BACKEND))
+    from app.migrations import MIGRATIONS
+
+    conn = sqlite3.connect(db_file)
+    assert conn.execute("SELECT version FROM schema_version").fetchall() == [
+        (MIGRATIONS[-1][0],)
+    ]
+    assert conn.execute("SELECT count(*) FROM follows").fetchall() == [(3,)]
+    conn.close()
@@ -0,0 +1,85 @@
+import os
+import sys
+from pathlib import Path
+from fastapi.testclient import TestClient
+
+
+def test_job_cursor_pages(tmp_path):
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud
+    from app.main import app
+    from app.pagination import encode_cursor
+
+    jobs = [
+        {"id": 9300 + i, "title": str(i), "created_at": f"2999-01-01T00:00:0{i}"}
+        for i in range(5)
+    ]
+    for job in jobs:
+        crud.insert_job(job)
+    client = TestClient(app)
+
+    seen = []
+    params = {"limit": 2}
+    while len(seen) < 5:
+        body = client.get("/jobs", params=params).json()
+        seen += [j["id"] for j in body["jobs"]]
+        params["before"] = body["next_cursor"]
+    assert seen == [9304, 9303, 9302, 9301, 9300]
+
+    newer = client.get("/jobs", params={"limit": 2, "after": encode_cursor(jobs[0])}).json()
+    assert [j["id"] for j in newer["jobs"]] == [9302, 9301]
+    assert newer["next_cursor"] == encode_cursor(jobs[2])
+
+    everything = client.get("/jobs", params={"unpaginated": True}).json()
+    assert len(everything["jobs"]) >= 5 and everything["next_cursor"] is None
+    assert client.get("/jobs", params={"before": "???"}).status_code == 400
+
+
+def test_list_limits(tmp_path, monkeypatch):
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud
+    from app.main import app
+
+    monkeypatch.setattr(crud.settings, "page_size_max", 2)
+    for i in range(3):
+        crud.insert_comment({"id": 9400 + i, "post_id": 94, "author_id": "lm", "content": str(i)})
+    client = TestClient(app)
+
+    comments = client.get("/posts/94/comments", params={"limit": 1000}).json()["comments"]
+    assert [c["id"] for c in comments] == [9400, 9401]
+    assert client.get("/posts/94/comments", params={"limit": -1}).status_code == 400
+    everything = client.get("/posts/94/comments", params={"unpaginated": True}).json()
+    assert len(everything["comments"]) == 3
+
+    for i in range(3):
+        crud.insert_message(
+            {"id": 9400 + i, "sender_id": "lm_a", "receiver_id": "lm_b", "content": str(i)}
+        )
+    for name in ("lm_a", "lm_b"):
+        crud.insert_user({"user_id": name, "username": name})
+    messages = client.get("/messages/lm_a/with/lm_b", params={"limit": 1000}).json()["messages"]
+    assert [m["id"] for m in messages] == [9401, 9402]
+    assert client.get("/messages/lm_a/with/lm_b", params={"limit": 0}).status_code == 400
+
+    for i in range(3):
+        crud.insert_group_message({"id": 9400 + i, "group_id": 94, "sender_id": "lm_a", "content": str(i)})
+    messages = client.get("/groups/94/messages", params={"limit": 1000}).json()["messages"]
+    assert [m["id"] for m in messages] == [9401, 9402]
+    assert client.get("/groups/94/messages", params={"limit": -5}).status_code == 400
+
+    for name in ("lm_c", "lm_d", "lm_e"):
+        crud.insert_user({"user_id": name, "username": name})
+        crud.follow(name, "lm_a")
+    followers = client.get("/users/lm_a/followers", params={"limit": 1000}).json()
+    assert [u["user_id"] for u in followers] == ["lm_c", "lm_d"]
+    assert client.get("/users/lm_a/followers", params={"limit": -1}).status_code == 400
+    assert len(client.get("/users/lm_a/followers", params={"unpaginated": True}).json()) == 3
+
+    # Profiles carry counts and the viewer's relation, not the lists.
+    profile = client.get("/users/lm_a", params={"viewer_id": "lm_c"}).json()
+    assert (profile["follower_count"], profile["following_count"]) == (3, 0)
+    assert profile["followed"] and not profile["blocked"] and "followers" not in profile
@@ -0,0 +1,111 @@
+import os
+import sys
+from pathlib import Path
+
+
+def test_post_search(tmp_path, monkeypatch):
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud
+
+    posts = [
+        (9701, "検索テスト 新しい配信のお知らせ", ["srch_tag"], "2999-01-03T00:00:00"),
+        (9702, "検索テスト 古い配信", [], "2999-01-01T00:00:00"),
+        (9703, "検索テスト 雑談", ["配信"], "2999-01-02T00:00:00"),
+    ]
+    for post_id, content, tags, created in posts:
+        crud.insert_post(
+            {"id": post_id, "content": content, "tags": tags, "created_at": created}
+        )
+
+    def ids(query, **kwargs):
+        return [p["id"] for p, _ in crud.query_search_posts(query, **kwargs)]
+
+    # With recency weighing next to nothing the shortest match ranks first.
+    monkeypatch.setattr(crud.settings, "search_recency_days", 1e9)
+    assert ids("検索テスト") == [9703, 9702, 9701]
+    monkeypatch.setattr(crud.settings, "search_recency_days", 1e-3)
+    # Two-character terms are scanned; tags are searched too.
+    assert ids("検索テスト 配信") == [9701, 9703, 9702]
+    assert ids("srch_tag") == [9701]
+    first = crud.query_search_posts("検索テスト", limit=2)
+    assert [p["id"] for p, _ in first] == [9701, 9703]
+    assert ids("検索テスト", before=first[-1][1]) == [9702]
+
+    crud.update_post(9702, {"content": "内容を変更", "tags": []})
+    assert ids("検索テスト") == [9701, 9703]
+    assert ids("内容を変更") == [9702]
+    crud.delete_post(9701)
+    assert ids("srch_tag") == []
+
+
+def test_user_typeahead(tmp_path):
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud, db
+    from sqlalchemy import select
+
+    for user_id, name in [
+        ("zq_mika", "Mika"),
+        ("zqmi", "ミカ"),
+        ("a_zqmi_fan", "fan"),
+        ("bob_zq", "Zqmiko"),
+    ]:
+        crud.insert_user({"user_id": user_id, "username": name, "profile": {}})
+
+    def ids(query, limit=20):
+        return [u["user_id"] for u in crud.query_search_users(query, limit)]
+
+    assert ids("ZQMI") == ["zqmi", "bob_zq", "a_zqmi_fan"]
+    assert ids("zqmi", limit=1) == ["zqmi"]
+    assert ids("q_") == ["zq_mika"]
+    crud.index_user({"user_id": "zqmi", "username": "ミカ", "profile": {"profile_image": "p.png"}})
+    assert crud.query_search_users("zqmi", 1) == [
+        {"user_id": "zqmi", "username": "ミカ", "profile_image": "p.png"}
+    ]
+
+    # Substring hits are keyed by user_search.id, which VACUUM keeps.
+    crud.delete_user("zq_mika")
+    with crud.engine.connect() as conn:
+        conn.exec_driver_sql("VACUUM")
+        keys = conn.exec_driver_sql("SELECT rowid FROM users_fts ORDER BY rowid").scalars()
+        search_ids = conn.execute(select(db.user_search_table.c.id).order_by("id")).scalars()
+        assert list(keys) == list(search_ids)
+    assert ids("qmi_f") == ["a_zqmi_fan"]
+
+
+def test_creator_term_index(tmp_path):
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud
+
+    profiles = {
+        "ct_a": {"skills": ["CTX Illust", "ctx live2d"], "software": ["CTX Photoshop"]},
+        "ct_b": {"skills": ["ctx illust"], "equipment": ["ctx tablet"]},
+        "ct_c": {"skills": ["ctx live2d"], "visibility": "private"},
+        "ct_d": {"software": ["ctx clip studio"]},
+    }
+    for user_id, prof in profiles.items():
+        crud.index_creator_profile({"user_id": user_id, "creator_profile": prof})
+
+    assert crud.query_creator_profiles(["ctx illust", "ctx live2d"]) == [("ct_a", 2)]
+    hits = crud.query_creator_profiles(["ctx illust", "ctx live2d"], match_all=False)
+    assert hits == [("ct_a", 2), ("ct_b", 1)]
+    assert crud.query_creator_profiles(["ctx illust", "ctx live2d"], False, after=hits[0]) == [
+        ("ct_b", 1)
+    ]
+    # Terms match as prefixes, case-insensitively, and can be limited to a facet.
+    assert crud.query_creator_profiles(["CTX"], False, "software") == [("ct_a", 1), ("ct_d", 1)]
+    facets = crud.creator_facets(["ctx illust"])
+    assert facets["skills"] == [
+        {"term": "ctx illust", "count": 2},
+        {"term": "ctx live2d", "count": 1},
+    ]
+    assert facets["equipment"] == [{"term": "ctx tablet", "count": 1}]
+    assert crud.creator_facets([" "]) == {"skills": [], "software": [], "equipment": []}
+
+    crud.index_creator_profile({"user_id": "ct_a", "creator_profile": {"visibility": "private"}})
+    assert crud.query_creator_profiles(["ctx illust"]) == [("ct_b", 1)]
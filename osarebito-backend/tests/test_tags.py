@@ -0,0 +1,35 @@
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+def test_tag_index_and_windows(tmp_path):
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud
+
+    now = datetime.utcnow()
+    posts = [
+        (9501, ["tg_a", "tg_b", "tg_a"], now),
+        (9502, ["tg_a"], now - timedelta(minutes=1)),
+        (9503, ["tg_b"], now - timedelta(days=3)),
+        (9504, ["tg_b"], now - timedelta(days=20)),
+    ]
+    for post_id, tags, created in posts:
+        item = {"id": post_id, "tags": tags, "created_at": created.isoformat()}
+        crud.insert_post(item)
+        crud.index_post_tags(item)
+
+    def counts(window):
+        return {t["name"]: t["count"] for t in crud.popular_tags(window, 100) if t["name"].startswith("tg_")}
+
+    assert counts("hour") == {"tg_a": 2, "tg_b": 1}
+    assert counts("week") == {"tg_a": 2, "tg_b": 2}
+    assert counts("all") == {"tg_a": 2, "tg_b": 3}
+
+    page = crud.query_tag_posts("tg_b", limit=2)
+    assert [p["id"] for p in page] == [9501, 9503]
+    rest = crud.query_tag_posts("tg_b", before=(page[-1]["created_at"], 9503))
+    assert [p["id"] for p in rest] == [9504]
@@ -0,0 +1,103 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+
+def _post(crud, post_id, author_id):
+    post = {"id": post_id, "author_id": author_id, "created_at": f"2999-02-01T00:00:{post_id % 60:02d}"}
+    crud.insert_post(post)
+    crud.fan_out_post(post)
+
+
+def _home(crud, user_id, **kwargs):
+    return [p["id"] for p in crud.query_home_timeline(user_id, **kwargs)]
+
+
+def test_fan_out_and_pull_authors(tmp_path, monkeypatch):
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud
+    from app.config import settings
+
+    crud.follow("tl_b", "tl_a")
+    crud.follow("tl_c", "tl_a")
+    _post(crud, 9401, "tl_a")
+    _post(crud, 9402, "tl_c")
+    assert _home(crud, "tl_b") == [9401]
+    assert _home(crud, "tl_a") == [9401]
+
+    monkeypatch.setattr(settings, "timeline_fanout_max_followers", 1)
+    _post(crud, 9403, "tl_a")
+    assert crud.pull_followee_ids("tl_b") == ["tl_a"]
+    assert _home(crud, "tl_b") == [9403, 9401]
+    assert _home(crud, "tl_b", limit=1) == [9403]
+    assert _home(crud, "tl_b", exclude_authors={"tl_a"}) == []
+
+    crud.follow("tl_a", "tl_c")
+    crud.backfill_timeline("tl_a", "tl_c")
+    assert _home(crud, "tl_a") == [9403, 9402, 9401]
+    crud.block("tl_c", "tl_a")
+    assert _home(crud, "tl_a") == [9403, 9401]
+    crud.unfollow("tl_b", "tl_a")
+    crud.prune_timeline("tl_b", "tl_a")
+    assert _home(crud, "tl_b") == []
+
+
+def test_timeline_cap(tmp_path, monkeypatch):
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud, db, migrations
+    from app.config import settings
+    from sqlalchemy import insert
+
+    monkeypatch.setattr(settings, "timeline_max_entries", 2)
+    crud.follow("cap_b", "cap_a")
+    for post_id in (8501, 8502, 8503):
+        _post(crud, post_id, "cap_a")
+    assert _home(crud, "cap_b") == [8503, 8502]
+    assert _home(crud, "cap_a") == [8503, 8502]
+
+    crud.follow("cap_b", "cap_c")
+    _post(crud, 8504, "cap_c")
+    crud.backfill_timeline("cap_b", "cap_c")
+    assert _home(crud, "cap_b") == [8504, 8503]
+
+    # The v21 migration trims timelines filled before the cap.
+    timestamps = {p["id"]: p["created_at"] for p in crud.get_posts([8501, 8502, 8503])}
+    with db.engine.begin() as conn:
+        conn.execute(
+            insert(db.timelines_table),
+            [
+                {"user_id": "cap_d", "post_id": p, "author_id": "cap_a", "created_at": created_at}
+                for p, created_at in timestamps.items()
+            ],
+        )
+        migrations.trim_timelines(conn, db)
+    assert _home(crud, "cap_d") == [8503, 8502]
+
+
+def test_publish_post_is_atomic(tmp_path, monkeypatch):
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud
+
+    crud.follow("pub_b", "pub_a")
+    post = {"id": 8601, "author_id": "pub_a", "tags": ["pub"], "created_at": "2999-03-01T00:00:00"}
+
+    def fail(conn, post):
+        raise RuntimeError("tag index unavailable")
+
+    monkeypatch.setattr(crud, "_index_post_tags", fail)
+    with pytest.raises(RuntimeError):
+        crud.publish_post(post)
+    assert crud.get_post(8601) is None and _home(crud, "pub_b") == []
+
+    monkeypatch.undo()
+    crud.publish_post(post)
+    assert _home(crud, "pub_b") == [8601]
+    assert [p["id"] for p in crud.query_tag_posts("pub")] == [8601]
@@ -0,0 +1,55 @@
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from fastapi.testclient import TestClient
+
+
+def test_decayed_trending(tmp_path):
+    db_file = tmp_path / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    from app import crud, db, trending
+    from app.main import app
+    from sqlalchemy import select
+
+    old = {"id": 9601, "category": "tr_cat", "tags": ["tr_tag"]}
+    new = {"id": 9602, "tags": ["tr_tag"]}
+    for post in (old, new):
+        crud.insert_post(post | {"like_count": 0, "retweet_count": 0})
+
+    # Three likes a day ago weigh less than one now (6h half-life).
+    day_ago = (datetime.utcnow() - timedelta(days=1)).isoformat()
+    with crud.engine.begin() as conn:
+        for _ in range(3):
+            trending.record(conn, old, True, day_ago)
+    crud.set_like(9602, "tr_a", True)
+    assert [p["id"] for p in crud.query_trending_posts(100, tag="tr_tag")] == [9602, 9601]
+    assert [p["id"] for p in crud.query_trending_posts(100, category="tr_cat")] == [9601]
+    client = TestClient(app)
+    response = client.get("/trending_posts", params={"category": "tr_cat", "tag": "tr_tag"})
+    assert response.status_code == 400
+
+    crud.set_retweet(9601, "tr_a", True)
+    assert [p["id"] for p in crud.query_trending_posts(100, tag="tr_tag")] == [9601, 9602]
+    crud.set_retweet(9601, "tr_a", False)
+    crud.set_like(9602, "tr_a", False)
+    assert [p["id"] for p in crud.query_trending_posts(100, tag="tr_tag")] == [9601]
+
+    # Live scores use the engagement rows' own times, so a rebuild agrees.
+    t = db.trending_table
+    scores = select(t.c.scope, t.c.post_id, t.c.score).order_by(t.c.scope, t.c.post_id)
+
+    def rebuild(conn):
+        trending.rebuild(conn, db.posts_table, db.likes_table, db.retweets_table)
+
+    with db.engine.begin() as conn:
+        rebuild(conn)
+    crud.set_like(9601, "tr_b", True)
+    crud.set_retweet(9602, "tr_b", True)
+    with db.engine.begin() as conn:
+        live = conn.execute(scores).all()
+        rebuild(conn)
+        rebuilt = conn.execute(scores).all()
+    assert [r[:2] for r in live] == [r[:2] for r in rebuilt] and live
+    assert all(abs(a.score - b.score) < 1e-9 for a, b in zip(live, rebuilt))
@@ -0,0 +1,38 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, func, insert, select
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.writer import WriteQueue  # noqa: E402
+
+
+def test_group_commit(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'writer.db'}")
+    metadata = MetaData()
+    counters = Table("counters", metadata, Column("id", Integer, primary_key=True))
+    metadata.create_all(engine)
+
+    writer = WriteQueue(engine, window_ms=20, max_batch=64)
+    writer.start()
+    try:
+        def write(i):
+            op = lambda conn: conn.execute(insert(counters).values(id=i)).rowcount  # noqa: E731
+            return writer.submit(op).result()
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            assert list(pool.map(write, range(100))) == [1] * 100
+
+        duplicate = writer.submit(lambda conn: conn.execute(insert(counters).values(id=1)))
+        fine = writer.submit(lambda conn: conn.execute(insert(counters).values(id=1000)).rowcount)
+        with pytest.raises(Exception):
+            duplicate.result()
+        assert fine.result() == 1
+    finally:
+        writer.stop()
+
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(counters)).scalar() == 101
+    assert writer.batches < writer.operations
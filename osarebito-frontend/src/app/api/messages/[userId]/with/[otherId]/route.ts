@@ -7,7 +7,8 @@ export async function GET(req: NextRequest, { params }: { params: any }) {
   try {
     const userId = Array.isArray(params.userId) ? params.userId[0] : params.userId
     const otherId = Array.isArray(params.otherId) ? params.otherId[0] : params.otherId
-    const res = await fetch(messagesWithUrl(userId, otherId))
+    // The chat page shows the whole conversation; the backend pages by default.
+    const res = await fetch(`${messagesWithUrl(userId, otherId)}?unpaginated=true`)
     const body = await res.json()
     if (!res.ok) {
       return NextResponse.json({ detail: body.detail }, { status: res.status })
@@ -5,7 +5,8 @@ import { postCommentsUrl } from '@/routes'
 export async function GET(req: NextRequest, { params }: { params: any }) {
   try {
     const postId = Array.isArray(params.postId) ? params.postId[0] : params.postId
-    const res = await fetch(postCommentsUrl(Number(postId)))
+    // The post page shows the whole thread; the backend pages by default.
+    const res = await fetch(`${postCommentsUrl(Number(postId))}?unpaginated=true`)
     const body = await res.json()
     if (!res.ok) {
       return NextResponse.json({ detail: body.detail }, { status: res.status })
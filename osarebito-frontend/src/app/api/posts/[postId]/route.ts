@@ -5,7 +5,8 @@ import { getPostUrl } from '@/routes'
 export async function GET(req: NextRequest, { params }: { params: any }) {
   try {
     const postId = Array.isArray(params.postId) ? params.postId[0] : params.postId
-    const res = await fetch(getPostUrl(Number(postId)))
+    const viewerId = req.nextUrl.searchParams.get('viewer_id') || undefined
+    const res = await fetch(getPostUrl(Number(postId), viewerId))
     const body = await res.json()
     if (!res.ok) {
       return NextResponse.json({ detail: body.detail }, { status: res.status })
@@ -7,7 +7,8 @@ export async function GET(req: NextRequest) {
   const feed = searchParams.get('feed') || 'all'
   const user_id = searchParams.get('user_id') || undefined
   const category = searchParams.get('category') || undefined
-  const url = postsUrl(feed, user_id || undefined, category || undefined)
+  const before = searchParams.get('before') || undefined
+  const url = postsUrl(feed, user_id || undefined, category || undefined, before)
     const res = await fetch(url)
     const body = await res.json()
     if (!res.ok) {
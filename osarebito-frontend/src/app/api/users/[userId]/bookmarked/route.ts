@@ -0,0 +1,19 @@
+import { NextResponse } from 'next/server'
+import type { NextRequest } from 'next/server'
+import { userBookmarkedUrl } from '@/routes'
+/* eslint-disable @typescript-eslint/no-explicit-any */
+
+export async function GET(req: NextRequest, { params }: { params: any }) {
+  try {
+    const userId = Array.isArray(params.userId) ? params.userId[0] : params.userId
+    const postIds = req.nextUrl.searchParams.getAll('post_id')
+    const res = await fetch(userBookmarkedUrl(userId, postIds))
+    const body = await res.json()
+    if (!res.ok) {
+      return NextResponse.json({ detail: body.detail }, { status: res.status })
+    }
+    return NextResponse.json(body)
+  } catch {
+    return NextResponse.json({ detail: 'Server error' }, { status: 500 })
+  }
+}
@@ -6,7 +6,8 @@ import { userBookmarksUrl } from '@/routes'
 export async function GET(req: NextRequest, { params }: { params: any }) {
   try {
     const userId = Array.isArray(params.userId) ? params.userId[0] : params.userId
-    const res = await fetch(userBookmarksUrl(userId))
+    const before = req.nextUrl.searchParams.get('before') || undefined
+    const res = await fetch(userBookmarksUrl(userId, before))
     const body = await res.json()
     if (!res.ok) {
       return NextResponse.json({ detail: body.detail }, { status: res.status })
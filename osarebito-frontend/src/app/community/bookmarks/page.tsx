@@ -16,8 +16,10 @@ interface Post {
   content: string
   created_at: string
   category?: string | null
-  likes?: string[]
-  retweets?: string[]
+  like_count?: number
+  retweet_count?: number
+  liked?: boolean
+  retweeted?: boolean
   image?: string | null
   anonymous?: boolean
 }
@@ -25,22 +27,29 @@ interface Post {
 export default function CommunityBookmarks() {
   const [posts, setPosts] = useState<Post[]>([])
   const [bookmarks, setBookmarks] = useState<number[]>([])
+  const [cursor, setCursor] = useState<string | null>(null)
   const [reportTarget, setReportTarget] = useState<
     | { type: 'post'; id: number }
     | { type: 'comment'; id: number }
     | null
   >(null)
 
-  useEffect(() => {
+  const loadPage = async (before?: string) => {
     const uid = localStorage.getItem('userId') || ''
     if (!uid) return
-    axios.get(`/api/users/${uid}/bookmarks`).then((res) => {
-      const list = res.data.posts || []
-      const anon = localStorage.getItem('anonymousMode') === '1'
-      const filtered = list.filter((p: Post) => (anon ? p.anonymous : !p.anonymous))
-      setPosts(filtered)
-      setBookmarks(filtered.map((p: Post) => p.id))
-    })
+    const query = before ? `?before=${encodeURIComponent(before)}` : ''
+    const res = await axios.get(`/api/users/${uid}/bookmarks${query}`)
+    const list = res.data.posts || []
+    const anon = localStorage.getItem('anonymousMode') === '1'
+    const filtered = list.filter((p: Post) => (anon ? p.anonymous : !p.anonymous))
+    setPosts((prev) => (before ? [...prev, ...filtered] : filtered))
+    setBookmarks((prev) => [...(before ? prev : []), ...filtered.map((p: Post) => p.id)])
+    setCursor(res.data.next_cursor)
+  }
+
+  useEffect(() => {
+    loadPage()
+    // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [])
 
   const handleLike = async (postId: number, liked: boolean) => {
@@ -49,16 +58,11 @@ export default function CommunityBookmarks() {
     const url = liked
       ? `/api/posts/${postId}/unlike`
       : `/api/posts/${postId}/like`
-    await axios.post(url, { user_id })
+    const res = await axios.post(url, { user_id })
     setPosts((prev) =>
-      prev.map((p) => {
-        if (p.id !== postId) return p
-        const list = p.likes || []
-        return {
-          ...p,
-          likes: liked ? list.filter((v) => v !== user_id) : [...list, user_id],
-        }
-      }),
+      prev.map((p) =>
+        p.id === postId ? { ...p, like_count: res.data.likes, liked: !liked } : p,
+      ),
     )
   }
 
@@ -68,17 +72,10 @@ export default function CommunityBookmarks() {
     const url = rted
       ? `/api/posts/${postId}/unretweet`
       : `/api/posts/${postId}/retweet`
-    await axios.post(url, { user_id })
+    const res = await axios.post(url, { user_id })
     setPosts((prev) =>
       prev.map((p) =>
-        p.id === postId
-          ? {
-              ...p,
-              retweets: rted
-                ? (p.retweets || []).filter((v) => v !== user_id)
-                : [...(p.retweets || []), user_id],
-            }
-          : p,
+        p.id === postId ? { ...p, retweet_count: res.data.retweets, retweeted: !rted } : p,
       ),
     )
   }
@@ -101,8 +98,8 @@ export default function CommunityBookmarks() {
     <div>
       <h1 className="text-xl font-bold mb-4">ブックマーク一覧</h1>
       {posts.map((p) => {
-        const liked = (p.likes || []).includes(localStorage.getItem('userId') || '')
-        const rted = (p.retweets || []).includes(localStorage.getItem('userId') || '')
+        const liked = !!p.liked
+        const rted = !!p.retweeted
         const marked = bookmarks.includes(p.id)
         return (
           <PostCard
@@ -116,11 +113,11 @@ export default function CommunityBookmarks() {
               <>
                 <button className="flex items-center gap-1 underline" onClick={() => handleLike(p.id, liked)}>
                   {liked ? <HeartIconSolid className="w-4 h-4 text-red-500" /> : <HeartIcon className="w-4 h-4" />}
-                  {p.likes ? p.likes.length : 0}
+                  {p.like_count ?? 0}
                 </button>
                 <button className="flex items-center gap-1 underline" onClick={() => handleRetweet(p.id, rted)}>
                   <ArrowsRightLeftIcon className={`w-4 h-4 ${rted ? 'text-blue-500' : ''}`} />
-                  {p.retweets ? p.retweets.length : 0}
+                  {p.retweet_count ?? 0}
                 </button>
                 <button className="flex items-center gap-1 underline" onClick={() => handleBookmark(p.id, marked)}>
                   <BookmarkIcon className={`w-4 h-4 ${marked ? 'text-green-500' : ''}`} />
@@ -133,7 +130,12 @@ export default function CommunityBookmarks() {
           />
         )
       })}
-      {posts.length === 0 && <p>ブックマークはありません。</p>}
+      {cursor && (
+        <button className="underline text-sm" onClick={() => loadPage(cursor)}>
+          もっと見る
+        </button>
+      )}
+      {posts.length === 0 && !cursor && <p>ブックマークはありません。</p>}
       {reportTarget && (
         <ReportModal
           targetType={reportTarget.type}
@@ -14,7 +14,7 @@ export default function GroupChat() {
   const uid = typeof window !== 'undefined' ? localStorage.getItem('userId') || '' : ''
 
   const load = async () => {
-    const res = await axios.get(groupMessagesUrl(gid))
+    const res = await axios.get(groupMessagesUrl(gid), { params: { unpaginated: true } })
     setMessages(res.data.messages || [])
   }
 
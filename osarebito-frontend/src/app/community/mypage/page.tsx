@@ -28,20 +28,38 @@ export default function CommunityMyPage() {
   const [posts, setPosts] = useState<Post[]>([])
   const [retweets, setRetweets] = useState<Post[]>([])
   const [user, setUser] = useState<User | null>(null)
+  const [postsCursor, setPostsCursor] = useState<string | null>(null)
+  const [retweetsCursor, setRetweetsCursor] = useState<string | null>(null)
+
+  const loadPosts = async (before?: string) => {
+    const uid = localStorage.getItem('userId') || ''
+    if (!uid) return
+    const anon = localStorage.getItem('anonymousMode') === '1'
+    const query = before ? `&before=${encodeURIComponent(before)}` : ''
+    const res = await axios.get(`/api/posts?feed=user&user_id=${uid}${query}`)
+    const list = (res.data.posts || []).filter((p: Post) => (anon ? p.anonymous : !p.anonymous))
+    setPosts((prev) => (before ? [...prev, ...list] : list))
+    setPostsCursor(res.data.next_cursor)
+  }
+
+  const loadRetweets = async (before?: string) => {
+    const uid = localStorage.getItem('userId') || ''
+    if (!uid) return
+    const anon = localStorage.getItem('anonymousMode') === '1'
+    const query = before ? `?before=${encodeURIComponent(before)}` : ''
+    const res = await axios.get(`/api/users/${uid}/retweets${query}`)
+    const list = (res.data.posts || []).filter((p: Post) => (anon ? p.anonymous : !p.anonymous))
+    setRetweets((prev) => (before ? [...prev, ...list] : list))
+    setRetweetsCursor(res.data.next_cursor)
+  }
 
   useEffect(() => {
     const uid = localStorage.getItem('userId') || ''
     if (!uid) return
     axios.get(`/api/users/${uid}`).then((res) => setUser(res.data))
-    const anon = localStorage.getItem('anonymousMode') === '1'
-    axios.get(`/api/posts?feed=user&user_id=${uid}`).then((res) => {
-      const list = res.data.posts || []
-      setPosts(list.filter((p: Post) => (anon ? p.anonymous : !p.anonymous)))
-    })
-    axios.get(`/api/users/${uid}/retweets`).then((res) => {
-      const list = res.data.posts || []
-      setRetweets(list.filter((p: Post) => (anon ? p.anonymous : !p.anonymous)))
-    })
+    loadPosts()
+    loadRetweets()
+    // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [])
 
   const Card = ({ p }: { p: Post }) => (
@@ -81,14 +99,24 @@ export default function CommunityMyPage() {
         {posts.map((p) => (
           <Card key={p.id} p={p} />
         ))}
-        {posts.length === 0 && <p>投稿がありません。</p>}
+        {postsCursor && (
+          <button className="underline text-sm" onClick={() => loadPosts(postsCursor)}>
+            もっと見る
+          </button>
+        )}
+        {posts.length === 0 && !postsCursor && <p>投稿がありません。</p>}
       </section>
       <section>
         <h2 className="font-semibold mb-2">リポストした投稿</h2>
         {retweets.map((p) => (
           <Card key={p.id} p={p} />
         ))}
-        {retweets.length === 0 && <p>リポストはありません。</p>}
+        {retweetsCursor && (
+          <button className="underline text-sm" onClick={() => loadRetweets(retweetsCursor)}>
+            もっと見る
+          </button>
+        )}
+        {retweets.length === 0 && !retweetsCursor && <p>リポストはありません。</p>}
       </section>
     </div>
   )
@@ -6,6 +6,7 @@ interface Notification {
   type: string
   from?: string
   message_id?: number
+  count?: number
   created_at: string
 }
 
@@ -30,9 +31,17 @@ export default function CommunityNotifications() {
           {notes.map((n, idx) => (
             <li key={idx} className="text-sm border rounded-lg bg-white p-2 shadow">
               {n.type === 'message' && n.from ? (
-                <span>{n.from} からメッセージが届きました。</span>
+                (n.count ?? 1) > 1 ? (
+                  <span>{n.from} から {n.count} 件のメッセージが届きました。</span>
+                ) : (
+                  <span>{n.from} からメッセージが届きました。</span>
+                )
               ) : n.type === 'follow' && n.from ? (
-                <span>{n.from} にフォローされました。</span>
+                (n.count ?? 1) > 1 ? (
+                  <span>{n.from} ほか {(n.count ?? 1) - 1} 人にフォローされました。</span>
+                ) : (
+                  <span>{n.from} にフォローされました。</span>
+                )
               ) : (
                 <span>{n.type}</span>
               )}
@@ -26,8 +26,10 @@ interface Post {
   category?: string | null
   anonymous?: boolean
   best_answer_id?: number | null
-  likes?: string[]
-  retweets?: string[]
+  like_count?: number
+  retweet_count?: number
+  liked?: boolean
+  retweeted?: boolean
   image?: string | null
 }
 
@@ -77,15 +79,25 @@ export default function CommunityHome() {
         if (msg.type === 'new_post') {
           setPosts((p) => [msg.post, ...p])
         } else if (msg.type === 'like') {
+          const mine = msg.user_id === localStorage.getItem('userId')
           setPosts((p) =>
             p.map((post) =>
-              post.id === msg.post_id ? { ...post, likes: msg.likes } : post,
+              post.id === msg.post_id
+                ? { ...post, like_count: msg.like_count, liked: mine ? msg.liked : post.liked }
+                : post,
             ),
           )
         } else if (msg.type === 'retweet') {
+          const mine = msg.user_id === localStorage.getItem('userId')
           setPosts((p) =>
             p.map((post) =>
-              post.id === msg.post_id ? { ...post, retweets: msg.retweets } : post,
+              post.id === msg.post_id
+                ? {
+                    ...post,
+                    retweet_count: msg.retweet_count,
+                    retweeted: mine ? msg.retweeted : post.retweeted,
+                  }
+                : post,
             ),
           )
         }
@@ -107,7 +119,14 @@ export default function CommunityHome() {
       params.append('anonymous', 'false')
     }
     const res = await axios.get(`/api/posts?${params.toString()}`)
-    setPosts(res.data.posts || [])
+    const list: Post[] = res.data.posts || []
+    setPosts(list)
+    if (userId && list.length > 0) {
+      const ids = new URLSearchParams()
+      list.forEach((p) => ids.append('post_id', String(p.id)))
+      const marked = await axios.get(`/api/users/${userId}/bookmarked?${ids.toString()}`)
+      setBookmarks(marked.data.post_ids)
+    }
   }
 
   useEffect(() => {
@@ -122,12 +141,6 @@ export default function CommunityHome() {
       setTags(t.data)
     }
     loadSide()
-    const uid = localStorage.getItem('userId') || ''
-    if (uid) {
-      axios.get(`/api/users/${uid}/bookmarks`).then((res) => {
-        setBookmarks(res.data.posts.map((p: Post) => p.id))
-      })
-    }
   }, [])
 
   const submitPost = async () => {
@@ -151,19 +164,11 @@ export default function CommunityHome() {
     if (!user_id) return
     const url = liked ? `/api/posts/${postId}/unlike` : `/api/posts/${postId}/like`
     try {
-      await axios.post(url, { user_id })
+      const res = await axios.post(url, { user_id })
       setPosts((prev) =>
-        prev.map((p) => {
-          if (p.id !== postId) return p
-          const list = p.likes || []
-          let newLikes = list
-          if (liked) {
-            newLikes = list.filter((v) => v !== user_id)
-          } else if (!list.includes(user_id)) {
-            newLikes = [...list, user_id]
-          }
-          return { ...p, likes: newLikes }
-        }),
+        prev.map((p) =>
+          p.id === postId ? { ...p, like_count: res.data.likes, liked: !liked } : p,
+        ),
       )
     } catch {
       // ignore
@@ -176,17 +181,10 @@ export default function CommunityHome() {
     const url = rted
       ? `/api/posts/${postId}/unretweet`
       : `/api/posts/${postId}/retweet`
-    await axios.post(url, { user_id })
+    const res = await axios.post(url, { user_id })
     setPosts((prev) =>
       prev.map((p) =>
-        p.id === postId
-          ? {
-              ...p,
-              retweets: rted
-                ? (p.retweets || []).filter((v) => v !== user_id)
-                : [...(p.retweets || []), user_id],
-            }
-          : p,
+        p.id === postId ? { ...p, retweet_count: res.data.retweets, retweeted: !rted } : p,
       ),
     )
   }
@@ -352,19 +350,14 @@ export default function CommunityHome() {
               <>
                 <button
                   className="flex items-center gap-1 underline"
-                  onClick={() =>
-                    handleLike(
-                      p.id,
-                      (p.likes || []).includes(localStorage.getItem('userId') || '')
-                    )
-                  }
+                  onClick={() => handleLike(p.id, !!p.liked)}
                 >
-                  {(p.likes || []).includes(localStorage.getItem('userId') || '') ? (
+                  {p.liked ? (
                     <HeartIconSolid className="w-4 h-4 text-red-500" />
                   ) : (
                     <HeartIcon className="w-4 h-4" />
                   )}
-                  {p.likes ? p.likes.length : 0}
+                  {p.like_count ?? 0}
                 </button>
                 <Link
                   href={`/community/post/${p.id}`}
@@ -375,17 +368,10 @@ export default function CommunityHome() {
                 </Link>
                 <button
                   className="flex items-center gap-1 underline"
-                  onClick={() =>
-                    handleRetweet(
-                      p.id,
-                      (p.retweets || []).includes(localStorage.getItem('userId') || '')
-                    )
-                  }
+                  onClick={() => handleRetweet(p.id, !!p.retweeted)}
                 >
-                  <ArrowsRightLeftIcon
-                    className={`w-4 h-4 ${(p.retweets || []).includes(localStorage.getItem('userId') || '') ? 'text-blue-500' : ''}`}
-                  />
-                  {p.retweets ? p.retweets.length : 0}
+                  <ArrowsRightLeftIcon className={`w-4 h-4 ${p.retweeted ? 'text-blue-500' : ''}`} />
+                  {p.retweet_count ?? 0}
                 </button>
                 <button
                   className="flex items-center gap-1 underline"
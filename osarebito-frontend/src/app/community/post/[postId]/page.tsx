@@ -21,8 +21,10 @@ interface Post {
   category?: string | null
   anonymous?: boolean
   best_answer_id?: number | null
-  likes?: string[]
-  retweets?: string[]
+  like_count?: number
+  retweet_count?: number
+  liked?: boolean
+  retweeted?: boolean
   image?: string | null
 }
 
@@ -57,9 +59,14 @@ export default function PostCommentsPage() {
     | null
   >(null)
 
+  const fetchPost = () => {
+    const uid = localStorage.getItem('userId') || ''
+    return axios.get(`/api/posts/${postId}`, { params: uid ? { viewer_id: uid } : {} })
+  }
+
   const load = async () => {
     const [postRes, commentRes] = await Promise.all([
-      axios.get(`/api/posts/${postId}`),
+      fetchPost(),
       axios.get(`/api/posts/${postId}/comments`),
     ])
     const anonMode = localStorage.getItem('anonymousMode') === '1'
@@ -79,8 +86,8 @@ export default function PostCommentsPage() {
     setTags(t.data)
     const uid = localStorage.getItem('userId') || ''
     if (uid) {
-      const res = await axios.get(`/api/users/${uid}/bookmarks`)
-      setBookmarks(res.data.posts.map((p: Post) => p.id))
+      const res = await axios.get(`/api/users/${uid}/bookmarked?post_id=${postId}`)
+      setBookmarks(res.data.post_ids)
     }
   }
 
@@ -108,7 +115,7 @@ export default function PostCommentsPage() {
       ? `/api/posts/${postId}/unlike`
       : `/api/posts/${postId}/like`
     await axios.post(url, { user_id })
-    const res = await axios.get(`/api/posts/${postId}`)
+    const res = await fetchPost()
     setPost(res.data)
   }
 
@@ -119,7 +126,7 @@ export default function PostCommentsPage() {
       ? `/api/posts/${postId}/unretweet`
       : `/api/posts/${postId}/retweet`
     await axios.post(url, { user_id })
-    const res = await axios.get(`/api/posts/${postId}`)
+    const res = await fetchPost()
     setPost(res.data)
   }
 
@@ -156,8 +163,8 @@ export default function PostCommentsPage() {
       <p className="p-4">この投稿は現在のモードでは表示できません。</p>
     )
 
-  const liked = (post.likes || []).includes(localStorage.getItem('userId') || '')
-  const rted = (post.retweets || []).includes(localStorage.getItem('userId') || '')
+  const liked = !!post.liked
+  const rted = !!post.retweeted
   const marked = bookmarks.includes(postId)
 
   return (
@@ -180,11 +187,11 @@ export default function PostCommentsPage() {
                 ) : (
                   <HeartIcon className="w-4 h-4" />
                 )}
-                {post.likes ? post.likes.length : 0}
+                {post.like_count ?? 0}
               </button>
               <button className="flex items-center gap-1 underline" onClick={() => handleRetweet(rted)}>
                 <ArrowsRightLeftIcon className={`w-4 h-4 ${rted ? 'text-blue-500' : ''}`} />
-                {post.retweets ? post.retweets.length : 0}
+                {post.retweet_count ?? 0}
               </button>
               <button className="flex items-center gap-1 underline" onClick={() => handleBookmark(marked)}>
                 <BookmarkIcon className={`w-4 h-4 ${marked ? 'text-green-500' : ''}`} />
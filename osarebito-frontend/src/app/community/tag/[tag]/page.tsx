@@ -9,8 +9,8 @@ interface Post {
   author_id: string
   content: string
   category?: string | null
-  likes?: string[]
-  retweets?: string[]
+  like_count?: number
+  retweet_count?: number
   image?: string | null
   anonymous?: boolean
 }
@@ -44,11 +44,11 @@ export default function TagPostsPage() {
           <div className="text-xs text-gray-600 mt-1 flex items-center gap-4">
             <span className="flex items-center gap-1">
               <HeartIcon className="w-4 h-4" />
-              {p.likes ? p.likes.length : 0}
+              {p.like_count ?? 0}
             </span>
             <span className="flex items-center gap-1">
               <ArrowsRightLeftIcon className="w-4 h-4" />
-              リポスト {p.retweets ? p.retweets.length : 0}
+              リポスト {p.retweet_count ?? 0}
             </span>
           </div>
         </div>
@@ -20,9 +20,8 @@ export default async function Profile({ params }: any) {
     return <div className="max-w-md mx-auto mt-10">ユーザーが見つかりません</div>
   }
   const profile = user.profile || {}
-  const followerCount = Array.isArray(user.followers) ? user.followers.length : 0
-  const followingCount = Array.isArray(user.following) ? user.following.length : 0
-  const interested = Array.isArray(user.interested) ? user.interested : []
+  const followerCount = user.follower_count ?? 0
+  const followingCount = user.following_count ?? 0
   return (
     <div className="max-w-md mx-auto mt-10 flex flex-col gap-2">
       <h1 className="text-2xl font-bold mb-4">プロフィール</h1>
@@ -36,8 +35,8 @@ export default async function Profile({ params }: any) {
           フォロー {followingCount}
         </Link>
         <MutualLink targetId={params.userId} />
-        <FollowButton targetId={params.userId} followers={user.followers || []} />
-        <InterestButton targetId={params.userId} interested={interested} />
+        <FollowButton targetId={params.userId} />
+        <InterestButton targetId={params.userId} />
         <BlockButton targetId={params.userId} />
       </div>
       {profile.profile_image && (
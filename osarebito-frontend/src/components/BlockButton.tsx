@@ -18,8 +18,8 @@ export default function BlockButton({ targetId }: Props) {
       setReady(true)
       return
     }
-    axios.get(`/api/users/${myId}`).then((res) => {
-      setBlocked((res.data.blocks || []).includes(targetId))
+    axios.get(`/api/users/${targetId}`, { params: { viewer_id: myId } }).then((res) => {
+      setBlocked(!!res.data.blocked)
       setReady(true)
     })
   }, [targetId])
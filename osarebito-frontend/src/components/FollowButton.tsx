@@ -5,21 +5,24 @@ import axios from 'axios'
 
 interface Props {
   targetId: string
-  followers: string[]
 }
 
-export default function FollowButton({ targetId, followers }: Props) {
+export default function FollowButton({ targetId }: Props) {
   const [ready, setReady] = useState(false)
   const [following, setFollowing] = useState(false)
   const router = useRouter()
 
   useEffect(() => {
     const myId = localStorage.getItem('userId') || ''
-    if (myId) {
-      setFollowing(followers.includes(myId))
+    if (!myId) {
+      setReady(true)
+      return
     }
-    setReady(true)
-  }, [followers])
+    axios.get(`/api/users/${targetId}`, { params: { viewer_id: myId } }).then((res) => {
+      setFollowing(!!res.data.followed)
+      setReady(true)
+    })
+  }, [targetId])
 
   const handleClick = async () => {
     const myId = localStorage.getItem('userId') || ''
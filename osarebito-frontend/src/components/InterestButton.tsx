@@ -5,21 +5,24 @@ import axios from 'axios'
 
 interface Props {
   targetId: string
-  interested: string[]
 }
 
-export default function InterestButton({ targetId, interested }: Props) {
+export default function InterestButton({ targetId }: Props) {
   const [ready, setReady] = useState(false)
   const [state, setState] = useState(false)
   const router = useRouter()
 
   useEffect(() => {
     const myId = localStorage.getItem('userId') || ''
-    if (myId) {
-      setState(interested.includes(myId))
+    if (!myId) {
+      setReady(true)
+      return
     }
-    setReady(true)
-  }, [interested])
+    axios.get(`/api/users/${targetId}`, { params: { viewer_id: myId } }).then((res) => {
+      setState(!!res.data.interested)
+      setReady(true)
+    })
+  }, [targetId])
 
   const handleClick = async () => {
     const myId = localStorage.getItem('userId') || ''
@@ -10,19 +10,24 @@ export const interestUserUrl = (userId: string) => `${BACKEND_URL}/users/${userI
 export const uninterestUserUrl = (userId: string) => `${BACKEND_URL}/users/${userId}/uninterest`
 export const blockUserUrl = (userId: string) => `${BACKEND_URL}/users/${userId}/block`
 export const unblockUserUrl = (userId: string) => `${BACKEND_URL}/users/${userId}/unblock`
+// User lists are shown whole; the backend pages them by default.
 export const mutualFollowersUrl = (userId: string, myId: string) =>
-  `${BACKEND_URL}/users/${userId}/mutual_followers?my_id=${myId}`
-export const followersUrl = (userId: string) => `${BACKEND_URL}/users/${userId}/followers`
-export const followingUrl = (userId: string) => `${BACKEND_URL}/users/${userId}/following`
-export const blocksUrl = (userId: string) => `${BACKEND_URL}/users/${userId}/blocks`
+  `${BACKEND_URL}/users/${userId}/mutual_followers?my_id=${myId}&unpaginated=true`
+export const followersUrl = (userId: string) =>
+  `${BACKEND_URL}/users/${userId}/followers?unpaginated=true`
+export const followingUrl = (userId: string) =>
+  `${BACKEND_URL}/users/${userId}/following?unpaginated=true`
+export const blocksUrl = (userId: string) => `${BACKEND_URL}/users/${userId}/blocks?unpaginated=true`
 export const postsUrl = (
   feed: string,
   userId?: string,
   category?: string,
+  before?: string,
 ) => {
   const params = new URLSearchParams({ feed })
   if (userId) params.append('user_id', userId)
   if (category) params.append('category', category)
+  if (before) params.append('before', before)
   return `${BACKEND_URL}/posts?${params.toString()}`
 }
 export const createPostUrl = `${BACKEND_URL}/posts`
@@ -36,8 +41,15 @@ export const bestAnswerUrl = (postId: number) => `${BACKEND_URL}/posts/${postId}
 export const updatesWsUrl = BACKEND_URL.replace(/^http/, 'ws') + '/ws/updates'
 export const bookmarkPostUrl = (postId: number) => `${BACKEND_URL}/posts/${postId}/bookmark`
 export const unbookmarkPostUrl = (postId: number) => `${BACKEND_URL}/posts/${postId}/unbookmark`
-export const userBookmarksUrl = (userId: string) => `${BACKEND_URL}/users/${userId}/bookmarks`
-export const userRetweetsUrl = (userId: string) => `${BACKEND_URL}/users/${userId}/retweets`
+export const userBookmarksUrl = (userId: string, before?: string) =>
+  `${BACKEND_URL}/users/${userId}/bookmarks${before ? `?before=${encodeURIComponent(before)}` : ''}`
+export const userBookmarkedUrl = (userId: string, postIds: string[]) => {
+  const params = new URLSearchParams()
+  postIds.forEach((id) => params.append('post_id', id))
+  return `${BACKEND_URL}/users/${userId}/bookmarked?${params.toString()}`
+}
+export const userRetweetsUrl = (userId: string, before?: string) =>
+  `${BACKEND_URL}/users/${userId}/retweets${before ? `?before=${encodeURIComponent(before)}` : ''}`
 export const retweetPostUrl = (postId: number) => `${BACKEND_URL}/posts/${postId}/retweet`
 export const unretweetPostUrl = (postId: number) => `${BACKEND_URL}/posts/${postId}/unretweet`
 export const sendMessageUrl = `${BACKEND_URL}/messages`
@@ -49,7 +61,8 @@ export const reportCommentUrl = (commentId: number) => `${BACKEND_URL}/reports/c
 export const trendingPostsUrl = `${BACKEND_URL}/trending_posts`
 export const postsByTagUrl = (tag: string) =>
   `${BACKEND_URL}/posts/by_tag?tag=${encodeURIComponent(tag)}`
-export const getPostUrl = (postId: number) => `${BACKEND_URL}/posts/${postId}`
+export const getPostUrl = (postId: number, viewerId?: string) =>
+  `${BACKEND_URL}/posts/${postId}${viewerId ? `?viewer_id=${encodeURIComponent(viewerId)}` : ''}`
 export const tutorialTasksUrl = (userId: string) => `${BACKEND_URL}/users/${userId}/tutorial_tasks`
 export const achievementsUrl = (userId: string) => `${BACKEND_URL}/users/${userId}/achievements`
 export const jobsUrl = `${BACKEND_URL}/jobs`